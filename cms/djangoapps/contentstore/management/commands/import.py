@@ -9,6 +9,7 @@ from xmodule.modulestore.xml_importer import import_from_xml
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
 from xmodule.contentstore.django import contentstore
+from cache_toolbox.core import del_cached_course_content
 
 
 class Command(BaseCommand):
@@ -49,6 +50,9 @@ class Command(BaseCommand):
 
         for course in course_items:
             course_id = course.id
+            if do_import_static:
+                # don't serve the replaced assets from the cache
+                del_cached_course_content(course_id)
             if not are_permissions_roles_seeded(course_id):
                 self.stdout.write('Seeding forum roles for course {0}\n'.format(course_id))
                 seed_permissions_roles(course_id)
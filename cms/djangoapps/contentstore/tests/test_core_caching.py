@@ -1,6 +1,15 @@
-from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content
+import os
+import shutil
+import tempfile
+import time
+
+from mock import Mock, patch
+
+from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content, del_cached_course_content
+from cache_toolbox.disk_cache import ContentDiskCache
 from opaque_keys.edx.locations import Location
 from django.test import TestCase
+from xmodule.contentstore.content import StaticContent, StaticContentStream
 
 
 class Content:
@@ -35,3 +44,83 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+    def test_delete_course(self):
+        set_cached_content(self.mockAsset)
+        store = Mock()
+        store.get_all_content_for_course.return_value = ([], 0)
+        store.get_all_content_thumbnails_for_course.return_value = [{'asset_key': self.unicodeLocation}]
+        with patch('cache_toolbox.core.contentstore', return_value=store):
+            del_cached_course_content(self.unicodeLocation.course_key)
+        self.assertEqual(None, get_cached_content(self.unicodeLocation))
+
+
+class DiskCachingTestCase(TestCase):
+    """
+    Tests for the local disk cache of content.
+    """
+    location = Location(u'c4x', u'mitX', u'800', u'run', u'asset', u'monsters.jpg')
+
+    def setUp(self):
+        super(DiskCachingTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.disk_cache = ContentDiskCache(self.directory, 25)
+        patcher = patch('cache_toolbox.core.get_content_disk_cache', return_value=self.disk_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _age(self, location, digest, age):
+        """
+        Make the cached file for location and digest look like it was last used `age` seconds ago.
+        """
+        last_used = time.time() - age
+        os.utime(self.disk_cache.path(location, digest), (last_used, last_used))
+
+    def test_save_and_open(self):
+        self.assertIsNone(self.disk_cache.open(self.location, 'digest'))
+        self.assertTrue(self.disk_cache.save(self.location, 'digest', ['0123', '456789']))
+        cached_file = self.disk_cache.open(self.location, 'digest')
+        cached_file.seek(2)
+        self.assertEqual(cached_file.read(3), '234')
+        self.assertIsNone(self.disk_cache.open(self.location, 'other digest'))
+
+    def test_evicts_least_recently_used(self):
+        self.disk_cache.save(self.location, 'first', ['0123456789'])
+        self._age(self.location, 'first', 100)
+        self.disk_cache.save(self.location, 'second', ['0123456789'])
+        self._age(self.location, 'second', 50)
+        # reading the first file makes the second the least recently used
+        self.disk_cache.open(self.location, 'first')
+        self.disk_cache.save(self.location, 'third', ['0123456789'])
+
+        self.assertIsNotNone(self.disk_cache.open(self.location, 'first'))
+        self.assertIsNone(self.disk_cache.open(self.location, 'second'))
+        self.assertIsNotNone(self.disk_cache.open(self.location, 'third'))
+
+    def test_put_get_and_delete(self):
+        content = StaticContent(
+            self.location, 'monsters.jpg', 'image/jpeg', 'my content', length=10, content_digest='digest'
+        )
+        set_cached_content(content)
+        self.assertIsNotNone(self.disk_cache.open(self.location, 'digest'))
+
+        cached = get_cached_content(self.location)
+        self.assertIsInstance(cached, StaticContentStream)
+        self.assertEqual(''.join(cached.stream_data()), 'my content')
+        self.assertEqual(''.join(cached.stream_data_in_range(3, 6)), 'cont')
+        self.assertEqual(cached.content_type, 'image/jpeg')
+
+        cached.close()
+        with self.assertRaises(ValueError):
+            cached.stream_data().next()
+
+        del_cached_content(self.location)
+        self.assertIsNone(get_cached_content(self.location))
+        self.assertIsNone(self.disk_cache.open(self.location, 'digest'))
+
+    def test_content_without_digest(self):
+        content = StaticContent(self.location, 'monsters.jpg', 'image/jpeg', 'my content', length=10)
+        set_cached_content(content)
+        self.assertEqual(get_cached_content(self.location).data, 'my content')
+        del_cached_content(self.location)
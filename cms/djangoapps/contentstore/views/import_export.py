@@ -21,6 +21,7 @@ from django.views.decorators.http import require_http_methods, require_GET
 
 from django_future.csrf import ensure_csrf_cookie
 from edxmako.shortcuts import render_to_response
+from cache_toolbox.core import del_cached_course_content
 from xmodule.contentstore.django import contentstore
 from xmodule.exceptions import SerializationError
 from xmodule.modulestore.django import modulestore
@@ -243,6 +244,8 @@ def import_handler(request, course_key_string):
                     static_content_store=contentstore(),
                     target_course_id=course_key,
                 )
+                # don't serve the replaced assets from the cache
+                del_cached_course_content(course_key)
 
                 new_location = course_items[0].location
                 logging.debug('new course at {0}'.format(new_location))
@@ -143,6 +143,11 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+# Local disk cache of course static content, in front of the shared cache
+CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR', None)
+if 'CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE' in ENV_TOKENS:
+    CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE = ENV_TOKENS['CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE']
+
 SESSION_COOKIE_DOMAIN = ENV_TOKENS.get('SESSION_COOKIE_DOMAIN')
 SESSION_COOKIE_HTTPONLY = ENV_TOKENS.get('SESSION_COOKIE_HTTPONLY', True)
 SESSION_ENGINE = ENV_TOKENS.get('SESSION_ENGINE', SESSION_ENGINE)
@@ -6,3 +6,17 @@ CACHE_TOOLBOX_DEFAULT_TIMEOUT = getattr(
     'CACHE_TOOLBOX_DEFAULT_TIMEOUT',
     60 * 60 * 24 * 3,
 )
+
+# Directory of the local disk cache of course static content (see disk_cache.py), or None for no disk cache
+CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR = getattr(
+    settings,
+    'CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR',
+    None,
+)
+
+# Maximum size in bytes of the local disk cache of course static content
+CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE = getattr(
+    settings,
+    'CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE',
+    1024 * 1024 * 1024,
+)
@@ -5,14 +5,21 @@ Core methods
 .. autofunction:: cache_toolbox.core.get_instance
 .. autofunction:: cache_toolbox.core.delete_instance
 .. autofunction:: cache_toolbox.core.instance_key
+.. autofunction:: cache_toolbox.core.set_cached_content
+.. autofunction:: cache_toolbox.core.get_cached_content
+.. autofunction:: cache_toolbox.core.del_cached_content
+.. autofunction:: cache_toolbox.core.del_cached_course_content
 
 """
 
 from django.core.cache import cache
 from django.db import DEFAULT_DB_ALIAS
 from opaque_keys import InvalidKeyError
+from xmodule.contentstore.content import StaticContent, StaticContentStream
+from xmodule.contentstore.django import contentstore
 
 from . import app_settings
+from .disk_cache import get_content_disk_cache
 
 
 def get_instance(model, instance_or_pk, timeout=None, using=None):
@@ -111,11 +118,59 @@ def instance_key(model, instance_or_pk):
 
 
 def set_cached_content(content):
-    cache.set(unicode(content.location).encode("utf-8"), content)
+    """
+    Caches ``content`` (a StaticContent).
+
+    If there's a local disk cache, the data is cached on disk, and only the
+    rest of the content is put in the shared cache. Otherwise the whole of the
+    content is put in the shared cache, unless it's a stream, which can't be.
+    """
+    key = unicode(content.location).encode("utf-8")
+    disk_cache = get_content_disk_cache()
+    content_digest = getattr(content, 'content_digest', None)
+    length = getattr(content, 'length', None)
+    if disk_cache is not None and content_digest is not None and 0 < length <= disk_cache.max_size:
+        if disk_cache.save(content.location, content_digest, content.stream_data()):
+            cache.set(key, StaticContent(
+                content.location, content.name, content.content_type, None,
+                last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+                import_path=content.import_path, length=length, locked=getattr(content, 'locked', False),
+                content_digest=content_digest
+            ))
+            return
+    if not isinstance(content, StaticContentStream):
+        cache.set(key, content)
+
+
+def _is_on_disk(content):
+    """
+    Returns whether the cached ``content`` is a StaticContent whose data is in the local disk cache.
+    """
+    return getattr(content, 'content_digest', None) is not None and content.data is None
 
 
 def get_cached_content(location):
-    return cache.get(unicode(location).encode("utf-8"))
+    """
+    Returns the cached content for ``location``, or None if it isn't cached.
+
+    Content whose data is in the local disk cache is returned as a
+    StaticContentStream reading a memory map of the cached file.
+    """
+    content = cache.get(unicode(location).encode("utf-8"))
+    if content is None or not _is_on_disk(content):
+        return content
+
+    disk_cache = get_content_disk_cache()
+    cached_file = disk_cache.open(content.location, content.content_digest) if disk_cache is not None else None
+    if cached_file is None:
+        # cached by another server, or evicted: it'll be cached here when it's next fetched
+        return None
+    return StaticContentStream(
+        content.location, content.name, content.content_type, cached_file,
+        last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+        import_path=content.import_path, length=content.length, locked=content.locked,
+        content_digest=content.content_digest
+    )
 
 
 def del_cached_content(location):
@@ -134,4 +189,21 @@ def del_cached_content(location):
         # although deprecated keys allowed run=None, new keys don't if there is no version.
         pass
 
+    disk_cache = get_content_disk_cache()
+    if disk_cache is not None:
+        for content in cache.get_many(locations).itervalues():
+            if _is_on_disk(content):
+                disk_cache.delete(content.location, content.content_digest)
+
     cache.delete_many(locations)
+
+
+def del_cached_course_content(course_key):
+    """
+    delete the cached content of all of a course's assets and their thumbnails,
+    e.g. after the course was imported over them.
+    """
+    store = contentstore()
+    assets, __ = store.get_all_content_for_course(course_key)
+    for asset in assets + store.get_all_content_thumbnails_for_course(course_key):
+        del_cached_content(asset['asset_key'])
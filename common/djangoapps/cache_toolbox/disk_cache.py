@@ -0,0 +1,196 @@
+"""
+Local disk cache of course static content
+-----------------------------------------
+
+A cache of asset data on the local disk of each app server, in front of the
+shared (memcached) content cache. Files are addressed by the asset's location
+and the md5 of its data, so a reuploaded asset is never served from a stale
+file: its new digest addresses a different file. The cache is bounded in size,
+evicting the least recently used files, and cached files are read through
+mmap rather than loaded into memory.
+
+The cache is enabled by setting ``CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR``.
+
+.. autoclass:: cache_toolbox.disk_cache.ContentDiskCache
+.. autofunction:: cache_toolbox.disk_cache.get_content_disk_cache
+"""
+import errno
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+
+from xmodule.contentstore.content import MAX_STREAM_BUFFER_SIZE
+
+from . import app_settings
+
+log = logging.getLogger(__name__)
+
+# When the cache outgrows its size, files are evicted until it is this fraction of its size
+EVICT_TO_FRACTION = 0.9
+
+_CONTENT_DISK_CACHE = {}
+
+
+def get_content_disk_cache():
+    """
+    Returns the ContentDiskCache configured by the settings, or None if there isn't one.
+    """
+    if 'cache' not in _CONTENT_DISK_CACHE:
+        directory = app_settings.CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR
+        _CONTENT_DISK_CACHE['cache'] = ContentDiskCache(
+            directory, app_settings.CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE
+        ) if directory else None
+    return _CONTENT_DISK_CACHE['cache']
+
+
+class MappedFile(object):
+    """
+    A read-only memory map of a cached file, which can be used as the stream of a
+    StaticContentStream.
+    """
+    # read the file in blocks of this size when streaming it
+    chunk_size = MAX_STREAM_BUFFER_SIZE
+
+    def __init__(self, data):
+        self._data = data
+
+    def read(self, size):
+        return self._data.read(size)
+
+    def seek(self, position):
+        self._data.seek(position)
+
+    def close(self):
+        self._data.close()
+
+
+class ContentDiskCache(object):
+    """
+    A size bounded cache of asset data in the files under `directory`.
+
+    Several processes may share a directory. Files are written to a temporary
+    name and renamed into place, so readers never see a partly written file, and
+    a file's modification time is updated whenever it's read so that the least
+    recently used files are the first evicted.
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        # the size of the files in the cache, as last counted and added to by this process
+        self._size = None
+
+    def path(self, location, digest):
+        """
+        Returns the path of the file which caches the data of the asset at location with the given digest.
+        """
+        key = hashlib.sha1(u'{}\n{}'.format(location, digest).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def open(self, location, digest):
+        """
+        Returns a MappedFile of the cached data of the asset at location with the
+        given digest, or None if it isn't cached.
+        """
+        path = self.path(location, digest)
+        try:
+            with open(path, 'rb') as cached_file:
+                data = mmap.mmap(cached_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            # ValueError is raised for empty files, which are never cached
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            # the file was evicted since it was opened, which doesn't affect the open map
+            pass
+        return MappedFile(data)
+
+    def save(self, location, digest, chunks):
+        """
+        Caches the data (the iterable of strings `chunks`) of the asset at location with the given digest.
+
+        Returns whether the data was cached.
+        """
+        path = self.path(location, digest)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                log.exception(u"Couldn't create content cache directory %s", directory)
+                return False
+
+        size = 0
+        temp_path = None
+        try:
+            temp_fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp')
+            with os.fdopen(temp_fd, 'wb') as temp_file:
+                for chunk in chunks:
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            os.rename(temp_path, path)
+        except (IOError, OSError):
+            log.exception(u"Couldn't cache content for %s in %s", location, path)
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+        if self._size is None:
+            self._size = self._count_size()
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self.evict()
+        return True
+
+    def delete(self, location, digest):
+        """
+        Removes the cached data of the asset at location with the given digest, if there is any.
+        """
+        try:
+            os.remove(self.path(location, digest))
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Removes the least recently used files until the cache is at most EVICT_TO_FRACTION of its maximum size.
+        """
+        entries = sorted(self._entries())
+        size = sum(file_size for __, file_size, __ in entries)
+        target = self.max_size * EVICT_TO_FRACTION
+        for __, file_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # another process evicted it
+                pass
+            size -= file_size
+        self._size = size
+
+    def _count_size(self):
+        """
+        Returns the total size of the cached files.
+        """
+        return sum(file_size for __, file_size, __ in self._entries())
+
+    def _entries(self):
+        """
+        Returns a (modification time, size, path) tuple for each cached file.
+        """
+        entries = []
+        for dirpath, __, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.startswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
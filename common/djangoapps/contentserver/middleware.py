@@ -3,10 +3,17 @@ Middleware to serve assets.
 """
 
 import logging
+import threading
+from uuid import uuid4
 
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Before Django 1.5, an HttpResponse whose content is an iterator is streamed
+    StreamingHttpResponse = HttpResponse
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
@@ -15,6 +22,7 @@ from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from cache_toolbox.core import get_cached_content, set_cached_content
+from cache_toolbox.disk_cache import get_content_disk_cache
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -51,12 +59,15 @@ class StaticContentServer(object):
                     return response
 
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
+                # this is because I haven't been able to find a means to stream data out of memcached.
+                # Larger content is cached if there's a local disk cache, which does stream it out.
                 if content.length is not None:
                     if content.length < 1048576:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    elif get_content_disk_cache() is not None:
+                        cache_in_background(loc)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -78,13 +89,17 @@ class StaticContentServer(object):
             # convert over the DB persistent last modified timestamp to a HTTP compatible
             # timestamp, so we can simply compare the strings
             last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            etag = get_etag(content)
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            # see if the client has cached this content, if so then return a 304 (Not Modified).
+            # If-None-Match takes precedence over If-Modified-Since when both are sent.
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                if etag is not None and etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag):
+                    return self._not_modified(etag, last_modified_at_str)
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
                 if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+                    return self._not_modified(etag, last_modified_at_str)
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -94,10 +109,6 @@ class StaticContentServer(object):
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -110,42 +121,192 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        # A range set is satisfiable if any of its ranges is.
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            response = HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Range'] = 'bytes */{length}'.format(length=content.length)
+                            return response
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = StreamingHttpResponse(
+                                _closing(content.stream_data_in_range(first, last), content),
+                                content_type=content.content_type
+                            )
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            # Content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            boundary = uuid4().hex
+                            response = StreamingHttpResponse(
+                                _closing(stream_multipart_byteranges(content, ranges, boundary), content),
+                                content_type='multipart/byteranges; boundary={}'.format(boundary)
                             )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Length'] = str(multipart_byteranges_length(content, ranges, boundary))
+                        response.status_code = 206  # Partial Content
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = StreamingHttpResponse(
+                    _closing(content.stream_data(), content), content_type=content.content_type
+                )
                 response['Content-Length'] = content.length
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
             response['Last-Modified'] = last_modified_at_str
+            if etag is not None:
+                response['ETag'] = etag
 
             return response
 
+    @staticmethod
+    def _not_modified(etag, last_modified_at_str):
+        """
+        Return a 304 (Not Modified) response with the validators of the content.
+        """
+        response = HttpResponseNotModified()
+        response['Last-Modified'] = last_modified_at_str
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+
+class _ClosingIterator(object):
+    """
+    An iterable response body which closes the content it streams when the
+    response is closed, so that the content's stream (e.g. a memory map of a
+    file in the local disk cache) isn't left open.
+    """
+    def __init__(self, iterable, content):
+        self._iterable = iterable
+        self._content = content
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        self._content.close()
+
+
+def _closing(iterable, content):
+    """
+    Returns `iterable` (the body of a response streaming `content`), closing
+    `content` when the response is closed if it's a stream.
+    """
+    if hasattr(content, 'close'):
+        return _ClosingIterator(iterable, content)
+    return iterable
+
+
+# The locations this process is caching on the local disk in the background
+_CACHING_IN_BACKGROUND = set()
+_CACHING_IN_BACKGROUND_LOCK = threading.Lock()
+
+
+def cache_in_background(location):
+    """
+    Caches the content at `location` in the local disk cache from a background
+    thread, so that the request which missed the cache can stream the content
+    without waiting for all of it to be copied to disk first.
+
+    Returns the thread, or None if the content is already being cached.
+    """
+    with _CACHING_IN_BACKGROUND_LOCK:
+        if location in _CACHING_IN_BACKGROUND:
+            return None
+        _CACHING_IN_BACKGROUND.add(location)
+    thread = threading.Thread(target=_cache, args=(location,), name='content-disk-cache')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def _cache(location):
+    """
+    Fetches the content at `location`, and caches it.
+    """
+    try:
+        content = AssetManager.find(location, as_stream=True)
+        try:
+            set_cached_content(content)
+        finally:
+            content.close()
+    except Exception:  # pylint: disable=broad-except
+        log.exception(u"Couldn't cache content for %s", location)
+    finally:
+        with _CACHING_IN_BACKGROUND_LOCK:
+            _CACHING_IN_BACKGROUND.discard(location)
+
+
+def get_etag(content):
+    """
+    Return the entity tag of content, or None if it can't be identified.
+
+    The tag is the digest GridFS keeps of the asset's data, so it changes whenever the data does.
+    """
+    content_digest = getattr(content, 'content_digest', None)
+    if content_digest is None:
+        return None
+    return '"{}"'.format(content_digest)
+
+
+def etag_matches(header_value, etag):
+    """
+    Returns whether an If-None-Match header value matches etag.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    for tag in header_value.split(','):
+        tag = tag.strip()
+        # the weak comparison function is used for If-None-Match
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag == etag:
+            return True
+    return False
+
+
+def _multipart_part_headers(content, first, last, boundary):
+    """
+    Returns the boundary and headers which start the part of a multipart/byteranges message
+    holding the bytes first to last of content.
+    """
+    return '--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {first}-{last}/{length}\r\n\r\n'.format(
+        boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+    )
+
+
+def stream_multipart_byteranges(content, ranges, boundary):
+    """
+    Stream a multipart/byteranges message holding the (first, last) byte ranges of content.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc19.html#sec19.2
+    """
+    for first, last in ranges:
+        yield _multipart_part_headers(content, first, last, boundary)
+        for chunk in content.stream_data_in_range(first, last):
+            yield chunk
+        yield '\r\n'
+    yield '--{boundary}--\r\n'.format(boundary=boundary)
+
+
+def multipart_byteranges_length(content, ranges, boundary):
+    """
+    Returns the length of the message stream_multipart_byteranges streams.
+    """
+    length = len('--{boundary}--\r\n'.format(boundary=boundary))
+    for first, last in ranges:
+        length += len(_multipart_part_headers(content, first, last, boundary)) + (last - first + 1) + len('\r\n')
+    return length
+
 
 def parse_range_header(header_value, content_length):
     """
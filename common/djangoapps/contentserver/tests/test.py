@@ -4,9 +4,12 @@ Tests for StaticContentServer
 import copy
 import ddt
 import logging
+import threading
 import unittest
 from uuid import uuid4
 
+from mock import Mock, patch
+
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
@@ -17,7 +20,7 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_from_xml
 
-from contentserver.middleware import parse_range_header
+from contentserver.middleware import _closing, cache_in_background, parse_range_header
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -146,17 +149,58 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges message
+        with a part for each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -10'.format(
             first=first_byte, last=last_byte)
         )
 
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        content = resp.content
+        self.assertEqual(resp['Content-Length'], str(len(content)))
+        for first, last in ((first_byte, last_byte), (self.length_unlocked - 10, self.length_unlocked - 1)):
+            self.assertIn(
+                'Content-Range: bytes {first}-{last}/{length}'.format(
+                    first=first, last=last, length=self.length_unlocked
+                ),
+                content
+            )
+
+    def test_range_request_multiple_ranges_one_satisfiable(self):
+        """
+        Test that a request for multiple ranges of which only one is satisfiable
+        outputs that range as a single part.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9, {first}-'.format(
+            first=self.length_unlocked)
+        )
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertEqual(resp['Content-Range'], 'bytes 0-9/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '10')
+
+    def test_if_none_match(self):
+        """
+        Test that a request whose If-None-Match matches the asset's ETag
+        outputs 304 Not Modified, and that one which doesn't outputs the content.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", W/{}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200)
 
     @ddt.data(
         'bytes 0-',
@@ -236,3 +280,57 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+class CacheInBackgroundTestCase(unittest.TestCase):
+    """
+    Tests for caching content on the local disk from a background thread.
+    """
+    location = 'an asset location'
+
+    def test_cache_in_background(self):
+        content = Mock()
+        started = threading.Event()
+        finish = threading.Event()
+
+        def _set_cached_content(cached):
+            """Waits to be told to finish caching."""
+            self.assertIs(cached, content)
+            started.set()
+            finish.wait(5)
+
+        with patch('contentserver.middleware.AssetManager.find', return_value=content):
+            with patch('contentserver.middleware.set_cached_content', side_effect=_set_cached_content):
+                thread = cache_in_background(self.location)
+                self.assertTrue(started.wait(5))
+                # the content is only cached once at a time
+                self.assertIsNone(cache_in_background(self.location))
+                finish.set()
+                thread.join(5)
+        self.assertTrue(content.close.called)
+
+    def test_error(self):
+        with patch('contentserver.middleware.AssetManager.find', side_effect=Exception):
+            cache_in_background(self.location).join(5)
+        # a failure doesn't stop the content being cached later
+        with patch('contentserver.middleware.AssetManager.find', return_value=Mock()):
+            with patch('contentserver.middleware.set_cached_content') as mock_set_cached_content:
+                cache_in_background(self.location).join(5)
+        self.assertTrue(mock_set_cached_content.called)
+
+
+class ClosingTestCase(unittest.TestCase):
+    """
+    Tests for closing the content a response streams.
+    """
+    def test_closing(self):
+        content = Mock()
+        body = _closing(iter(['chunk']), content)
+        self.assertEqual(list(body), ['chunk'])
+        self.assertFalse(content.close.called)
+        body.close()
+        self.assertTrue(content.close.called)
+
+    def test_in_memory_content(self):
+        body = iter(['chunk'])
+        self.assertIs(_closing(body, object()), body)
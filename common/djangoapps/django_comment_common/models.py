@@ -1,14 +1,18 @@
+import json
 import logging
 
+from celery.task import task
 from django.db import models
 from django.contrib.auth.models import User
 
 from django.dispatch import receiver
 from django.db.models.signals import post_save
 from django.utils.translation import ugettext_noop
+from opaque_keys.edx.keys import CourseKey
 from student.models import CourseEnrollment
 
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore, SignalHandler
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule_django.models import CourseKeyField, NoneToEmptyManager
 
@@ -105,3 +109,92 @@ class Permission(models.Model):
 
     def __unicode__(self):
         return self.name
+
+
+class DiscussionTopicIndex(models.Model):
+    """
+    The inline discussion topics of a course, as of when it was last published,
+    so that they can be listed without loading every discussion module.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True, unique=True)
+    # A list of a dict for each topic, as returned by generate_discussion_topics.
+    topics_json = models.TextField()
+    modified = models.DateTimeField(auto_now=True)
+
+    @property
+    def topics(self):
+        return json.loads(self.topics_json)
+
+
+DISCUSSION_TOPIC_REQUIRED_KEYS = ('discussion_id', 'discussion_category', 'discussion_target')
+
+
+def generate_discussion_topics(course_key):
+    """
+    Returns a list of a dict for each published discussion module in the course,
+    with its 'id', 'location', 'category', 'title', 'sort_key' and 'start' (as an
+    ISO 8601 string, or None).  Modules which lack any of
+    DISCUSSION_TOPIC_REQUIRED_KEYS are left out.
+    """
+    store = modulestore()
+    with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+        modules = store.get_items(course_key, qualifiers={'category': 'discussion'})
+
+    topics = []
+    for module in modules:
+        missing_keys = [key for key in DISCUSSION_TOPIC_REQUIRED_KEYS if getattr(module, key) is None]
+        if missing_keys:
+            logging.warning(
+                "Required key '%s' not in discussion %s, leaving out of category map", missing_keys[0], module.location
+            )
+            continue
+        topics.append({
+            'id': module.discussion_id,
+            'location': unicode(module.location),
+            'category': module.discussion_category,
+            'title': module.discussion_target,
+            'sort_key': module.sort_key,
+            'start': module.start.isoformat() if module.start else None,
+        })
+    return topics
+
+
+def get_discussion_topics(course_key):
+    """
+    Returns the inline discussion topics of the course, as generate_discussion_topics
+    does, from its DiscussionTopicIndex.
+
+    The index is made if the course hasn't been published since it was added.  XML
+    courses aren't published, so their topics are generated each time.
+    """
+    if modulestore().get_modulestore_type(course_key) == ModuleStoreEnum.Type.xml:
+        return generate_discussion_topics(course_key)
+    try:
+        return DiscussionTopicIndex.objects.get(course_id=course_key).topics
+    except DiscussionTopicIndex.DoesNotExist:
+        return update_discussion_topic_index(unicode(course_key)).topics
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Updates the course's discussion topic index when it's published.
+    """
+    update_discussion_topic_index.delay(unicode(course_key))
+
+
+@task(name=u'django_comment_common.models.update_discussion_topic_index')
+def update_discussion_topic_index(course_key):
+    """
+    Regenerates the DiscussionTopicIndex of the course, whose key is passed as a string.
+    """
+    course_key = CourseKey.from_string(course_key)
+    topics_json = json.dumps(generate_discussion_topics(course_key))
+    index, created = DiscussionTopicIndex.objects.get_or_create(
+        course_id=course_key,
+        defaults={'topics_json': topics_json}
+    )
+    if not created:
+        index.topics_json = topics_json
+        index.save()
+    return index
@@ -1,8 +1,14 @@
+from datetime import datetime
+
 from django.test import TestCase
+from mock import patch
+from pytz import UTC
 
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
-from django_comment_common.models import Role
+from django_comment_common.models import DiscussionTopicIndex, Role, get_discussion_topics
 from student.models import CourseEnrollment, User
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 
 class RoleAssignmentTest(TestCase):
@@ -54,3 +60,55 @@ class RoleAssignmentTest(TestCase):
     #     )
     #     self.assertNotIn(student_role, self.student_user.roles.all())
     #     self.assertIn(student_role, another_student.roles.all())
+
+
+class DiscussionTopicIndexTest(ModuleStoreTestCase):
+    """
+    Test that a course's discussion topic index is updated when it's published.
+    """
+    def setUp(self):
+        super(DiscussionTopicIndexTest, self).setUp()
+        self.course = CourseFactory.create()
+
+    def create_discussion(self, discussion_id, **kwargs):
+        """Creates a discussion module in the course."""
+        return ItemFactory.create(
+            parent_location=self.course.location,
+            category='discussion',
+            discussion_id=discussion_id,
+            discussion_category='Chapter / Section',
+            discussion_target='Discussion',
+            **kwargs
+        )
+
+    def test_updated_on_publish(self):
+        self.assertEqual(get_discussion_topics(self.course.id), [])
+        discussion = self.create_discussion('discussion1', start=datetime(2014, 1, 2, tzinfo=UTC))
+        self.assertEqual(
+            DiscussionTopicIndex.objects.get(course_id=self.course.id).topics,
+            [{
+                'id': 'discussion1',
+                'location': unicode(discussion.location),
+                'category': 'Chapter / Section',
+                'title': 'Discussion',
+                'sort_key': None,
+                'start': '2014-01-02T00:00:00+00:00',
+            }]
+        )
+
+    def test_drafts_left_out(self):
+        self.create_discussion('discussion1')
+        self.create_discussion('discussion2', publish_item=False)
+        self.assertEqual([topic['id'] for topic in get_discussion_topics(self.course.id)], ['discussion1'])
+
+    def test_made_if_missing(self):
+        self.create_discussion('discussion1')
+        DiscussionTopicIndex.objects.all().delete()
+        self.assertEqual([topic['id'] for topic in get_discussion_topics(self.course.id)], ['discussion1'])
+        self.assertTrue(DiscussionTopicIndex.objects.filter(course_id=self.course.id).exists())
+
+    def test_not_loaded_again(self):
+        self.create_discussion('discussion1')
+        with patch('xmodule.modulestore.mixed.MixedModuleStore.get_items') as mock_get_items:
+            get_discussion_topics(self.course.id)
+        self.assertFalse(mock_get_items.called)
@@ -0,0 +1,197 @@
+"""
+Event tracker backend that buffers events for another backend.
+
+Events are queued in a bounded in-memory buffer and sent to the wrapped
+backend in batches by a background thread, so the request which tracked an
+event doesn't wait for it to be encoded or stored. For example::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...},
+              },
+              'capacity': 10000,
+              'batch_size': 100,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+# What to do with an event when the buffer is full.
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class BufferedBackend(BaseBackend):
+    """
+    Event tracker backend that sends events to another backend in batches,
+    from a background thread.
+
+    Events still in the buffer when the process exits are sent then. Events
+    which don't fit in the buffer are dropped as the `overflow` policy says,
+    and counted.
+
+    """
+
+    def __init__(self, backend, capacity=10000, batch_size=100, flush_interval=1.0,
+                 overflow=DROP_OLDEST, block_timeout=0.05, **kwargs):
+        """
+        Event tracker backend that buffers events for another backend.
+
+        :Parameters:
+
+          - `backend`: the configuration of the wrapped backend, a dict with
+            an 'ENGINE' and its 'OPTIONS', like the entries of TRACKING_BACKENDS
+          - `capacity`: the most events the buffer holds
+          - `batch_size`: the most events sent to the wrapped backend at once
+          - `flush_interval`: the most seconds an event waits in the buffer
+            before it's sent
+          - `overflow`: what to do with an event when the buffer is full:
+            'drop_oldest' drops the oldest event in the buffer, 'drop_newest'
+            drops the new event, and 'block' waits up to `block_timeout`
+            seconds for room before dropping the new event
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Invalid overflow policy {}'.format(overflow))
+
+        # imported here, as the tracker instantiates backends as it's imported
+        from track.tracker import _instantiate_backend_from_name  # pylint: disable=protected-access
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+        self.backend_name = type(self.backend).__name__
+
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self.sent = 0
+        self.dropped = 0
+
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+        atexit.register(self.stop)
+
+    def send(self, event):
+        """Queue the event, to be sent by the background thread."""
+        self._ensure_thread()
+        with self._condition:
+            if len(self._events) >= self.capacity and self.overflow == BLOCK:
+                deadline = time.time() + self.block_timeout
+                while len(self._events) >= self.capacity and time.time() < deadline:
+                    self._condition.wait(deadline - time.time())
+            full = len(self._events) >= self.capacity
+            if full:
+                self.dropped += 1
+                if self.overflow == DROP_OLDEST:
+                    self._events.popleft()
+            if not full or self.overflow == DROP_OLDEST:
+                self._events.append(event)
+                if len(self._events) >= self.batch_size:
+                    self._condition.notify_all()
+        # reported once the lock is released, so that senders don't wait on the metrics client
+        if full:
+            self._record_dropped()
+
+    def _record_dropped(self):
+        """Report an event which didn't fit in the buffer."""
+        dog_stats_api.increment(
+            'track.buffered.dropped',
+            tags=[u'backend:{}'.format(self.backend_name), u'overflow:{}'.format(self.overflow)]
+        )
+
+    def _ensure_thread(self):
+        """
+        Start the background thread, if this process hasn't started it yet.
+
+        Threads don't survive a fork, so a forked web server process starts
+        its own.
+
+        """
+        if self._has_thread():
+            return
+        with self._condition:
+            if self._has_thread():
+                return
+            self._stopping = False
+            thread = threading.Thread(target=self._run, name='track-buffered-backend')
+            thread.daemon = True
+            thread.start()
+            # _thread is set before _pid, so that a sender which sees this
+            # process's pid without the lock also sees its thread
+            self._thread = thread
+            self._pid = os.getpid()
+
+    def _has_thread(self):
+        """Return whether this process's background thread is running."""
+        thread = self._thread
+        return self._pid == os.getpid() and thread is not None and thread.is_alive()
+
+    def _run(self):
+        """Send batches of events until the backend is stopped."""
+        while True:
+            with self._condition:
+                if len(self._events) < self.batch_size and not self._stopping:
+                    self._condition.wait(self.flush_interval)
+                if self._stopping and not self._events:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Send all the buffered events to the wrapped backend."""
+        while True:
+            with self._condition:
+                batch = [self._events.popleft() for __ in xrange(min(self.batch_size, len(self._events)))]
+                # there's room in the buffer for blocked senders
+                self._condition.notify_all()
+            if not batch:
+                return
+            self._send_batch(batch)
+
+    def _send_batch(self, batch):
+        """Send a batch of events to the wrapped backend."""
+        try:
+            with dog_stats_api.timer('track.buffered.send', tags=[u'backend:{}'.format(self.backend_name)]):
+                self.backend.send_many(batch)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error sending %d events to the %s event tracker backend', len(batch), self.backend_name)
+        else:
+            self.sent += len(batch)
+
+    def stop(self):
+        """Send the buffered events and stop the background thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self.flush()
@@ -87,10 +87,14 @@ class MongoBackend(BaseBackend):
 
     def send(self, event):
         """Insert the event in to the Mongo collection"""
+        self.send_many([event])
+
+    def send_many(self, events):
+        """Insert the events in to the Mongo collection, in one bulk insert"""
         try:
-            self.collection.insert(event, manipulate=False)
+            self.collection.insert(events if len(events) > 1 else events[0], manipulate=False)
         except PyMongoError:
-            # The event will be lost in case of a connection error.
+            # The events will be lost in case of a connection error.
             # pymongo will re-connect/re-authenticate automatically
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+import time
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends.buffered import BufferedBackend
+from track.backends.django import TrackingLog
+
+
+class TestBufferedBackend(TestCase):
+    def setUp(self):
+        self.mongo_patcher = patch('track.backends.mongodb.MongoClient')
+        self.addCleanup(self.mongo_patcher.stop)
+        self.mongo_patcher.start()
+
+    def make_backend(self, engine='track.backends.mongodb.MongoBackend', **options):
+        # By default, leave the flushing to the test
+        options.setdefault('flush_interval', 60)
+        backend = BufferedBackend(backend={'ENGINE': engine}, **options)
+        self.addCleanup(backend.stop)
+        return backend
+
+    def test_batches(self):
+        backend = self.make_backend(batch_size=2)
+        events = [{'test': 1}, {'test': 2}, {'test': 3}]
+        for event in events:
+            backend.send(event)
+        backend.flush()
+
+        calls = backend.backend.collection.insert.mock_calls
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][1][0], events[:2])
+        self.assertEqual(calls[1][1][0], events[2])
+        self.assertEqual(backend.sent, 3)
+
+    def test_background_flush(self):
+        backend = self.make_backend(batch_size=2, flush_interval=0.01)
+        backend.send({'test': 1})
+        backend.send({'test': 2})
+
+        collection = backend.backend.collection
+        deadline = time.time() + 5
+        while not collection.insert.called and time.time() < deadline:
+            time.sleep(0.01)
+        collection.insert.assert_called_once_with([{'test': 1}, {'test': 2}], manipulate=False)
+
+    def test_django_bulk_insert(self):
+        backend = self.make_backend('track.backends.django.DjangoBackend')
+        for username in ('first', 'second'):
+            backend.send({'username': username, 'time': '2013-01-01T12:01:00-05:00'})
+        self.assertEqual(TrackingLog.objects.count(), 0)
+
+        backend.flush()
+        self.assertEqual(sorted(log.username for log in TrackingLog.objects.all()), ['first', 'second'])
+
+    def test_drop_oldest(self):
+        backend = self.make_backend(capacity=2)
+        for test in xrange(3):
+            backend.send({'test': test})
+        self.assertEqual(backend.dropped, 1)
+        self.assertEqual(list(backend._events), [{'test': 1}, {'test': 2}])  # pylint: disable=protected-access
+
+    def test_drop_newest(self):
+        backend = self.make_backend(capacity=2, overflow='drop_newest')
+        for test in xrange(3):
+            backend.send({'test': test})
+        self.assertEqual(backend.dropped, 1)
+        self.assertEqual(list(backend._events), [{'test': 0}, {'test': 1}])  # pylint: disable=protected-access
+
+    def test_dropped_reported_without_lock(self):
+        backend = self.make_backend(capacity=1)
+        backend.send({'test': 0})
+        lock_held = []
+        with patch('track.backends.buffered.dog_stats_api.increment') as mock_increment:
+            mock_increment.side_effect = lambda *args, **kwargs: lock_held.append(
+                backend._condition._is_owned()  # pylint: disable=protected-access
+            )
+            backend.send({'test': 1})
+        self.assertEqual(lock_held, [False])
+
+    def test_thread_restarted(self):
+        backend = self.make_backend()
+        backend.send({'test': 0})
+        thread = backend._thread  # pylint: disable=protected-access
+        backend._pid = None  # pylint: disable=protected-access
+        backend.send({'test': 1})
+        self.assertIsNot(backend._thread, thread)  # pylint: disable=protected-access
+        self.assertTrue(backend._thread.is_alive())  # pylint: disable=protected-access
+
+    def test_block(self):
+        backend = self.make_backend(capacity=1, overflow='block', block_timeout=0.01)
+        backend.send({'test': 0})
+        start = time.time()
+        backend.send({'test': 1})
+        self.assertGreaterEqual(time.time() - start, 0.01)
+        self.assertEqual(backend.dropped, 1)
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            BufferedBackend(backend={'ENGINE': 'track.backends.mongodb.MongoBackend'}, overflow='explode')
+
+    def test_stop_sends_buffered_events(self):
+        backend = self.make_backend()
+        backend.send({'test': 1})
+        backend.stop()
+        backend.backend.collection.insert.assert_called_once_with({'test': 1}, manipulate=False)
@@ -4,6 +4,7 @@ Parser and evaluator for FormulaResponse and NumericalResponse
 Uses pyparsing to parse. Main function as of now is evaluator().
 """
 
+from collections import OrderedDict
 import math
 import operator
 import numbers
@@ -73,6 +74,11 @@ SUFFIXES = {
 }
 
 
+# The number of parsed expressions kept by parse_expression().
+PARSE_CACHE_SIZE = 1000
+_PARSE_CACHE = OrderedDict()
+
+
 class UndefinedVariable(Exception):
     """
     Indicate when a student inputs a variable which was not expected.
@@ -200,6 +206,71 @@ def eval_product(parse_result):
     return prod
 
 
+# The following actions are the same as those above, but also work on numpy
+# arrays of samples of the expression's values. They tell operands from the
+# operator and bracket strings by type, as arrays aren't `numbers.Number`s and
+# can't be compared to strings.
+
+def _operands(parse_result):
+    """
+    Return the items of `parse_result` which aren't strings.
+    """
+    return [k for k in parse_result if not isinstance(k, basestring)]
+
+
+def eval_atom_samples(parse_result):
+    """
+    Return the value wrapped by the atom, like eval_atom.
+    """
+    return _operands(parse_result)[0]
+
+
+def eval_power_samples(parse_result):
+    """
+    Exponentiate the inputs right to left, like eval_power.
+    """
+    return reduce(lambda a, b: b ** a, reversed(_operands(parse_result)))
+
+
+def eval_parallel_samples(parse_result):
+    """
+    Compute the parallel resistors operator, like eval_parallel: NaN where any input is zero.
+    """
+    operands = _operands(parse_result)
+    if len(operands) == 1:
+        return operands[0]
+    any_zero = reduce(numpy.logical_or, [numpy.equal(e, 0) for e in operands])
+    return numpy.where(any_zero, float('nan'), 1. / sum(1. / e for e in operands))
+
+
+def eval_sum_samples(parse_result):
+    """
+    Add the inputs, keeping in mind their sign, like eval_sum.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.sub if token == '-' else operator.add
+        else:
+            total = current_op(total, token)
+    return total
+
+
+def eval_product_samples(parse_result):
+    """
+    Multiply the inputs, like eval_product.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.truediv if token == '/' else operator.mul
+        else:
+            prod = current_op(prod, token)
+    return prod
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -216,6 +287,61 @@ def add_defaults(variables, functions, case_sensitive):
     return (all_variables, all_functions)
 
 
+def parse_expression(math_expr, case_sensitive=False):
+    """
+    Return a ParseAugmenter which has parsed `math_expr`.
+
+    Parses are memoized on (math_expr, case_sensitive), as the same expressions
+    are evaluated many times over (e.g. for every sample FormulaResponse
+    checks). The result is shared, so it mustn't be changed.
+    """
+    key = (math_expr, case_sensitive)
+    math_interpreter = _PARSE_CACHE.pop(key, None)
+    if math_interpreter is None:
+        math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        math_interpreter.parse_algebra()
+        while len(_PARSE_CACHE) >= PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+    # (Re)insert it as the most recently used.
+    _PARSE_CACHE[key] = math_interpreter
+    return math_interpreter
+
+
+def evaluate_actions(all_variables, all_functions, case_sensitive, samples=False):
+    """
+    Return the actions which evaluate a parse tree, given the variables and
+    functions returned by add_defaults. If `samples` is True, they evaluate it
+    over numpy arrays of samples of the variables.
+    """
+    if case_sensitive:
+        casify = lambda x: x
+    else:
+        casify = lambda x: x.lower()  # Lowercase for case insens.
+
+    actions = {
+        'number': eval_number,
+        'variable': lambda x: all_variables[casify(x[0])],
+        'function': lambda x: all_functions[casify(x[0])](x[1]),
+    }
+    if samples:
+        actions.update({
+            'atom': eval_atom_samples,
+            'power': eval_power_samples,
+            'parallel': eval_parallel_samples,
+            'product': eval_product_samples,
+            'sum': eval_sum_samples,
+        })
+    else:
+        actions.update({
+            'atom': eval_atom,
+            'power': eval_power,
+            'parallel': eval_parallel,
+            'product': eval_product,
+            'sum': eval_sum,
+        })
+    return actions
+
+
 def evaluator(variables, functions, math_expr, case_sensitive=False):
     """
     Evaluate an expression; that is, take a string of math and return a float.
@@ -229,8 +355,7 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         return float('nan')
 
     # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    math_interpreter = parse_expression(math_expr, case_sensitive)
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
@@ -239,23 +364,50 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     math_interpreter.check_variables(all_variables, all_functions)
 
     # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+    return math_interpreter.reduce_tree(evaluate_actions(all_variables, all_functions, case_sensitive))
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
+
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for many sets of values of its variables.
+
+    `variables_list` is a list of dictionaries of variables as passed to
+    evaluator(), which must all have the same keys. Return the list of what
+    evaluator() returns for each of them, or raise what it raises for the
+    first one it raises for.
+
+    The expression is parsed once, and evaluated once over numpy arrays of all
+    the samples of each variable. If that fails (e.g. because it uses a
+    function which only takes scalars, like factorial), or gives any value
+    which isn't finite, the samples are evaluated one by one, so that errors
+    like division by zero are raised just as they are by evaluator().
+    """
+    if not variables_list:
+        return []
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+    samples = {
+        name: numpy.array([variables[name] for variables in variables_list])
+        for name in variables_list[0]
     }
+    all_variables, all_functions = add_defaults(samples, functions, case_sensitive)
+    math_interpreter.check_variables(all_variables, all_functions)
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+    try:
+        with numpy.errstate(all='ignore'):
+            results = math_interpreter.reduce_tree(
+                evaluate_actions(all_variables, all_functions, case_sensitive, samples=True)
+            )
+            # Expressions without variables evaluate to a single value.
+            results = numpy.asarray(results) + numpy.zeros(len(variables_list))
+            if results.shape == (len(variables_list),) and numpy.all(numpy.isfinite(results)):
+                return list(results)
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+    return [evaluator(variables, functions, math_expr, case_sensitive) for variables in variables_list]
 
 
 class ParseAugmenter(object):
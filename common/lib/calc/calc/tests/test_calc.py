@@ -559,3 +559,56 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Test that calc.evaluate_samples gives the same results as calling
+    calc.evaluator for each sample.
+    """
+    samples = [{'x': x, 'y': y} for x, y in [(1.5, 2.0), (-3.0, 0.25), (0.0, 7.0), (2.0, -1.0)]]
+
+    def assert_same_as_evaluator(self, expression, case_sensitive=False):
+        """
+        Check evaluate_samples against evaluator for `expression`.
+        """
+        expected = [
+            calc.evaluator(variables, {}, expression, case_sensitive=case_sensitive) for variables in self.samples
+        ]
+        results = calc.evaluate_samples(self.samples, {}, expression, case_sensitive=case_sensitive)
+        self.assertEqual(len(results), len(expected))
+        for result, expected_result in zip(results, expected):
+            if numpy.isnan(expected_result):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, expected_result)
+
+    def test_same_as_evaluator(self):
+        for expression in (
+            'x + y', '-x - 2*y + 3', 'x*y/4', 'y^x', '2^x^2', 'sin(x) + cos(y)^2', 'x || y', 'x || 2',
+            'sqrt(x)', 'i*x + y', '2*pi', 'fact(3) * x', 'arccot(y)', '5k*x + 3%', '',
+        ):
+            self.assert_same_as_evaluator(expression)
+        self.assert_same_as_evaluator('x*y + pi', case_sensitive=True)
+
+    def test_errors(self):
+        # evaluator raises these for the third sample, where x is 0
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(self.samples, {}, 'y/x')
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples(self.samples, {}, 'fact(x)')
+        # and this for the second, where x is negative
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples(self.samples, {}, 'x^0.5')
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(self.samples, {}, 'x*z')
+        with self.assertRaises(ParseException):
+            calc.evaluate_samples(self.samples, {}, 'x*')
+
+    def test_no_samples(self):
+        self.assertEqual(calc.evaluate_samples([], {}, 'x'), [])
+
+    def test_parse_cache(self):
+        tree = calc.parse_expression('x*y + 1')
+        self.assertIs(calc.parse_expression('x*y + 1'), tree)
+        self.assertIsNot(calc.parse_expression('x*y + 1', case_sensitive=True), tree)
@@ -13,8 +13,10 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
@@ -58,6 +60,36 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# The number of parsed problem templates kept by each process
+PROBLEM_TEMPLATE_CACHE_SIZE = 500
+
+# The parsed problem templates: (problem text hash, phase) -> template. The
+# only phase cached is PARSED_PHASE, whose templates are the (problem_text,
+# tree) a problem has before anything seed dependent is done to it.
+_PROBLEM_TEMPLATES = OrderedDict()
+PARSED_PHASE = 'parsed'
+
+
+def _get_problem_template(key):
+    """
+    Return the cached problem template for `key`, or None.
+    """
+    template = _PROBLEM_TEMPLATES.pop(key, None)
+    if template is not None:
+        # reinsert it as the most recently used
+        _PROBLEM_TEMPLATES[key] = template
+    return template
+
+
+def _set_problem_template(key, template):
+    """
+    Cache the problem template for `key`.
+    """
+    _PROBLEM_TEMPLATES.pop(key, None)
+    while len(_PROBLEM_TEMPLATES) >= PROBLEM_TEMPLATE_CACHE_SIZE:
+        _PROBLEM_TEMPLATES.popitem(last=False)
+    _PROBLEM_TEMPLATES[key] = template
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -154,16 +186,31 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
+        # Parsing the problem doesn't depend on the seed or state, so the result is
+        # cached, and each problem works on its own copy of the tree.
+        template_key = (self._problem_text_hash(problem_text), PARSED_PHASE)
+        template = _get_problem_template(template_key)
+        if template is not None:
+            self.problem_text, template_tree = template
+            self.tree = deepcopy(template_tree)
+        else:
+            # Convert startouttext and endouttext to proper <text></text>
+            problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+            problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+            self.problem_text = problem_text
+
+            # parse problem XML file into an element tree
+            self.tree = etree.XML(problem_text)
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
+            # Included files are read from the course's filestore, so problems which include
+            # any aren't cached.
+            has_includes = self.tree.find('.//include') is not None
 
-        # handle any <include file="foo"> tags
-        self._process_includes()
+            # handle any <include file="foo"> tags
+            self._process_includes()
+
+            if not has_includes:
+                _set_problem_template(template_key, (self.problem_text, deepcopy(self.tree)))
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
@@ -191,6 +238,15 @@ class LoncapaProblem(object):
 
         self.extracted_tree = self._extract_html(self.tree)
 
+    @staticmethod
+    def _problem_text_hash(problem_text):
+        """
+        Return a hash of `problem_text` to key its parsed template with.
+        """
+        if isinstance(problem_text, unicode):
+            problem_text = problem_text.encode('utf-8')
+        return hashlib.sha1(problem_text).hexdigest()
+
     def do_reset(self):
         """
         Reset internal state to unfinished, with no answers
@@ -4,9 +4,14 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from .worker_pool import get_worker_pool
 from dogapi import dog_stats_api
 
+from collections import OrderedDict
+from copy import deepcopy
 import hashlib
+import time
+import weakref
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -46,6 +51,73 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The modules the sandbox worker pool imports before it runs any code.
+PRELOAD_MODULES = [modname for __, modname in ASSUMED_IMPORTS]
+
+
+# The number of results kept in the in-process tier in front of each shared cache.
+LOCAL_CACHE_SIZE = 1000
+
+# The in-process tier of each shared cache passed to safe_exec: cache -> LocalCache.
+_LOCAL_CACHES = weakref.WeakKeyDictionary()
+
+
+class LocalCache(object):
+    """
+    A bounded, least recently used, in-process cache of safe_exec results.
+
+    The values returned are copies, so that code changing the globals it was
+    given can't change the cached results.
+    """
+    def __init__(self, size=None):
+        self.size = size or LOCAL_CACHE_SIZE
+        self._results = OrderedDict()
+
+    def get(self, key):
+        """
+        Return a copy of the cached result for `key`, or None.
+        """
+        result = self._results.pop(key, None)
+        if result is None:
+            return None
+        # reinsert it as the most recently used
+        self._results[key] = result
+        return deepcopy(result)
+
+    def set(self, key, result):
+        """
+        Cache `result` for `key`.
+        """
+        self._results.pop(key, None)
+        while len(self._results) >= self.size:
+            self._results.popitem(last=False)
+        self._results[key] = deepcopy(result)
+
+
+def get_local_cache(cache):
+    """
+    Return the in-process tier in front of the shared `cache`, or None if
+    there can't be one.
+    """
+    try:
+        local_cache = _LOCAL_CACHES.get(cache)
+        if local_cache is None:
+            local_cache = _LOCAL_CACHES[cache] = LocalCache()
+    except TypeError:
+        # the cache can't be weakly referenced
+        return None
+    return local_cache
+
+
+def record_cache_lookup(slug, result, start):
+    """
+    Record the result ("local", "shared" or "miss") and latency of a cache
+    lookup for the problem `slug`, which started at the time `start`.
+    """
+    tags = [u"result:{}".format(result), u"slug:{}".format(slug)]
+    dog_stats_api.increment("capa.safe_exec.cache", tags=tags)
+    dog_stats_api.histogram("capa.safe_exec.cache.latency", time.time() - start, tags=tags)
+
 
 def update_hash(hasher, obj):
     """
@@ -99,7 +171,8 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    and the random seed.  Results are also kept in a bounded in-process tier in
+    front of `cache`, which is consulted first.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -114,7 +187,19 @@ def safe_exec(
         md5er.update(repr(code))
         update_hash(md5er, safe_globals)
         key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
-        cached = cache.get(key)
+        local_cache = get_local_cache(cache)
+        start = time.time()
+        cached = local_cache.get(key) if local_cache is not None else None
+        if cached is not None:
+            record_cache_lookup(slug, "local", start)
+        else:
+            cached = cache.get(key)
+            if cached is not None:
+                record_cache_lookup(slug, "shared", start)
+                if local_cache is not None:
+                    local_cache.set(key, cached)
+            else:
+                record_cache_lookup(slug, "miss", start)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
@@ -127,9 +212,13 @@ def safe_exec(
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
 
-    # Decide which code executor to use.
+    # Decide which code executor to use.  The warm workers of the pool can
+    # only run code which doesn't need files.
+    pool = get_worker_pool(PRELOAD_MODULES)
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif pool is not None and not python_path and not extra_files:
+        exec_fn = pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -149,6 +238,8 @@ def safe_exec(
     if cache:
         cleaned_results = json_safe(globals_dict)
         cache.set(key, (emsg, cleaned_results))
+        if local_cache is not None:
+            local_cache.set(key, (emsg, cleaned_results))
 
     # If an exception happened, raise it now.
     if emsg:
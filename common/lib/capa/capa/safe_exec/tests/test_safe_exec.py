@@ -7,9 +7,12 @@ import random
 import textwrap
 import unittest
 
+from dogapi import dog_stats_api
+from mock import ANY, patch
 from nose.plugins.skip import SkipTest
 
 from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec.safe_exec import LocalCache
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -177,6 +180,67 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestLocalCache(unittest.TestCase):
+    """Test the in-process tier in front of the shared cache."""
+
+    def test_local_hit(self):
+        cache = DictCache({})
+        safe_exec("a = int(math.pi)", {}, cache=cache)
+
+        # The shared cache isn't asked again.
+        with patch.object(cache, 'get') as mock_get:
+            g = {}
+            safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertFalse(mock_get.called)
+        self.assertEqual(g['a'], 3)
+
+    def test_shared_hit_cached_locally(self):
+        shared = {}
+        safe_exec("a = int(math.pi)", {}, cache=DictCache(shared))
+
+        cache = DictCache(shared)
+        with patch.object(cache, 'get', wraps=cache.get) as mock_get:
+            for __ in xrange(2):
+                g = {}
+                safe_exec("a = int(math.pi)", g, cache=cache)
+                self.assertEqual(g['a'], 3)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_results_copied(self):
+        cache = DictCache({})
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=cache)
+        g['a'].append(3)
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=cache)
+        g['a'].append(4)
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=cache)
+        self.assertEqual(g['a'], [1, 2])
+
+    def test_lookups_recorded(self):
+        cache = DictCache({})
+        with patch.object(dog_stats_api, 'increment') as mock_increment:
+            with patch.object(dog_stats_api, 'histogram') as mock_histogram:
+                safe_exec("a = 1", {}, cache=cache, slug="problem_1")
+                safe_exec("a = 1", {}, cache=cache, slug="problem_1")
+        results = [call[1]['tags'][0] for call in mock_increment.call_args_list]
+        self.assertEqual(results, [u"result:miss", u"result:local"])
+        mock_histogram.assert_any_call(
+            "capa.safe_exec.cache.latency", ANY, tags=[u"result:local", u"slug:problem_1"]
+        )
+
+    def test_size(self):
+        local_cache = LocalCache(size=2)
+        for key in "abc":
+            local_cache.set(key, (None, {}))
+        local_cache.get("b")
+        local_cache.set("d", (None, {}))
+        self.assertIsNone(local_cache.get("a"))
+        self.assertIsNone(local_cache.get("c"))
+        self.assertEqual(local_cache.get("b"), (None, {}))
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
@@ -0,0 +1,151 @@
+"""Test worker_pool.py"""
+
+import sys
+import time
+import unittest
+
+from mock import patch
+from nose.plugins.skip import SkipTest
+
+from capa.safe_exec.safe_exec import CODE_PROLOG, LAZY_IMPORTS, PRELOAD_MODULES
+from capa.safe_exec.worker_pool import WorkerPool
+from codejail.jail_code import COMMANDS, is_configured
+from codejail.safe_exec import SafeExecException, safe_exec as codejail_safe_exec
+
+# The workers of these tests run this Python, unsandboxed.
+PYTHON_COMMAND = [sys.executable, "-E", "-B"]
+
+
+class TestWorkerPool(unittest.TestCase):
+    def make_pool(self, **kwargs):
+        pool = WorkerPool(PYTHON_COMMAND, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_set_values(self):
+        pool = self.make_pool()
+        g = {'b': 2}
+        pool.safe_exec("a = b * 17", g)
+        self.assertEqual(g, {'a': 34, 'b': 2})
+
+    def test_prolog(self):
+        pool = self.make_pool(preload=["math"])
+        g = {}
+        pool.safe_exec(CODE_PROLOG % 17 + LAZY_IMPORTS + "a = 1/2\nb = int(math.pi)", g)
+        self.assertEqual(g['a'], 0.5)
+        self.assertEqual(g['b'], 3)
+
+    def test_raising_exceptions(self):
+        pool = self.make_pool()
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            pool.safe_exec("a = 1\n1/0", g)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+        self.assertEqual(g, {})
+
+    def run_pids(self, pool, executions):
+        """
+        Return the (worker pid, process pid) each of `executions` runs in.
+        """
+        pids = []
+        for __ in xrange(executions):
+            g = {}
+            pool.safe_exec("import os; pids = [os.getppid(), os.getpid()]", g)
+            pids.append(tuple(g['pids']))
+        return pids
+
+    def test_workers_reused(self):
+        pids = self.run_pids(self.make_pool(max_executions=2), 3)
+        self.assertEqual(pids[0][0], pids[1][0])
+        self.assertNotEqual(pids[1][0], pids[2][0])
+        # Each piece of code runs in a process of its own.
+        self.assertEqual(len(set(pid for __, pid in pids)), 3)
+
+    def test_memory_limit(self):
+        pids = self.run_pids(self.make_pool(max_memory=1), 2)
+        self.assertNotEqual(pids[0][0], pids[1][0])
+
+    def test_modules_restored(self):
+        pool = self.make_pool()
+        pool.safe_exec("import sys, random; sys.modules['random'] = random.Random(1)", {})
+        g = {}
+        pool.safe_exec("import random; a = hasattr(random, 'SystemRandom')", g)
+        self.assertTrue(g['a'])
+
+    def test_module_contents_restored(self):
+        pool = self.make_pool(preload=["math"])
+        pool.safe_exec("import math; math.pi = 3", {})
+        g = {}
+        pool.safe_exec("import math; a = math.pi", g)
+        self.assertEqual(g['a'], 3.141592653589793)
+
+    def test_forged_output(self):
+        pool = self.make_pool()
+        code = (
+            "import os, sys\n"
+            "sys.__stdout__.write('12\\n{\"globals\": 1}')\n"
+            "sys.__stdout__.flush()\n"
+            "os.write(1, 'junk')\n"
+            "a = 1"
+        )
+        g = {}
+        pool.safe_exec(code, g)
+        self.assertEqual(g, {'a': 1})
+        g = {}
+        pool.safe_exec("b = 2", g)
+        self.assertEqual(g, {'b': 2})
+
+    def test_real_time_limit(self):
+        pool = self.make_pool()
+        with patch.dict("codejail.jail_code.LIMITS", {"REALTIME": 1, "CPU": 0}):
+            with self.assertRaises(SafeExecException):
+                pool.safe_exec("import time; time.sleep(5)", {})
+        # The worker goes on running code.
+        g = {}
+        pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_busy_pool(self):
+        pool = self.make_pool(size=1)
+        busy = pool._checkout()  # pylint: disable=protected-access
+        g = {}
+        pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+        pool._checkin(busy)  # pylint: disable=protected-access
+        self.assertEqual(len(pool._idle), 1)  # pylint: disable=protected-access
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class WorkerPoolBenchmark(unittest.TestCase):
+    """
+    Compare how many executions per second the worker pool and codejail's
+    process per execution can run.
+    """
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    EXECUTIONS = 50
+
+    CODE = "a = numpy.array([random.random() for __ in xrange(10)]).sum()"
+
+    def run_executions(self, exec_fn):
+        """
+        Return the executions per second of `exec_fn`.
+        """
+        start = time.time()
+        for seed in xrange(self.EXECUTIONS):
+            exec_fn(CODE_PROLOG % seed + LAZY_IMPORTS + self.CODE, {})
+        return self.EXECUTIONS / (time.time() - start)
+
+    def test_executions_per_second(self):
+        if not is_configured("python"):
+            raise SkipTest("CodeJail isn't configured for python.")
+
+        pool = WorkerPool(COMMANDS["python"], PRELOAD_MODULES, size=1)
+        self.addCleanup(pool.close)
+        pooled = self.run_executions(pool.safe_exec)
+        forked = self.run_executions(codejail_safe_exec)
+        self.assertGreater(pooled, forked)
@@ -0,0 +1,484 @@
+"""
+A pool of warm sandboxed Python workers for safe_exec.
+
+codejail runs each piece of code in a new sandboxed Python process, which has
+to start the interpreter and import numpy, scipy and the rest of the assumed
+imports before it runs anything.  A worker in this pool is the same sandboxed
+Python, run as the same user, under the same AppArmor profile and with the
+same resource limits, but it's started ahead of time with those modules
+already imported.  For each piece of code sent to it, the worker forks a
+child process which runs the code, so every piece of code still runs in a
+process of its own, which no other code has run in, without paying for the
+imports again.
+
+The child's stdin, stdout and stderr are /dev/null, and it sends its result
+back to the worker over a pipe made for it alone, so code can't see the
+requests sent to the worker or write into its responses.  Messages between
+the pool and a worker are length-prefixed, and a worker which writes anything
+unexpected is killed.
+
+A worker is replaced after it has run `max_executions` pieces of code, when
+its memory use grows past `max_memory` bytes, and whenever it fails.  The
+replacement is started at once, so that it's warm by the time it's needed.
+
+Code which needs extra files or a python path isn't run by the pool.
+
+The pool is configured by the "worker_pool" key of the CODE_JAIL setting::
+
+    CODE_JAIL = {
+        'worker_pool': {
+            # How many warm workers to keep?  0 turns the pool off.
+            'size': 4,
+            # How many pieces of code can a worker run?
+            'max_executions': 100,
+            # How much memory (in bytes) can a worker grow to?  0 means no limit.
+            'max_memory': 100000000,
+        },
+    }
+"""
+import json
+import logging
+import os
+import os.path
+import resource
+import select
+import shutil
+import subprocess
+import tempfile
+import textwrap
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+
+log = logging.getLogger(__name__)
+
+# How many seconds a new worker has to import its modules and become ready.
+STARTUP_TIMEOUT = 30
+
+# How many CPU seconds a worker can use to start, on top of the CPU limit of
+# each piece of code it runs.
+STARTUP_CPU = 10
+
+# How many seconds past the real time limit of a piece of code a worker has to
+# answer, before it's taken to have hung.
+ANSWER_GRACE = 5
+
+# The most digits in the length prefix of a message from a worker.
+MAX_LENGTH_DIGITS = 10
+
+# The program each worker runs.  It reads a [code, globals, cpu limit, real
+# time limit] request from each message on its stdin, runs the code in a
+# child process, and writes a {"globals", "error", "maxrss"} response in a
+# message on its stdout.  A message is its length in bytes, a newline, and
+# then its data.
+WORKER_CODE = textwrap.dedent("""\
+    import json
+    import os
+    import resource
+    import select
+    import signal
+    import sys
+    import time
+    import traceback
+
+    for name in sys.argv[1:]:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+
+    OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+
+    def jsonable(value):
+        if not isinstance(value, OK_TYPES):
+            return False
+        try:
+            json.dumps(value)
+        except Exception:
+            return False
+        return True
+
+    def read_exactly(fd, size):
+        data = []
+        while size:
+            chunk = os.read(fd, size)
+            if not chunk:
+                raise EOFError()
+            data.append(chunk)
+            size -= len(chunk)
+        return "".join(data)
+
+    def read_message(fd):
+        header = ""
+        while not header.endswith("\\n"):
+            header += read_exactly(fd, 1)
+        return read_exactly(fd, int(header))
+
+    def write_message(fd, message):
+        data = "%d\\n%s" % (len(message), message)
+        while data:
+            data = data[os.write(fd, data):]
+
+    def run(code, g_dict, cpu, result_fd):
+        # The child: only the result pipe leads back to the worker.
+        try:
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            os.close(devnull)
+
+            resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+            if cpu:
+                soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+                if hard != resource.RLIM_INFINITY:
+                    cpu = min(cpu, hard)
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu, hard))
+
+            try:
+                exec code in g_dict
+            except BaseException:
+                error = traceback.format_exc()
+                g_dict = {}
+            else:
+                error = None
+
+            g_dict = dict(
+                (key, value) for key, value in g_dict.iteritems()
+                if key != "__builtins__" and jsonable(value)
+            )
+            write_message(result_fd, json.dumps({"globals": g_dict, "error": error}))
+        finally:
+            os._exit(0)
+
+    def collect(pid, result_fd, realtime):
+        # Read everything the child sends, until it exits or runs out of time.
+        deadline = time.time() + realtime if realtime else None
+        chunks = []
+        while True:
+            timeout = max(deadline - time.time(), 0) if deadline is not None else None
+            readable, __, __ = select.select([result_fd], [], [], timeout)
+            if not readable:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                return {"globals": {}, "error": "The code ran out of time"}
+            chunk = os.read(result_fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        os.waitpid(pid, 0)
+
+        data = "".join(chunks)
+        header, __, message = data.partition("\\n")
+        try:
+            if not header.isdigit() or int(header) != len(message):
+                raise ValueError()
+            result = json.loads(message)
+            return {"globals": dict(result["globals"]), "error": result["error"]}
+        except Exception:
+            return {"globals": {}, "error": "The code didn't return a result"}
+
+    write_message(1, "ready")
+
+    while True:
+        try:
+            request = read_message(0)
+        except EOFError:
+            break
+        code, g_dict, cpu, realtime = json.loads(request)
+
+        result_read, result_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(result_read)
+            run(code, g_dict, cpu, result_write)
+        os.close(result_write)
+        try:
+            response = collect(pid, result_read, realtime)
+        finally:
+            os.close(result_read)
+
+        response["maxrss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        write_message(1, json.dumps(response))
+""")
+
+
+class WorkerFailed(Exception):
+    """
+    A worker died, or didn't answer in time.
+    """
+    pass
+
+
+def _set_worker_limits(max_executions):
+    """
+    Set the resource limits of a new worker process, from codejail's limits.
+
+    The worker forks a child to run each piece of code, which limits itself
+    to the CPU of a single piece of code and to no subprocesses of its own.
+    The worker's own CPU limit is what it can use between its executions.
+    """
+    cpu = jail_code.LIMITS.get("CPU")
+    if cpu:
+        total = cpu * max_executions + STARTUP_CPU
+        resource.setrlimit(resource.RLIMIT_CPU, (total, total + 1))
+
+    # No files written.
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+    vmem = jail_code.LIMITS.get("VMEM")
+    if vmem:
+        resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process that runs pieces of code sent to it.
+
+    `command` is the argv to run the sandboxed Python, and `preload` the names
+    of the modules it imports when it starts.
+    """
+    def __init__(self, command, preload, max_executions):
+        self.executions = 0
+        self.maxrss = 0
+        self.failed = False
+        self._ready = False
+        self._buffer = ""
+
+        self.tmpdir = tempfile.mkdtemp(prefix="codejail-")
+        # The sandbox user needs to be able to read the worker's program.
+        os.chmod(self.tmpdir, 0775)
+        with open(os.path.join(self.tmpdir, "worker.py"), "w") as worker_file:
+            worker_file.write(WORKER_CODE)
+
+        with open(os.devnull, "w") as devnull:
+            self.process = subprocess.Popen(
+                command + ["worker.py"] + list(preload),
+                preexec_fn=lambda: _set_worker_limits(max_executions),
+                cwd=self.tmpdir, env={},
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+            )
+
+    def run(self, code, globals_dict):
+        """
+        Run `code` with the globals in `globals_dict`, and return the resulting
+        globals and the error message, if the code raised an exception or ran
+        out of time.
+
+        Raises WorkerFailed if the worker died, hung, or wrote anything but a
+        response.
+        """
+        if not self._ready:
+            if self._read_message(time.time() + STARTUP_TIMEOUT) != "ready":
+                self._fail("The worker didn't start")
+            self._ready = True
+
+        realtime = jail_code.LIMITS.get("REALTIME")
+        deadline = time.time() + realtime + ANSWER_GRACE if realtime else None
+        request = json.dumps([code, json_safe(globals_dict), jail_code.LIMITS.get("CPU"), realtime])
+        self.executions += 1
+        try:
+            self.process.stdin.write("%d\n%s" % (len(request), request))
+            self.process.stdin.flush()
+        except (IOError, OSError):
+            self._fail("The worker exited")
+
+        message = self._read_message(deadline)
+        if self._buffer:
+            self._fail("The worker wrote more than its response")
+        try:
+            response = json.loads(message)
+            results, error, maxrss = response["globals"], response["error"], response["maxrss"]
+        except (ValueError, TypeError, KeyError):
+            self._fail("The worker wrote a malformed response")
+        self.maxrss = maxrss * 1024
+        return results, error
+
+    def _fail(self, message):
+        """
+        Mark the worker as failed, so that it's killed, and raise WorkerFailed.
+        """
+        self.failed = True
+        raise WorkerFailed(message)
+
+    def _read_message(self, deadline):
+        """
+        Return the data of the next message the worker writes.
+        """
+        header = self._read(deadline, lambda: "\n" in self._buffer, MAX_LENGTH_DIGITS + 1)
+        header, self._buffer = self._buffer.split("\n", 1)
+        if not header.isdigit():
+            self._fail("The worker wrote an unexpected message")
+        length = int(header)
+        self._read(deadline, lambda: len(self._buffer) >= length, None)
+        message, self._buffer = self._buffer[:length], self._buffer[length:]
+        return message
+
+    def _read(self, deadline, done, max_size):
+        """
+        Read from the worker into the buffer until `done()`.  The worker fails
+        if it writes `max_size` bytes first.
+        """
+        fileno = self.process.stdout.fileno()
+        while not done():
+            if max_size is not None and len(self._buffer) >= max_size:
+                self._fail("The worker wrote an unexpected message")
+            timeout = max(deadline - time.time(), 0) if deadline is not None else None
+            readable, __, __ = select.select([fileno], [], [], timeout)
+            if not readable:
+                self._fail("The worker ran out of time")
+            data = os.read(fileno, 65536)
+            if not data:
+                self._fail("The worker exited")
+            self._buffer += data
+
+    def close(self):
+        """
+        Stop the worker and remove its files.
+        """
+        try:
+            self.process.stdin.close()
+            if self.failed:
+                self.process.kill()
+        except (IOError, OSError):
+            pass
+        try:
+            self.process.wait()
+        except OSError:
+            pass
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class WorkerPool(object):
+    """
+    A pool of `size` warm SandboxWorkers.
+
+    If all the workers are busy, code is run by a new worker, which is kept
+    only if the pool has room for it when it's done.
+    """
+    def __init__(self, command, preload=(), size=1, max_executions=100, max_memory=0):
+        self.command = list(command)
+        self.preload = list(preload)
+        self.size = size
+        self.max_executions = max_executions
+        self.max_memory = max_memory
+        self._idle = []
+        self._lock = threading.Lock()
+        for __ in xrange(size):
+            self._idle.append(self._start_worker())
+
+    def _start_worker(self):
+        """
+        Start a new worker.
+        """
+        return SandboxWorker(self.command, self.preload, self.max_executions)
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute python code in a worker, like codejail's safe_exec.
+
+        Any changes the code makes to the globals in `globals_dict` are visible
+        in `globals_dict` when this function returns.  If the code raises an
+        exception, SafeExecException is raised.
+        """
+        assert not python_path and not extra_files, "The pool can't run code which needs files"
+
+        worker = self._checkout()
+        try:
+            results, error = worker.run(code, globals_dict)
+        except WorkerFailed as err:
+            log.warning("Sandbox worker failed running %s: %s", slug, err)
+            raise SafeExecException("Couldn't execute jailed code: %s" % err)
+        finally:
+            self._checkin(worker)
+
+        if error:
+            raise SafeExecException("Couldn't execute jailed code: %s" % error)
+        globals_dict.update(results)
+
+    def _checkout(self):
+        """
+        Take an idle worker, or start one if there are none.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._start_worker()
+
+    def _checkin(self, worker):
+        """
+        Return a worker to the pool, replacing it if it's done.
+        """
+        retire = (
+            worker.failed or
+            worker.executions >= self.max_executions or
+            (self.max_memory and worker.maxrss > self.max_memory)
+        )
+        if retire:
+            worker.close()
+            worker = None
+
+        with self._lock:
+            if len(self._idle) >= self.size:
+                keep, start = False, False
+            else:
+                keep, start = worker is not None, worker is None
+            if keep:
+                self._idle.append(worker)
+
+        if start:
+            replacement = self._start_worker()
+            with self._lock:
+                self._idle.append(replacement)
+        elif worker is not None and not keep:
+            worker.close()
+
+    def close(self):
+        """
+        Stop all the idle workers.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+
+# The pool configuration, set by configure_worker_pool.
+WORKER_POOL_CONFIG = {
+    'size': 0,
+    'max_executions': 100,
+    'max_memory': 0,
+}
+
+# The pool of this process, created on first use, so that each forked web
+# server process starts its own workers: {'pid': pid, 'pool': pool}.
+_WORKER_POOL = {}
+
+
+def configure_worker_pool(**options):
+    """
+    Configure the worker pool, with the options described in the module docstring.
+    """
+    WORKER_POOL_CONFIG.update(options)
+    _WORKER_POOL.clear()
+
+
+def get_worker_pool(preload):
+    """
+    Return the worker pool of this process, or None if it's turned off or
+    codejail isn't configured to run Python.
+
+    `preload` is the names of the modules each worker imports when it starts.
+    """
+    if not WORKER_POOL_CONFIG['size'] or not jail_code.is_configured("python"):
+        return None
+    if _WORKER_POOL.get('pid') != os.getpid():
+        _WORKER_POOL['pid'] = os.getpid()
+        _WORKER_POOL['pool'] = WorkerPool(
+            jail_code.COMMANDS["python"], preload,
+            size=WORKER_POOL_CONFIG['size'],
+            max_executions=WORKER_POOL_CONFIG['max_executions'],
+            max_memory=WORKER_POOL_CONFIG['max_memory'],
+        )
+    return _WORKER_POOL['pool']
@@ -0,0 +1,61 @@
+"""
+Tests for the parsed problem template cache of LoncapaProblem.
+"""
+import textwrap
+import unittest
+
+from lxml import etree
+from mock import patch
+
+from capa import capa_problem
+from capa.tests import new_loncapa_problem
+
+
+class ProblemTemplateCacheTest(unittest.TestCase):
+    """
+    Test that problems are parsed once and each gets its own copy of the tree.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <p>What is 1 + 1?</p>
+            <numericalresponse answer="2">
+                <textline/>
+            </numericalresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ProblemTemplateCacheTest, self).setUp()
+        capa_problem._PROBLEM_TEMPLATES.clear()  # pylint: disable=protected-access
+
+    def test_parsed_once(self):
+        with patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            first = new_loncapa_problem(self.xml, seed=1)
+            second = new_loncapa_problem(self.xml, seed=2)
+        problem_parses = [call for call in mock_xml.call_args_list if call[0][0] == self.xml]
+        self.assertEqual(len(problem_parses), 1)
+
+        self.assertIsNot(first.tree, second.tree)
+        self.assertEqual(first.problem_text, second.problem_text)
+        self.assertEqual(first.get_html(), second.get_html())
+
+    def test_changes_not_shared(self):
+        first = new_loncapa_problem(self.xml)
+        first.tree.find('.//p').text = 'Changed'
+        second = new_loncapa_problem(self.xml)
+        self.assertEqual(second.tree.find('.//p').text, 'What is 1 + 1?')
+
+    def test_includes_not_cached(self):
+        xml = '<problem><include file="missing_include.xml"/></problem>'
+        with patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            new_loncapa_problem(xml)
+            new_loncapa_problem(xml)
+        # the problem is parsed each time (the missing included file is skipped in DEBUG)
+        problem_parses = [call for call in mock_xml.call_args_list if call[0][0] == xml]
+        self.assertEqual(len(problem_parses), 2)
+
+    def test_cache_size(self):
+        with patch('capa.capa_problem.PROBLEM_TEMPLATE_CACHE_SIZE', 2):
+            for answer in range(3):
+                new_loncapa_problem(self.xml.replace('answer="2"', 'answer="{}"'.format(answer)))
+        self.assertEqual(len(capa_problem._PROBLEM_TEMPLATES), 2)  # pylint: disable=protected-access
@@ -7,6 +7,9 @@ XASSET_THUMBNAIL_TAIL_NAME = '.jpg'
 
 STREAM_DATA_CHUNK_SIZE = 1024
 
+# The most data read from a stream at once: streams from GridFS are read a GridFS chunk at a time, up to this size
+MAX_STREAM_BUFFER_SIZE = 256 * 1024
+
 import os
 import logging
 import StringIO
@@ -21,7 +24,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -33,6 +36,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # a digest of the data (the md5 GridFS keeps of it), or None if unknown
+        self.content_digest = content_digest
 
     @property
     def is_thumbnail(self):
@@ -157,6 +162,12 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        yield self._data[first_byte:last_byte + 1]
+
     @staticmethod
     def serialize_asset_key_with_slash(asset_key):
         """
@@ -171,15 +182,25 @@ class StaticContent(object):
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
+    @property
+    def buffer_size(self):
+        """
+        The number of bytes to read from the stream at once: the stream's chunk size, if it has one (as
+        GridFS files do), so that each read returns one stored chunk, but at most MAX_STREAM_BUFFER_SIZE.
+        """
+        return min(getattr(self._stream, 'chunk_size', STREAM_DATA_CHUNK_SIZE), MAX_STREAM_BUFFER_SIZE)
+
     def stream_data(self):
+        self._stream.seek(0)
+        buffer_size = self.buffer_size
         while True:
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
+            chunk = self._stream.read(buffer_size)
             if len(chunk) == 0:
                 break
             yield chunk
@@ -189,14 +210,13 @@ class StaticContentStream(StaticContent):
         Stream the data between first_byte and last_byte (included)
         """
         self._stream.seek(first_byte)
-        position = first_byte
-        while True:
-            if last_byte < position + STREAM_DATA_CHUNK_SIZE - 1:
-                chunk = self._stream.read(last_byte - position + 1)
-                yield chunk
+        buffer_size = self.buffer_size
+        remaining = last_byte - first_byte + 1
+        while remaining > 0:
+            chunk = self._stream.read(min(remaining, buffer_size))
+            if len(chunk) == 0:
                 break
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
-            position += STREAM_DATA_CHUNK_SIZE
+            remaining -= len(chunk)
             yield chunk
 
     def close(self):
@@ -206,7 +226,8 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_digest=self.content_digest)
         return content
 
 
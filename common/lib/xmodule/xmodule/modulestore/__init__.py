@@ -283,6 +283,12 @@ class EditInfo(object):
     """
     Encapsulates the editing info of a block.
     """
+    # There's one of these for every block of every loaded structure, so don't give each a __dict__.
+    __slots__ = (
+        'previous_version', 'update_version', 'source_version', 'edited_on', 'edited_by',
+        'original_usage', 'original_usage_version', '_subtree_edited_on', '_subtree_edited_by',
+    )
+
     def __init__(self, **kwargs):
         self.from_storable(kwargs)
 
@@ -345,6 +351,8 @@ class BlockData(object):
     Allows the storing of meta-information about a structure that doesn't persist along with
     the structure itself.
     """
+    __slots__ = ('fields', 'block_type', 'definition', 'defaults', 'edit_info', 'definition_loaded')
+
     def __init__(self, **kwargs):
         # Has the definition been loaded?
         self.definition_loaded = False
@@ -757,7 +765,7 @@ class ModuleStoreRead(ModuleStoreAssetBase):
             xblock, fields = (block, block.fields)
         elif isinstance(block, BlockData):
             # BlockData is an object - compare its attributes in dict form.
-            xblock, fields = (None, block.__dict__)
+            xblock, fields = (None, {name: getattr(block, name) for name in BlockData.__slots__})
         else:
             xblock, fields = (None, block)
 
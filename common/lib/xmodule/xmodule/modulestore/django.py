@@ -23,6 +23,7 @@ import django.utils
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.draft_and_published import BranchSettingMixin
 from xmodule.modulestore.mixed import MixedModuleStore
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.util.django import get_current_request_hostname
 import xblock.reference.plugins
 
@@ -53,7 +54,8 @@ class SignalHandler(object):
     This class is to allow the modulestores to emit signals that can be caught
     by other parts of the Django application. If your app needs to do something
     every time a course is published (e.g. search indexing), you can listen for
-    that event and kick off a celery task when it happens.
+    that event and kick off a celery task when it happens. The course_deleted
+    signal is sent, with the same arguments, when a course is deleted.
 
     To listen for a signal, do the following::
 
@@ -80,9 +82,11 @@ class SignalHandler(object):
 
     """
     course_published = django.dispatch.Signal(providing_args=["course_key"])
+    course_deleted = django.dispatch.Signal(providing_args=["course_key"])
 
     _mapping = {
-        "course_published": course_published
+        "course_published": course_published,
+        "course_deleted": course_deleted,
     }
 
     def __init__(self, modulestore_class):
@@ -146,6 +150,12 @@ def create_modulestore_instance(
     if issubclass(class_, MixedModuleStore):
         _options['create_modulestore_instance'] = create_modulestore_instance
 
+    if issubclass(class_, SplitMongoModuleStore):
+        try:
+            _options['shared_structure_cache'] = get_cache('split_structures')
+        except InvalidCacheBackendError:
+            pass
+
     if issubclass(class_, BranchSettingMixin):
         _options['branch_setting_func'] = _get_modulestore_branch_setting
 
@@ -68,6 +68,10 @@ BLOCK_TYPES_WITH_CHILDREN = list(set(
     name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
 ))
 
+# The key in a cached metadata inheritance tree of its version stamp, which changes whenever the tree does.
+# (No location url can be equal to it.)
+METADATA_INHERITANCE_TREE_VERSION = '_version'
+
 # Allow us to call _from_deprecated_(son|string) throughout the file
 # pylint: disable=protected-access
 
@@ -638,12 +642,12 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
-        '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
-        '''
+    def _inheritance_query(self, course_id):
+        """
+        Return the query and the field filter which find the records of the course's containers
+        with the fields needed to compute the metadata inheritance tree.
+        """
         # get all collections in the course, this query should not return any leaf nodes
-        course_id = self.fill_in_run(course_id)
         query = SON([
             ('_id.tag', 'i4x'),
             ('_id.org', course_id.org),
@@ -661,13 +665,17 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
+        return query, record_filter
 
+    def _index_inheritance_records(self, course_id, resultset, results_by_url=None):
+        """
+        Add the container records in resultset to results_by_url (a dict keyed by location url)
+        and return it, merging the children of the draft and published versions of each record.
+        """
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
-        results_by_url = {}
-        root = None
+        if results_by_url is None:
+            results_by_url = {}
 
         # now go through the results and order them by the location url
         for result in resultset:
@@ -686,42 +694,138 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
             else:
                 results_by_url[location_url] = result
-            if location.category == 'course':
+
+        return results_by_url
+
+    def _compute_inherited_metadata(self, results_by_url, url, metadata_to_inherit):
+        """
+        Compute the metadata inherited by the descendants of url into metadata_to_inherit, given
+        the container records in results_by_url. results_by_url[url]['metadata'] must already
+        hold all of the metadata that url passes down.
+        """
+        my_metadata = results_by_url[url].get('metadata', {})
+
+        # go through all the children and recurse, but only if we have
+        # in the result set. Remember results will not contain leaf nodes
+        for child in results_by_url[url].get('definition', {}).get('children', []):
+            if child in results_by_url:
+                new_child_metadata = copy.deepcopy(my_metadata)
+                new_child_metadata.update(results_by_url[child].get('metadata', {}))
+                results_by_url[child]['metadata'] = new_child_metadata
+                metadata_to_inherit[child] = new_child_metadata
+                self._compute_inherited_metadata(results_by_url, child, metadata_to_inherit)
+            else:
+                # this is likely a leaf node, so let's record what metadata we need to inherit
+                metadata_to_inherit[child] = my_metadata.copy()
+            # WARNING: 'parent' is not part of inherited metadata, but
+            # we're piggybacking on this recursive traversal to grab
+            # and cache the child's parent, as a performance optimization.
+            # The 'parent' key will be popped out of the dictionary during
+            # CachingDescriptorSystem.load_item
+            metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        course_id = self.fill_in_run(course_id)
+        query, record_filter = self._inheritance_query(course_id)
+
+        # call out to the DB
+        results_by_url = self._index_inheritance_records(course_id, self.collection.find(query, record_filter))
+        root = None
+        for location_url, result in results_by_url.iteritems():
+            if result['_id']['category'] == 'course':
                 root = location_url
 
         # now traverse the tree and compute down the inherited metadata
         metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
-
         if root is not None:
-            _compute_inherited_metadata(root)
+            self._compute_inherited_metadata(results_by_url, root, metadata_to_inherit)
 
         return metadata_to_inherit
 
+    def _update_metadata_inheritance_subtree(self, course_id, tree, location):
+        """
+        Return a copy of the metadata inheritance tree `tree` in which the entries for location and
+        its descendants are recomputed from the db, or None if that can't be done (e.g. because
+        location isn't in the tree yet) and the whole tree must be recomputed.
+        """
+        branch = self.get_branch_setting()
+        location_url = unicode(as_published(location))
+        if location_url not in tree:
+            return None
+        parent_url = tree[location_url].get('parent', {}).get(branch)
+        if parent_url is None:
+            return None
+
+        # The metadata location's parent passes down. The course root isn't in the tree, as it isn't
+        # anyone's child, so its record is fetched.
+        if parent_url in tree:
+            parent_metadata = {key: value for key, value in tree[parent_url].iteritems() if key != 'parent'}
+        else:
+            parent_records = self._find_inheritance_records(course_id, [parent_url])
+            if parent_url not in parent_records:
+                return None
+            parent_metadata = parent_records[parent_url].get('metadata', {})
+
+        # Load location and the containers below it, a level at a time
+        results_by_url = self._find_inheritance_records(course_id, [location_url])
+        if location_url not in results_by_url:
+            return None
+        to_process = [location_url]
+        while to_process:
+            children = set()
+            for url in to_process:
+                children.update(
+                    child for child in results_by_url[url].get('definition', {}).get('children', [])
+                    if child not in results_by_url
+                )
+            to_process = [
+                url for url in self._find_inheritance_records(course_id, children, results_by_url)
+                if url in children
+            ]
+
+        location_metadata = copy.deepcopy(parent_metadata)
+        location_metadata.update(results_by_url[location_url].get('metadata', {}))
+        results_by_url[location_url]['metadata'] = location_metadata
+        subtree = {location_url: location_metadata}
+        self._compute_inherited_metadata(results_by_url, location_url, subtree)
+        location_metadata.setdefault('parent', {})[branch] = parent_url
+
+        # Drop the old entries under location: any which are still there have been recomputed, and
+        # any which aren't (because they were removed from the subtree) shouldn't be in the tree.
+        children_by_parent = {}
+        for url, metadata in tree.iteritems():
+            if isinstance(metadata, dict):
+                children_by_parent.setdefault(metadata.get('parent', {}).get(branch), []).append(url)
+        new_tree = dict(tree)
+        to_remove = [location_url]
+        while to_remove:
+            url = to_remove.pop()
+            new_tree.pop(url, None)
+            to_remove.extend(children_by_parent.get(url, []))
+        new_tree.update(subtree)
+        return new_tree
+
+    def _find_inheritance_records(self, course_id, urls, results_by_url=None):
+        """
+        Load the records of the containers among the location urls in `urls` into results_by_url
+        (as in _compute_metadata_inheritance_tree) and return it.
+        """
+        if results_by_url is None:
+            results_by_url = {}
+        names = set(course_id.make_usage_key_from_deprecated_string(url).name for url in urls)
+        if not names:
+            return results_by_url
+        query, record_filter = self._inheritance_query(course_id)
+        query['_id.name'] = {'$in': list(names)}
+        resultset = [
+            result for result in self.collection.find(query, record_filter)
+            if unicode(as_published(Location._from_deprecated_son(result['_id'], course_id.run))) in urls
+        ]
+        return self._index_inheritance_records(course_id, resultset, results_by_url)
+
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
@@ -746,14 +850,21 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         if not tree:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
+            tree[METADATA_INHERITANCE_TREE_VERSION] = uuid4().hex
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
             if self.metadata_inheritance_cache_subsystem is not None:
                 self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
 
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+        return tree
+
+    def _set_request_cached_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Put tree in the request_cache, if available.
+        """
+        # NOTE, this is done whether or not the tree came from the caching subsystem, so that after a
+        # memcache hit, it'll get put into the request_cache
         if self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
@@ -761,20 +872,67 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 self.request_cache.data['metadata_inheritance'] = {}
             self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
 
+    def _refresh_metadata_inheritance_subtree(self, course_id, location):
+        """
+        Update the cached metadata inheritance tree for a change to the block at location, and
+        return the updated tree. Returns None if the whole tree must be recomputed instead.
+
+        Only the entries for location and its descendants are recomputed. The updated tree is
+        stored as a new object with a new version stamp, so readers see either the old or the new
+        tree, never a partially updated one. If the stored tree's version stamp changes while it's
+        being updated (because another process updated it), None is returned.
+        """
+        course_id = self.fill_in_run(course_id)
+        cache_key = unicode(course_id)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            tree = self.metadata_inheritance_cache_subsystem.get(cache_key)
+        elif self.request_cache is not None:
+            tree = self.request_cache.data.get('metadata_inheritance', {}).get(cache_key)
+        else:
+            tree = None
+        # trees cached before they had version stamps are recomputed
+        if not tree or METADATA_INHERITANCE_TREE_VERSION not in tree:
+            return None
+
+        if location.category in BLOCK_TYPES_WITH_CHILDREN:
+            if location.category == 'course':
+                # everything inherits from the course
+                return None
+            new_tree = self._update_metadata_inheritance_subtree(course_id, tree, location)
+            if new_tree is None:
+                return None
+            new_tree[METADATA_INHERITANCE_TREE_VERSION] = uuid4().hex
+
+            if self.metadata_inheritance_cache_subsystem is not None:
+                current = self.metadata_inheritance_cache_subsystem.get(cache_key) or {}
+                if current.get(METADATA_INHERITANCE_TREE_VERSION) != tree[METADATA_INHERITANCE_TREE_VERSION]:
+                    return None
+                self.metadata_inheritance_cache_subsystem.set(cache_key, new_tree)
+            tree = new_tree
+        # else the settings of leaf blocks aren't part of the tree, so there's nothing to update
+
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
+
+        If given the location of the only block which changed, only the part of the tree
+        below that block is recomputed (when there's a cached tree to update).
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if location is not None:
+                cached_metadata = self._refresh_metadata_inheritance_subtree(course_id, location)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -1360,7 +1518,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, location=xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
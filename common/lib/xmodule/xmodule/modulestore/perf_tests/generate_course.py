@@ -0,0 +1,67 @@
+"""
+Generates courses of a configurable size for modulestore performance tests.
+
+A course's shape is a tuple of the number of chapters in the course, of
+sequentials in each chapter, of verticals in each sequential, and of html
+blocks in each vertical.
+"""
+from xmodule.modulestore import ModuleStoreEnum
+
+
+# The categories of the blocks at each level of a course below its root.
+LEVEL_CATEGORIES = ('chapter', 'sequential', 'vertical', 'html')
+
+# Shapes of the courses timed by default: about 30, 1000 and 11000 blocks.
+COURSE_SHAPES = (
+    (2, 2, 2, 2),
+    (10, 5, 4, 4),
+    (20, 10, 5, 10),
+)
+
+
+def parse_shape(value):
+    """
+    Parse a shape written as comma separated numbers, e.g. "20,10,5,10".
+    """
+    shape = tuple(int(count) for count in value.split(','))
+    if len(shape) != len(LEVEL_CATEGORIES):
+        raise ValueError("A course shape needs {} numbers, not {!r}".format(len(LEVEL_CATEGORIES), value))
+    return shape
+
+
+def block_count(shape):
+    """
+    Return the number of blocks, including the course itself, in a course of the given shape.
+    """
+    total = 1
+    level_count = 1
+    for count in shape:
+        level_count *= count
+        total += level_count
+    return total
+
+
+def make_course(store, org, course, run, shape, user_id=ModuleStoreEnum.UserID.test):
+    """
+    Create a course of the given shape in `store` and return its key.
+    """
+    course_key = store.make_course_key(org, course, run)
+    with store.bulk_operations(course_key):
+        course = store.create_course(org, course, run, user_id)
+        _make_children(store, user_id, course.location, zip(LEVEL_CATEGORIES, shape))
+    return course.id
+
+
+def _make_children(store, user_id, parent_location, levels):
+    """
+    Create the blocks described by `levels`, a list of (category, count)
+    pairs, beneath parent_location.
+    """
+    if not levels:
+        return
+    (category, count), remaining = levels[0], levels[1:]
+    for index in xrange(count):
+        child = store.create_child(
+            user_id, parent_location, category, fields={'display_name': u'{} {}'.format(category, index)}
+        )
+        _make_children(store, user_id, child.location, remaining)
@@ -265,11 +265,73 @@ class FindReportGen(ReportGenerator):
         return html
 
 
+class SplitReadReportGen(ReportGenerator):
+    """
+    Class which generates report for split modulestore read performance test data.
+    """
+    def __init__(self, db_name):
+        super(SplitReadReportGen, self).__init__(db_name)
+        self._read_timing_data()
+
+    def _read_timing_data(self):
+        """
+        Read in the timing data from the sqlite DB and save into a dict.
+        """
+        self.run_data = {}
+
+        self.all_check_modes = set()
+        for row in self.all_rows:
+            time_taken = row[3]
+
+            # Split apart the description into its parts.
+            desc_parts = row[2].split(':')
+            if desc_parts[0] != 'SplitReadTest':
+                continue
+            block_amount, check_mode = desc_parts[1:3]
+            self.all_check_modes.add(check_mode)
+            test_phase = 'all'
+            if len(desc_parts) >= 4:
+                test_phase = desc_parts[3]
+
+            # Save the data in a multi-level dict - { phase1: { block_amount1: {check_mode1: duration, ...}, ...}, ...}.
+            phase_data = self.run_data.setdefault(test_phase, {})
+            amount_data = phase_data.setdefault(block_amount, {})
+            __ = amount_data.setdefault(check_mode, time_taken)
+
+    def generate_html(self):
+        """
+        Generate HTML.
+        """
+        html = HTMLDocument("Results")
+
+        for phase in self.run_data.keys():
+            per_phase = self.run_data[phase]
+
+            # Make the table header columns and the table.
+            columns = ["Course Blocks", ]
+            check_modes = sorted(self.all_check_modes)
+            for check_mode in check_modes:
+                columns.append("Time Taken (ms) ({})".format(check_mode))
+            phase_table = HTMLTable(columns)
+            for amount in sorted(per_phase.keys(), key=int):
+                per_amount = per_phase[amount]
+                row = [amount, ]
+                for check_mode in check_modes:
+                    row.append("{}".format(per_amount.get(check_mode, '')))
+                phase_table.add_row(row)
+            html.add_header(2, phase)
+            html.add_to_body(phase_table.table)
+
+        return html
+
+
 if click is not None:
     @click.command()
     @click.argument('outfile', type=click.File('w'), default='-', required=False)
     @click.option('--db_name', help='Name of sqlite database from which to read data.', default=DB_NAME)
-    @click.option('--data_type', help='Data type to process. One of: "imp_exp" or "find"', default="find")
+    @click.option(
+        '--data_type', help='Data type to process. One of: "imp_exp", "find" or "split_read"', default="find"
+    )
     def cli(outfile, db_name, data_type):
         """
         Generate an HTML report from the sqlite timing data.
@@ -280,6 +342,9 @@ if click is not None:
         elif data_type == 'find':
             f_gen = FindReportGen(db_name)
             html = f_gen.generate_html()
+        elif data_type == 'split_read':
+            sr_gen = SplitReadReportGen(db_name)
+            html = sr_gen.generate_html()
         click.echo(html.tostring(), file=outfile)
 
 if __name__ == '__main__':
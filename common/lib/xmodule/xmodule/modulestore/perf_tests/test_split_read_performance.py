@@ -0,0 +1,117 @@
+"""
+Performance tests for the split modulestore's read path.
+
+Times loading a course structure, get_item, get_items and
+get_course(depth=None) on generated courses of increasing size, with
+PyContracts checks on and off.
+
+The explicit checks in structure_from_mongo and structure_to_mongo are turned
+on and off by each test. Checks made by @contract decorators are set up when
+their modules are imported, so they're only off if the tests are run with the
+DISABLE_CONTRACTS environment variable set.
+
+More course shapes can be timed by listing them in the SPLIT_PERF_COURSE_SHAPES
+environment variable, e.g. SPLIT_PERF_COURSE_SHAPES="40,10,10,10;5,5,5,5"
+(see generate_course.py).
+"""
+import copy
+import itertools
+import os
+import unittest
+
+import contracts
+import ddt
+from nose.plugins.skip import SkipTest
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.perf_tests.generate_course import COURSE_SHAPES, block_count, make_course, parse_shape
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import VersioningModulestoreBuilder
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+EXTRA_COURSE_SHAPES = tuple(
+    parse_shape(shape)
+    for shape in os.environ.get('SPLIT_PERF_COURSE_SHAPES', '').split(';')
+    if shape.strip()
+)
+
+# Number of times each operation is repeated within its timed block.
+REPEATS = 5
+
+# Number of blocks fetched with get_item.
+GET_ITEM_COUNT = 100
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class SplitReadPerformance(unittest.TestCase):
+    """
+    This class exists to time reading courses of different sizes from the
+    split modulestore, with and without contract checking.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def _set_contracts(self, enabled):
+        """
+        Turn contract checking on or off for the rest of the test.
+        """
+        if contracts.all_disabled():
+            self.addCleanup(contracts.disable_all)
+        else:
+            self.addCleanup(contracts.enable_all)
+        if enabled:
+            contracts.enable_all()
+        else:
+            contracts.disable_all()
+
+    @ddt.data(*itertools.product(COURSE_SHAPES + EXTRA_COURSE_SHAPES, (True, False)))
+    @ddt.unpack
+    def test_generate_read_timings(self, shape, checks):
+        """
+        Generate timings for reading a course of the given shape.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        desc = "SplitReadTest:{}:{}".format(block_count(shape), 'checks_on' if checks else 'checks_off')
+
+        with VersioningModulestoreBuilder().build() as (__, store):
+            course_key = make_course(store, 'perf', 'course', 'run', shape)
+            structure_id = store.get_course_index(course_key)['versions'][ModuleStoreEnum.BranchName.draft]
+            raw_structure = store.db_connection.structures.find_one({'_id': structure_id})
+            raw_structures = [copy.deepcopy(raw_structure) for __ in xrange(REPEATS)]
+            locations = [block.location for block in store.get_items(course_key)][:GET_ITEM_COUNT]
+
+            self._set_contracts(checks)
+            with CodeBlockTimer(desc):
+
+                with CodeBlockTimer("structure_from_mongo"):
+                    for structure in raw_structures:
+                        structure_from_mongo(structure)
+
+                with CodeBlockTimer("get_structure"):
+                    for __ in xrange(REPEATS):
+                        store.db_connection.get_structure(structure_id)
+
+                with CodeBlockTimer("get_item"):
+                    for location in locations:
+                        store.get_item(location)
+
+                with CodeBlockTimer("get_items"):
+                    for __ in xrange(REPEATS):
+                        store.get_items(course_key, qualifiers={'category': 'html'})
+
+                with CodeBlockTimer("get_course"):
+                    for __ in xrange(REPEATS):
+                        store.get_course(course_key, depth=None)
@@ -0,0 +1,348 @@
+"""
+Compact in-memory representation of the blocks of a split modulestore structure.
+
+Structures loaded from mongo are never modified in place (edits are made to a
+deep copy which becomes a new structure version), so their block graph can be
+flattened once into integer arrays: every block gets a position, children are
+stored as arrays of positions, and blocks are bucketed by their (interned)
+block type. Traversals such as descendants, parent lookups and category
+queries then work on small ints instead of hashing BlockKey tuples and
+scanning BlockData field dicts.
+
+The copies made of a structure to edit it keep their blocks in an
+EditableBlockMap instead, which maintains a reverse children (parent) index
+as blocks are changed.
+"""
+import copy
+from array import array
+
+from xmodule.modulestore.split_mongo import BlockKey
+
+
+_INTERNED_STRINGS = {}
+
+
+def intern_string(value):
+    """
+    Return the canonical instance of the string `value`, so that the block
+    types and field names repeated throughout every loaded structure share
+    a single object. Unlike the builtin intern(), this works for unicode.
+    """
+    return _INTERNED_STRINGS.setdefault(value, value)
+
+
+class BlockIndex(object):
+    """
+    A read-only, array based index of a {BlockKey: BlockData} map.
+
+    Blocks are numbered 0..block_count-1. Children which aren't in the map
+    are numbered from block_count upwards, so that they can still be found
+    as children, but they're never returned as blocks.
+    """
+    __slots__ = (
+        'keys', 'positions', 'block_count', 'child_offsets', 'child_positions', 'parent_offsets', 'parent_positions',
+        'types',
+    )
+
+    def __init__(self, blocks):
+        self.keys = list(blocks)
+        self.block_count = len(self.keys)
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+        # The children of the block at position p are child_positions[child_offsets[p]:child_offsets[p + 1]],
+        # and its parents are parent_positions[parent_offsets[p]:parent_offsets[p + 1]].
+        self.child_offsets = array('l', [0])
+        self.child_positions = array('l')
+        self.types = {}
+        parents = []
+
+        for position in xrange(self.block_count):
+            block = blocks[self.keys[position]]
+            if block.block_type not in self.types:
+                self.types[intern_string(block.block_type)] = array('l')
+            self.types[block.block_type].append(position)
+            for child in block.fields.get('children', []):
+                child_position = self.positions.get(child)
+                if child_position is None:
+                    child_position = self.positions[child] = len(self.keys)
+                    self.keys.append(child)
+                self.child_positions.append(child_position)
+                parents.append((child_position, position))
+            self.child_offsets.append(len(self.child_positions))
+
+        # A block which lists the same child twice is still only one of its parents.
+        parents = sorted(set(parents))
+        self.parent_positions = array('l', [parent for __, parent in parents])
+        self.parent_offsets = array('l', [0] * (len(self.keys) + 1))
+        for child, __ in parents:
+            self.parent_offsets[child + 1] += 1
+        for position in xrange(len(self.keys)):
+            self.parent_offsets[position + 1] += self.parent_offsets[position]
+
+    def children(self, position):
+        """
+        Return the positions of the children of the block at `position`.
+        """
+        return self.child_positions[self.child_offsets[position]:self.child_offsets[position + 1]]
+
+    def descendants(self, block_key, depth=None):
+        """
+        Return the keys of `block_key` and of its descendants out to `depth`
+        (0 => this block only, 1 => this block and its children, etc...; None
+        => all descendants). Returns [] if the block isn't in the map.
+        """
+        start = self.positions.get(block_key)
+        if start is None or start >= self.block_count:
+            return []
+
+        # position -> the remaining depth it was reached with. A block shared by several
+        # parents is walked again only if it's reached with more depth left than before.
+        found = {start: depth}
+        stack = [(start, depth)]
+        while stack:
+            position, remaining = stack.pop()
+            if remaining is not None:
+                if remaining <= 0:
+                    continue
+                remaining -= 1
+            for child in self.children(position):
+                if child >= self.block_count:
+                    continue
+                if child in found:
+                    previous = found[child]
+                    if previous is None or (remaining is not None and previous >= remaining):
+                        continue
+                found[child] = remaining
+                stack.append((child, remaining))
+        return [self.keys[position] for position in found]
+
+    def parents(self, block_key):
+        """
+        Return the keys of the blocks which have `block_key` as a child.
+        """
+        position = self.positions.get(block_key)
+        if position is None:
+            return []
+        return [
+            self.keys[parent]
+            for parent in self.parent_positions[self.parent_offsets[position]:self.parent_offsets[position + 1]]
+        ]
+
+    def orphans(self):
+        """
+        Return the keys of the blocks which aren't the child of any block.
+        """
+        return [
+            self.keys[position]
+            for position in xrange(self.block_count)
+            if self.parent_offsets[position] == self.parent_offsets[position + 1]
+        ]
+
+    def keys_of_type(self, block_type):
+        """
+        Return the keys of the blocks whose block_type is `block_type`.
+        """
+        return [self.keys[position] for position in self.types.get(block_type, [])]
+
+
+class BlockMap(dict):
+    """
+    The {BlockKey: BlockData} map of a structure loaded from mongo.
+
+    It builds a BlockIndex of itself the first time one is asked for. Changing
+    the map discards the index, and deep copies (which is how new structure
+    versions are made) are EditableBlockMaps, as their blocks are about to be
+    edited.
+    """
+    def __init__(self, *args, **kwargs):
+        super(BlockMap, self).__init__(*args, **kwargs)
+        self._index = None
+
+    @property
+    def index(self):
+        """
+        The BlockIndex of this map.
+        """
+        index = self._index
+        if index is None:
+            index = self._index = BlockIndex(self)
+        return index
+
+    def parents(self, block_key):
+        """
+        Return the keys of the blocks which have `block_key` as a child.
+        """
+        return self.index.parents(block_key)
+
+    def orphans(self):
+        """
+        Return the keys of the blocks which aren't the child of any block.
+        """
+        return self.index.orphans()
+
+    def __deepcopy__(self, memo):
+        return _deepcopy_blocks(self, memo)
+
+    def __setitem__(self, key, value):
+        self._index = None
+        super(BlockMap, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._index = None
+        super(BlockMap, self).__delitem__(key)
+
+    def clear(self):
+        self._index = None
+        super(BlockMap, self).clear()
+
+    def pop(self, *args):
+        self._index = None
+        return super(BlockMap, self).pop(*args)
+
+    def popitem(self):
+        self._index = None
+        return super(BlockMap, self).popitem()
+
+    def setdefault(self, key, default=None):
+        self._index = None
+        return super(BlockMap, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._index = None
+        super(BlockMap, self).update(*args, **kwargs)
+
+
+class EditableBlockMap(dict):
+    """
+    The {BlockKey: BlockData} map of a structure which is being edited.
+
+    The first time parents() is called it indexes the children of every block,
+    and from then on keeps that index up to date as blocks are added, replaced
+    or removed. Code which changes the children of a block already in the map
+    in place must call children_changed() afterwards.
+    """
+    def __init__(self, *args, **kwargs):
+        super(EditableBlockMap, self).__init__(*args, **kwargs)
+        # {child BlockKey: set(parent BlockKeys)}, or None if not built yet
+        self._parents = None
+        # {parent BlockKey: tuple of the children it was indexed with}
+        self._children = None
+
+    def parents(self, block_key):
+        """
+        Return the keys of the blocks which have `block_key` as a child.
+        """
+        if self._parents is None:
+            self._parents = {}
+            self._children = {}
+            for key, block in self.iteritems():
+                self._index_block(key, block)
+        return list(self._parents.get(block_key, ()))
+
+    def orphans(self):
+        """
+        Return the keys of the blocks which aren't the child of any block.
+        """
+        return [key for key in self if not self.parents(key)]
+
+    def children_changed(self, block_key):
+        """
+        Update the index after the children of `block_key` were changed in place.
+        """
+        if self._parents is not None:
+            self._unindex_block(block_key)
+            if block_key in self:
+                self._index_block(block_key, self[block_key])
+
+    def _index_block(self, block_key, block):
+        """
+        Record `block_key` as the parent of each of `block`'s children.
+        """
+        children = tuple(block.fields.get('children', ()))
+        self._children[block_key] = children
+        for child in children:
+            self._parents.setdefault(child, set()).add(block_key)
+
+    def _unindex_block(self, block_key):
+        """
+        Forget `block_key` as the parent of the children it was indexed with.
+        """
+        for child in self._children.pop(block_key, ()):
+            parents = self._parents.get(child)
+            if parents is not None:
+                parents.discard(block_key)
+                if not parents:
+                    del self._parents[child]
+
+    def _reset(self):
+        """
+        Drop the index, to be rebuilt when it's next needed.
+        """
+        self._parents = None
+        self._children = None
+
+    def __deepcopy__(self, memo):
+        return _deepcopy_blocks(self, memo)
+
+    def __setitem__(self, key, value):
+        super(EditableBlockMap, self).__setitem__(key, value)
+        if self._parents is not None:
+            self._unindex_block(key)
+            self._index_block(key, value)
+
+    def __delitem__(self, key):
+        super(EditableBlockMap, self).__delitem__(key)
+        if self._parents is not None:
+            self._unindex_block(key)
+
+    def pop(self, key, *args):
+        if self._parents is not None and key in self:
+            self._unindex_block(key)
+        return super(EditableBlockMap, self).pop(key, *args)
+
+    def clear(self):
+        self._reset()
+        super(EditableBlockMap, self).clear()
+
+    def popitem(self):
+        self._reset()
+        return super(EditableBlockMap, self).popitem()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        self._reset()
+        super(EditableBlockMap, self).update(*args, **kwargs)
+
+
+def _deepcopy_blocks(blocks, memo):
+    """
+    Return an EditableBlockMap holding a deep copy of the blocks in `blocks`.
+    """
+    result = EditableBlockMap()
+    memo[id(blocks)] = result
+    for key, value in blocks.iteritems():
+        dict.__setitem__(result, copy.deepcopy(key, memo), copy.deepcopy(value, memo))
+    return result
+
+
+def canonical_block_keys(blocks):
+    """
+    Return a function which maps a [block_type, block_id] pair to the BlockKey
+    of that block in `blocks` (an iterable of BlockKeys), so that every reference
+    to a block shares one BlockKey object.
+    """
+    keys = {key: key for key in blocks}
+
+    def canonical(pair):
+        """
+        Return the shared BlockKey for `pair`.
+        """
+        pair = tuple(pair)
+        key = keys.get(pair)
+        if key is None:
+            key = keys[pair] = BlockKey(intern_string(pair[0]), pair[1])
+        return key
+    return canonical
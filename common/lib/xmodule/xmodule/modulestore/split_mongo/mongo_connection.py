@@ -1,6 +1,7 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import copy
 import re
 from mongodb_proxy import autoretry_read, MongoProxy
 import pymongo
@@ -8,10 +9,11 @@ import pymongo
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
-from contracts import check, new_contract
+from contracts import all_disabled, check, new_contract
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.block_map import BlockMap, canonical_block_keys, intern_string
 import datetime
 import pytz
 
@@ -27,18 +29,31 @@ def structure_from_mongo(structure):
     Converts 'blocks.*.fields.children' from [[block_type, block_id]] to [BlockKey].
     N.B. Does not convert any other ReferenceFields (because we don't know which fields they are at this level).
     """
-    check('seq[2]', structure['root'])
-    check('list(dict)', structure['blocks'])
+    # These checks are per block, so skip them along with the @contract checks in production.
+    if not all_disabled():
+        check('seq[2]', structure['root'])
+        check('list(dict)', structure['blocks'])
+        for block in structure['blocks']:
+            if 'children' in block['fields']:
+                check('list(list[2])', block['fields']['children'])
+
+    # Block types and field names are interned, and the root, the block map and
+    # the children lists all share one BlockKey per block.
+    block_keys = []
     for block in structure['blocks']:
+        block['block_type'] = intern_string(block['block_type'])
+        block_keys.append(BlockKey(block['block_type'], block.pop('block_id')))
+    canonical = canonical_block_keys(block_keys)
+
+    structure['root'] = canonical(structure['root'])
+    new_blocks = BlockMap()
+    for block_key, block in zip(block_keys, structure['blocks']):
+        for field_dict in ('fields', 'defaults'):
+            if field_dict in block:
+                block[field_dict] = {intern_string(name): value for name, value in block[field_dict].iteritems()}
         if 'children' in block['fields']:
-            check('list(list[2])', block['fields']['children'])
-
-    structure['root'] = BlockKey(*structure['root'])
-    new_blocks = {}
-    for block in structure['blocks']:
-        if 'children' in block['fields']:
-            block['fields']['children'] = [BlockKey(*child) for child in block['fields']['children']]
-        new_blocks[BlockKey(block['block_type'], block.pop('block_id'))] = BlockData(**block)
+            block['fields']['children'] = [canonical(child) for child in block['fields']['children']]
+        new_blocks[block_key] = BlockData(**block)
     structure['blocks'] = new_blocks
 
     return structure
@@ -52,11 +67,12 @@ def structure_to_mongo(structure):
     Doesn't convert 'root', since namedtuple's can be inserted
         directly into mongo.
     """
-    check('BlockKey', structure['root'])
-    check('dict(BlockKey: BlockData)', structure['blocks'])
-    for block in structure['blocks'].itervalues():
-        if 'children' in block.fields:
-            check('list(BlockKey)', block.fields['children'])
+    if not all_disabled():
+        check('BlockKey', structure['root'])
+        check('dict(BlockKey: BlockData)', structure['blocks'])
+        for block in structure['blocks'].itervalues():
+            if 'children' in block.fields:
+                check('list(BlockKey)', block.fields['children'])
 
     new_structure = dict(structure)
     new_structure['blocks'] = []
@@ -76,11 +92,16 @@ class MongoConnection(object):
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        structure_cache: an optional :class:`.StructureCache` to keep fetched
+            structures and definitions in, as neither ever changes once written.
         """
+        self.structure_cache = structure_cache
+
         self.database = MongoProxy(
             pymongo.database.Database(
                 pymongo.MongoClient(
@@ -122,6 +143,12 @@ class MongoConnection(object):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
+        if self.structure_cache is not None:
+            return self.structure_cache.get(
+                ('structure', key),
+                lambda: self.structures.find_one({'_id': key}),
+                structure_from_mongo,
+            )
         return structure_from_mongo(self.structures.find_one({'_id': key}))
 
     @autoretry_read()
@@ -132,7 +159,25 @@ class MongoConnection(object):
         Arguments:
             ids (list): A list of structure ids
         """
-        return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+        if self.structure_cache is None:
+            return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+
+        structures = []
+        missing_ids = []
+        for structure_id in ids:
+            if ('structure', structure_id) in self.structure_cache:
+                structure = self.structure_cache.get(('structure', structure_id), lambda: None)
+                if structure is not None:
+                    structures.append(structure)
+                    continue
+            missing_ids.append(structure_id)
+
+        if missing_ids:
+            structures.extend(
+                self.structure_cache.add(('structure', structure['_id']), structure, structure_from_mongo)
+                for structure in self.structures.find({'_id': {'$in': missing_ids}})
+            )
+        return structures
 
     @autoretry_read()
     def find_structures_derived_from(self, ids):
@@ -253,13 +298,39 @@ class MongoConnection(object):
         """
         Get the definition from the persistence mechanism whose id is the given key
         """
+        if self.structure_cache is not None:
+            definition = self.structure_cache.get(
+                ('definition', key),
+                lambda: self.definitions.find_one({'_id': key}),
+            )
+            # definitions are handed to xblocks, which may change them, so
+            # never hand out the cached copy itself
+            return copy.deepcopy(definition)
         return self.definitions.find_one({'_id': key})
 
     def get_definitions(self, definitions):
         """
         Retrieve all definitions listed in `definitions`.
         """
-        return self.definitions.find({'_id': {'$in': definitions}})
+        if self.structure_cache is None:
+            return self.definitions.find({'_id': {'$in': definitions}})
+
+        found = []
+        missing_ids = []
+        for definition_id in definitions:
+            if ('definition', definition_id) in self.structure_cache:
+                definition = self.structure_cache.get(('definition', definition_id), lambda: None)
+                if definition is not None:
+                    found.append(definition)
+                    continue
+            missing_ids.append(definition_id)
+
+        if missing_ids:
+            found.extend(
+                self.structure_cache.add(('definition', definition['_id']), definition)
+                for definition in self.definitions.find({'_id': {'$in': missing_ids}})
+            )
+        return [copy.deepcopy(definition) for definition in found]
 
     def insert_definition(self, definition):
         """
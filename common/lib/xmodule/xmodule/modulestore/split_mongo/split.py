@@ -80,7 +80,9 @@ from xmodule.modulestore import (
 from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
+from xmodule.modulestore.split_mongo.structure_cache import StructureCache
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
+from xmodule.modulestore.split_mongo.block_map import BlockMap, EditableBlockMap
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
 from types import NoneType
@@ -628,14 +630,23 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None,
+                 structure_cache_size=0, shared_structure_cache=None, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache_size: if non-zero, the approximate number of bytes of structures and
+            definitions to keep in memory across requests (see :class:`.StructureCache`)
+        :param shared_structure_cache: an optional django-style cache to use as a second tier behind
+            the in-memory structure cache
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        if structure_cache_size:
+            structure_cache = StructureCache(structure_cache_size, shared_cache=shared_structure_cache)
+        else:
+            structure_cache = None
+        self.db_connection = MongoConnection(structure_cache=structure_cache, **doc_store_config)
         self.db = self.db_connection.database
 
         if default_class is not None:
@@ -720,12 +731,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 definitions = {definition['_id']: definition
                                for definition in descendent_definitions}
 
-                for block in new_module_data.itervalues():
+                for block_key, block in new_module_data.items():
                     if block.definition in definitions:
                         definition = definitions[block.definition]
+                        # The structure's own BlockData may be shared with other requests
+                        # (see StructureCache), so merge the definition into a copy of it.
+                        block = copy.copy(block)
+                        block.fields = dict(block.fields)
                         # convert_fields gets done later in the runtime's xblock_from_json
                         block.fields.update(definition.get('fields'))
                         block.definition_loaded = True
+                        new_module_data[block_key] = block
 
             system.module_data.update(new_module_data)
             return system.module_data
@@ -1084,8 +1100,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
+
+        blocks = course.structure['blocks']
+        if isinstance(blocks, BlockMap) and isinstance(qualifiers.get('block_type'), basestring):
+            # only look at the blocks of the requested category
+            candidates = blocks.index.keys_of_type(qualifiers['block_type'])
+        else:
+            candidates = blocks.iterkeys()
+        for block_id in candidates:
+            if _block_matches_all(blocks[block_id]):
                 items.append(block_id)
 
         if len(items) > 0:
@@ -1127,13 +1150,20 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         detached_categories = [name for name, __ in XBlock.load_tagged_classes("detached")]
         course = self._lookup_course(course_key)
-        items = set(course.structure['blocks'].keys())
-        items.remove(course.structure['root'])
         blocks = course.structure['blocks']
-        for block_id, block_data in blocks.iteritems():
-            items.difference_update(BlockKey(*child) for child in block_data.fields.get('children', []))
-            if block_data.block_type in detached_categories:
-                items.discard(block_id)
+        if isinstance(blocks, (BlockMap, EditableBlockMap)):
+            items = set(
+                block_id for block_id in blocks.orphans()
+                if blocks[block_id].block_type not in detached_categories
+            )
+            items.discard(course.structure['root'])
+        else:
+            items = set(blocks.keys())
+            items.remove(course.structure['root'])
+            for block_id, block_data in blocks.iteritems():
+                items.difference_update(BlockKey(*child) for child in block_data.fields.get('children', []))
+                if block_data.block_type in detached_categories:
+                    items.discard(block_id)
         return [
             course_key.make_usage_key(block_type=block_id.type, block_id=block_id.id)
             for block_id in items
@@ -1563,6 +1593,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                     kwargs.get('position'),
                     BlockKey.from_usage_key(xblock.location)
                 )
+            self._children_changed(new_structure['blocks'], block_id)
 
             if parent.edit_info.update_version != new_structure['_id']:
                 # if the parent hadn't been previously changed in this bulk transaction, indicate that it's
@@ -1708,6 +1739,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             root_block = draft_structure['blocks'][draft_structure['root']]
             if block_fields is not None:
                 root_block.fields.update(self._serialize_fields(root_category, block_fields))
+                self._children_changed(draft_structure['blocks'], draft_structure['root'])
             if definition_fields is not None:
                 old_def = self.get_definition(locator, root_block.definition)
                 new_fields = old_def['fields']
@@ -1842,6 +1874,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
                 block_data.definition = definition_locator.definition_id
                 block_data.fields = settings
+                self._children_changed(new_structure['blocks'], block_key)
 
                 new_id = new_structure['_id']
                 self.version_block(block_data, user_id, new_id)
@@ -2131,6 +2164,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                                     BlockKey.from_usage_key(subtree_root)
                                 )
                             )
+                            self._children_changed(destination_blocks, parent)
                     if len(parents) and not parent_found:
                         raise ItemNotFoundError(parents)
                 # update/create the subtree and its children in destination (skipping blacklist)
@@ -2313,6 +2347,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         # Update the children of new_parent_block_key
         dest_structure['blocks'][new_parent_block_key].fields['children'] = new_children
+        self._children_changed(dest_structure['blocks'], new_parent_block_key)
 
         return new_blocks
 
@@ -2350,6 +2385,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             for parent_block_key in parent_block_keys:
                 parent_block = new_blocks[parent_block_key]
                 parent_block.fields['children'].remove(block_key)
+                self._children_changed(new_blocks, parent_block_key)
                 parent_block.edit_info.edited_on = datetime.datetime.now(UTC)
                 parent_block.edit_info.edited_by = user_id
                 parent_block.edit_info.previous_version = parent_block.edit_info.update_version
@@ -2391,6 +2427,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         log.info(u"deleting course from split-mongo: %s", course_key)
         self.delete_course_index(course_key)
 
+        if self.signal_handler:
+            self.signal_handler.send("course_deleted", course_key=course_key)
+
         # We do NOT call the super class here since we need to keep the assets
         # in case the course is later restored.
         # super(SplitMongoModuleStore, self).delete_course(course_key, user_id)
@@ -2448,6 +2487,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         (0 => this usage only, 1 => this usage and its children, etc...)
         A depth of None returns all descendants
         """
+        if isinstance(block_map, BlockMap):
+            for block_key in block_map.index.descendants(block_id, depth):
+                if block_key not in descendent_map:
+                    descendent_map[block_key] = block_map[block_key]
+            return descendent_map
+
         if block_id not in block_map:
             return descendent_map
 
@@ -2638,12 +2683,13 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         original_structure = self._lookup_course(course_locator).structure
         index_entry = self._get_index_if_valid(course_locator)
         new_structure = self.version_structure(course_locator, original_structure, user_id)
-        for block in new_structure['blocks'].itervalues():
+        for block_key, block in new_structure['blocks'].iteritems():
             if 'children' in block.fields:
                 block.fields['children'] = [
                     block_id for block_id in block.fields['children']
                     if block_id in new_structure['blocks']
                 ]
+                self._children_changed(new_structure['blocks'], block_key)
         self.update_structure(course_locator, new_structure)
         if index_entry is not None:
             # update the index entry if appropriate
@@ -2817,13 +2863,13 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         if root_block_key is not None:
             if block_fields is None:
                 block_fields = {}
-            blocks = {
+            blocks = EditableBlockMap({
                 root_block_key: self._new_block(
                     user_id, root_block_key.type, block_fields, definition_id, new_id
                 )
-            }
+            })
         else:
-            blocks = {}
+            blocks = EditableBlockMap()
         return {
             '_id': new_id,
             'root': root_block_key,
@@ -2841,6 +2887,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         Given a structure, find block_key's parent in that structure. Note returns
         the encoded format for parent
         """
+        if isinstance(structure['blocks'], (BlockMap, EditableBlockMap)):
+            return structure['blocks'].parents(block_key)
         return [
             parent_block_key
             for parent_block_key, value in structure['blocks'].iteritems()
@@ -2993,6 +3041,14 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         """
         structure['blocks'][block_key] = content
 
+    def _children_changed(self, blocks, block_key):
+        """
+        Keep the parent index of `blocks` up to date after the children of
+        block_key were changed in place.
+        """
+        if isinstance(blocks, EditableBlockMap):
+            blocks.children_changed(block_key)
+
     @autoretry_read()
     def find_courses_by_search_target(self, field_name, field_value):
         """
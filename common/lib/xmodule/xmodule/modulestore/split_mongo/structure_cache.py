@@ -0,0 +1,165 @@
+"""
+A process-wide cache of split modulestore structures and definitions.
+
+Structures and definitions are never changed once they're written to mongo
+(edits always create new documents with new ids), so once a document has
+been fetched and decoded it can be reused by every later request in the
+process. :class:`StructureCache` keeps the most recently used documents in
+memory, bounded by the approximate size of their BSON encoding, and can
+optionally sit in front of a shared second tier (any object implementing the
+django cache ``get``/``set`` API, e.g. a memcached or file based cache) which
+holds the raw, undecoded documents.
+
+Callers must treat the documents they get back as read-only.
+"""
+import cPickle as pickle
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+
+from bson import BSON
+
+
+log = logging.getLogger(__name__)
+
+
+class StructureCache(object):
+    """
+    A bounded, thread-safe LRU cache of decoded documents keyed by their
+    ``_id``, with an optional shared second tier.
+
+    Hit, miss and eviction counts are kept in :attr:`stats`.
+    """
+    def __init__(self, max_size, shared_cache=None, shared_cache_prefix='split_structure_cache'):
+        """
+        Arguments:
+            max_size (int): the maximum total BSON size, in bytes, of the
+                documents kept in memory. Documents bigger than this are
+                never kept in memory.
+            shared_cache: an optional django-style cache shared between
+                processes, used when a document isn't in memory.
+            shared_cache_prefix (str): prefix for the keys stored in shared_cache.
+        """
+        self.max_size = max_size
+        self.shared_cache = shared_cache
+        self.shared_cache_prefix = shared_cache_prefix
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {
+            'hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, fetch, decode=None):
+        """
+        Return the decoded document for `key`.
+
+        Arguments:
+            key: the document's ``_id``, qualified by the kind of document
+                (e.g. ``('structure', _id)``) as needed
+            fetch: a function which returns the raw document for `key` from
+                the database, or None if there isn't one
+            decode: an optional function which converts a raw document to the
+                form that is cached and returned. It may modify the raw document.
+
+        Returns None (and caches nothing) if there's no such document.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                # re-insert to mark as most recently used
+                self._entries[key] = entry
+                self.stats['hits'] += 1
+                return entry[0]
+
+        raw = self._get_shared(key)
+        if raw is not None:
+            with self._lock:
+                self.stats['shared_hits'] += 1
+        else:
+            raw = fetch()
+            with self._lock:
+                self.stats['misses'] += 1
+            if raw is None:
+                return None
+            self._set_shared(key, raw)
+
+        return self.add(key, raw, decode)
+
+    def add(self, key, raw, decode=None):
+        """
+        Decode the raw document `raw` and remember it as the value for `key`.
+        Returns the decoded document.
+        """
+        size = len(BSON.encode(raw))
+        value = decode(raw) if decode is not None else raw
+        if size > self.max_size:
+            return value
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                __, (__, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.stats['evictions'] += 1
+        return value
+
+    def clear(self):
+        """
+        Forget all of the in-memory documents. The shared tier is left alone.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _shared_key(self, key):
+        """
+        Return the key used for `key` in the shared cache.
+        """
+        if isinstance(key, tuple):
+            key = '.'.join(unicode(part) for part in key)
+        return u'{}.{}'.format(self.shared_cache_prefix, key)
+
+    def _get_shared(self, key):
+        """
+        Return the raw document for `key` from the shared tier, if there is one.
+        """
+        if self.shared_cache is None:
+            return None
+        try:
+            compressed = self.shared_cache.get(self._shared_key(key))
+            if compressed is None:
+                return None
+            return pickle.loads(zlib.decompress(compressed))
+        except Exception:  # pylint: disable=broad-except
+            log.warning("Unable to read %s from the shared structure cache", key, exc_info=True)
+            return None
+
+    def _set_shared(self, key, raw):
+        """
+        Store the raw document for `key` in the shared tier, if there is one.
+        The documents are compressed, as memcached won't store values over 1MB.
+        """
+        if self.shared_cache is None:
+            return
+        try:
+            self.shared_cache.set(
+                self._shared_key(key),
+                zlib.compress(pickle.dumps(raw, pickle.HIGHEST_PROTOCOL)),
+            )
+        except Exception:  # pylint: disable=broad-except
+            log.warning("Unable to write %s to the shared structure cache", key, exc_info=True)
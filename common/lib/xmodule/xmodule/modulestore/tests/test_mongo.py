@@ -39,7 +39,9 @@ from nose.tools import assert_in
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
-from xmodule.modulestore.mongo.base import as_draft
+from xmodule.modulestore.mongo.base import METADATA_INHERITANCE_TREE_VERSION, as_draft
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import MemoryCache
+from xmodule.modulestore.tests.factories import check_exact_number_of_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.edit_info import EditInfoMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError
@@ -705,6 +707,39 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_incremental_metadata_inheritance_tree(self):
+        """
+        Test that updating a block recomputes the cached inheritance tree below it
+        to match what computing the whole tree gives, with a new version stamp.
+        """
+        self.draft_store.metadata_inheritance_cache_subsystem = MemoryCache()
+        self.addCleanup(setattr, self.draft_store, 'metadata_inheritance_cache_subsystem', None)
+
+        course = self.draft_store.create_course("TestX", "InheritanceTree", "2015_T1", self.dummy_user)
+        chapter = self.draft_store.create_child(self.dummy_user, course.location, "chapter")
+        sequential = self.draft_store.create_child(self.dummy_user, chapter.location, "sequential")
+        vertical = self.draft_store.create_child(self.dummy_user, sequential.location, "vertical")
+        html = self.draft_store.create_child(self.dummy_user, vertical.location, "html")
+        self.addCleanup(self.draft_store.delete_course, course.id, self.dummy_user)
+
+        old_tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+        sequential = self.draft_store.get_item(sequential.location)
+        sequential.graded = True
+        sequential.due = datetime(2015, 6, 1, tzinfo=UTC)
+        with check_exact_number_of_calls(self.draft_store, '_compute_metadata_inheritance_tree', 0):
+            self.draft_store.update_item(sequential, self.dummy_user)
+
+        tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+        self.assertNotEqual(tree[METADATA_INHERITANCE_TREE_VERSION], old_tree[METADATA_INHERITANCE_TREE_VERSION])
+        self.assertTrue(tree[unicode(html.location)]['graded'])
+        self.assertNotIn('graded', tree[unicode(chapter.location)])
+        # the tree the update replaced isn't changed, as it may still be in use
+        self.assertNotIn('graded', old_tree[unicode(html.location)])
+
+        full_tree = self.draft_store._compute_metadata_inheritance_tree(course.id)
+        del tree[METADATA_INHERITANCE_TREE_VERSION]
+        self.assertEqual(tree, full_tree)
+
 
 class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
     '''
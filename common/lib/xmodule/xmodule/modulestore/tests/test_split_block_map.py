@@ -0,0 +1,212 @@
+"""
+Tests for the compact representation of split structures' blocks.
+"""
+import copy
+import unittest
+
+from bson.objectid import ObjectId
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.block_map import BlockMap, EditableBlockMap
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo, structure_to_mongo
+
+
+def _block(block_type, block_id, children=()):
+    """
+    Return a block in the form it is stored in mongo.
+    """
+    return {
+        'block_type': block_type,
+        'block_id': block_id,
+        'fields': {'children': [[child_type, child_id] for child_type, child_id in children]},
+        'definition': ObjectId(),
+        'edit_info': {},
+    }
+
+
+class TestBlockMap(unittest.TestCase):
+    """
+    Tests of BlockMap and its BlockIndex.
+
+    The course is:
+        course
+          chapter1
+            seq1
+              html1
+              problem1
+              missing (not in the structure)
+          chapter2
+            seq1
+        orphan
+    """
+    def setUp(self):
+        super(TestBlockMap, self).setUp()
+        self.structure = structure_from_mongo({
+            '_id': ObjectId(),
+            'root': [u'course', u'course'],
+            'blocks': [
+                _block(u'course', u'course', [(u'chapter', u'chapter1'), (u'chapter', u'chapter2')]),
+                _block(u'chapter', u'chapter1', [(u'sequential', u'seq1')]),
+                _block(u'chapter', u'chapter2', [(u'sequential', u'seq1')]),
+                _block(
+                    u'sequential', u'seq1',
+                    [(u'html', u'html1'), (u'problem', u'problem1'), (u'problem', u'missing')]
+                ),
+                _block(u'html', u'html1'),
+                _block(u'problem', u'problem1'),
+                _block(u'html', u'orphan'),
+            ],
+        })
+        self.blocks = self.structure['blocks']
+
+    def test_structure_from_mongo(self):
+        self.assertIsInstance(self.blocks, BlockMap)
+        self.assertEqual(len(self.blocks), 7)
+        keys = {key: key for key in self.blocks}
+        # references to a block share its BlockKey
+        self.assertIs(self.structure['root'], keys[BlockKey(u'course', u'course')])
+        for block in self.blocks.itervalues():
+            for child in block.fields['children']:
+                if child in keys:
+                    self.assertIs(child, keys[child])
+        # as do block types
+        html_types = [block.block_type for block in self.blocks.itervalues() if block.block_type == u'html']
+        self.assertIs(html_types[0], html_types[1])
+
+    def test_descendants(self):
+        index = self.blocks.index
+        self.assertItemsEqual(
+            index.descendants(BlockKey(u'chapter', u'chapter1'), 0),
+            [BlockKey(u'chapter', u'chapter1')]
+        )
+        self.assertItemsEqual(
+            index.descendants(BlockKey(u'chapter', u'chapter1'), 1),
+            [BlockKey(u'chapter', u'chapter1'), BlockKey(u'sequential', u'seq1')]
+        )
+        self.assertItemsEqual(
+            index.descendants(self.structure['root'], None),
+            set(self.blocks) - {BlockKey(u'html', u'orphan')}
+        )
+        self.assertEqual(index.descendants(BlockKey(u'problem', u'missing'), None), [])
+
+    def test_descendants_depth(self):
+        index = self.blocks.index
+        self.assertNotIn(BlockKey(u'html', u'html1'), index.descendants(self.structure['root'], 2))
+        self.assertIn(BlockKey(u'html', u'html1'), index.descendants(self.structure['root'], 3))
+
+    def test_descendants_of_shared_block(self):
+        # b is first reached through p and q with no depth left, and must still
+        # be expanded when it's reached through a
+        def key(block_id):  # pylint: disable=missing-docstring
+            return BlockKey(u'x', block_id)
+
+        def block(*children):  # pylint: disable=missing-docstring
+            return BlockData(block_type=u'x', fields={'children': [key(child) for child in children]})
+
+        blocks = BlockMap({
+            key(u'root'): block(u'a', u'p'),
+            key(u'a'): block(u'b'),
+            key(u'p'): block(u'q'),
+            key(u'q'): block(u'b'),
+            key(u'b'): block(u'c'),
+            key(u'c'): block(),
+        })
+        self.assertItemsEqual(blocks.index.descendants(key(u'root'), 3), blocks.keys())
+        self.assertNotIn(key(u'c'), blocks.index.descendants(key(u'root'), 2))
+
+    def test_parents(self):
+        index = self.blocks.index
+        self.assertItemsEqual(
+            index.parents(BlockKey(u'sequential', u'seq1')),
+            [BlockKey(u'chapter', u'chapter1'), BlockKey(u'chapter', u'chapter2')]
+        )
+        self.assertEqual(index.parents(BlockKey(u'problem', u'missing')), [BlockKey(u'sequential', u'seq1')])
+        self.assertEqual(index.parents(self.structure['root']), [])
+        self.assertEqual(index.parents(BlockKey(u'html', u'orphan')), [])
+        self.assertEqual(index.parents(BlockKey(u'html', u'nonexistent')), [])
+
+    def test_orphans(self):
+        self.assertItemsEqual(self.blocks.orphans(), [self.structure['root'], BlockKey(u'html', u'orphan')])
+
+    def test_keys_of_type(self):
+        index = self.blocks.index
+        self.assertItemsEqual(
+            index.keys_of_type(u'html'),
+            [BlockKey(u'html', u'html1'), BlockKey(u'html', u'orphan')]
+        )
+        self.assertEqual(index.keys_of_type(u'video'), [])
+
+    def test_changes_discard_index(self):
+        index = self.blocks.index
+        self.assertIs(self.blocks.index, index)
+        self.blocks[BlockKey(u'html', u'new')] = BlockData(block_type=u'html', fields={})
+        self.assertIsNot(self.blocks.index, index)
+        self.assertItemsEqual(
+            self.blocks.index.keys_of_type(u'html'),
+            [BlockKey(u'html', u'html1'), BlockKey(u'html', u'orphan'), BlockKey(u'html', u'new')]
+        )
+
+    def test_deepcopy_is_editable(self):
+        copied = copy.deepcopy(self.structure)
+        self.assertIsInstance(copied['blocks'], EditableBlockMap)
+        self.assertEqual(set(copied['blocks']), set(self.blocks))
+        key = BlockKey(u'sequential', u'seq1')
+        self.assertEqual(copied['blocks'][key].fields, self.blocks[key].fields)
+        self.assertIsNot(copied['blocks'][key], self.blocks[key])
+
+    def test_round_trip(self):
+        stored = structure_to_mongo(self.structure)
+        self.assertIsInstance(stored['blocks'], list)
+        reloaded = structure_from_mongo(copy.deepcopy(stored))
+        self.assertEqual(set(reloaded['blocks']), set(self.blocks))
+
+
+class TestEditableBlockMap(unittest.TestCase):
+    """
+    Tests that EditableBlockMap keeps its parent index up to date.
+    """
+    def setUp(self):
+        super(TestEditableBlockMap, self).setUp()
+        self.blocks = copy.deepcopy(structure_from_mongo({
+            '_id': ObjectId(),
+            'root': [u'course', u'course'],
+            'blocks': [
+                _block(u'course', u'course', [(u'chapter', u'chapter1')]),
+                _block(u'chapter', u'chapter1', [(u'sequential', u'seq1')]),
+                _block(u'sequential', u'seq1'),
+            ],
+        })['blocks'])
+        self.course = BlockKey(u'course', u'course')
+        self.chapter = BlockKey(u'chapter', u'chapter1')
+        self.sequential = BlockKey(u'sequential', u'seq1')
+        # build the index before changing anything
+        self.assertEqual(self.blocks.parents(self.sequential), [self.chapter])
+
+    def test_add_block(self):
+        chapter2 = BlockKey(u'chapter', u'chapter2')
+        self.blocks[chapter2] = BlockData(block_type=u'chapter', fields={'children': [self.sequential]})
+        self.assertItemsEqual(self.blocks.parents(self.sequential), [self.chapter, chapter2])
+        self.assertItemsEqual(self.blocks.orphans(), [self.course, chapter2])
+
+    def test_replace_block(self):
+        self.blocks[self.chapter] = BlockData(block_type=u'chapter', fields={})
+        self.assertEqual(self.blocks.parents(self.sequential), [])
+
+    def test_delete_block(self):
+        del self.blocks[self.chapter]
+        self.assertEqual(self.blocks.parents(self.sequential), [])
+        self.assertEqual(self.blocks.parents(self.chapter), [self.course])
+        self.blocks.pop(self.course)
+        self.assertEqual(self.blocks.parents(self.chapter), [])
+
+    def test_children_changed(self):
+        self.blocks[self.chapter].fields['children'].remove(self.sequential)
+        self.blocks[self.course].fields['children'].append(self.sequential)
+        self.blocks.children_changed(self.chapter)
+        self.blocks.children_changed(self.course)
+        self.assertEqual(self.blocks.parents(self.sequential), [self.course])
+
+    def test_update_rebuilds(self):
+        self.blocks.update({self.chapter: BlockData(block_type=u'chapter', fields={})})
+        self.assertEqual(self.blocks.parents(self.sequential), [])
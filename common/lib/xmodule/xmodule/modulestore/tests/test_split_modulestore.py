@@ -1232,6 +1232,39 @@ class TestItemCrud(SplitModuleTest):
             self.assertEqual(refetch_course.previous_version, course_block_update_version)
             self.assertEqual(refetch_course.update_version, transaction_guid)
 
+    def test_parents_in_bulk_operations(self):
+        """
+        Test that parent and orphan lookups keep up with edits made during a bulk operation
+        """
+        store = modulestore()
+        user = random.getrandbits(32)
+        course_key = CourseLocator('test_org', 'test_parents', 'test_run', branch=BRANCH_NAME_DRAFT)
+        with store.bulk_operations(course_key):
+            course = store.create_course('test_org', 'test_parents', 'test_run', user, BRANCH_NAME_DRAFT)
+            course_location = course.location.version_agnostic()
+            chapter = store.create_child(user, course_location, 'chapter')
+            chapter_location = chapter.location.version_agnostic()
+            sequential_location = store.create_child(user, chapter_location, 'sequential').location.version_agnostic()
+            self.assertEqual(store.get_parent_location(sequential_location), chapter_location)
+            self.assertEqual(store.get_orphans(course_key), [])
+
+            # detach the sequential from its chapter
+            chapter = store.get_item(chapter_location)
+            chapter.children = []
+            store.update_item(chapter, user)
+            self.assertIsNone(store.get_parent_location(sequential_location))
+            self.assertEqual(store.get_orphans(course_key), [sequential_location])
+
+            # deleting the chapter leaves the course with no children
+            other_location = store.create_child(user, chapter_location, 'sequential').location.version_agnostic()
+            self.assertEqual(store.get_parent_location(other_location), chapter_location)
+            store.delete_item(chapter_location, user)
+            self.assertIsNone(store.get_parent_location(chapter_location))
+            self.assertEqual(store.get_item(course_location).children, [])
+
+        self.assertIsNone(store.get_parent_location(sequential_location))
+        self.assertEqual(store.get_orphans(course_key), [sequential_location])
+
     def test_update_metadata(self):
         """
         test updating an items metadata ensuring the definition doesn't version but the course does if it should
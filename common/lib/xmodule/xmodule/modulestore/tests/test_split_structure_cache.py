@@ -0,0 +1,101 @@
+"""
+Tests for the in-process split structure cache.
+"""
+import unittest
+
+from bson import BSON
+from bson.objectid import ObjectId
+
+from xmodule.modulestore.split_mongo.structure_cache import StructureCache
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import MemoryCache
+
+
+def _document(padding=10):
+    """
+    Return a new raw document with a unique _id.
+    """
+    return {'_id': ObjectId(), 'padding': 'x' * padding}
+
+
+class TestStructureCache(unittest.TestCase):
+    """
+    Tests of StructureCache's LRU behavior, accounting and shared tier.
+    """
+    def setUp(self):
+        super(TestStructureCache, self).setUp()
+        self.fetches = []
+
+    def _fetcher(self, document):
+        """
+        Return a fetch function for `document` which records that it was called.
+        """
+        def fetch():  # pylint: disable=missing-docstring
+            self.fetches.append(document['_id'] if document else None)
+            return document
+        return fetch
+
+    def test_hit_after_miss(self):
+        cache = StructureCache(10000)
+        document = _document()
+        self.assertEqual(cache.get(document['_id'], self._fetcher(document)), document)
+        self.assertEqual(cache.get(document['_id'], self._fetcher(document)), document)
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['misses'], 1)
+        self.assertEqual(cache.size, len(BSON.encode(document)))
+
+    def test_decode_applied_once(self):
+        cache = StructureCache(10000)
+        document = _document()
+        decoded = cache.get(document['_id'], self._fetcher(document), lambda raw: ('decoded', raw['_id']))
+        self.assertEqual(decoded, ('decoded', document['_id']))
+        self.assertIs(cache.get(document['_id'], self._fetcher(None), lambda raw: None), decoded)
+
+    def test_missing_document_not_cached(self):
+        cache = StructureCache(10000)
+        key = ObjectId()
+        self.assertIsNone(cache.get(key, self._fetcher(None)))
+        self.assertIsNone(cache.get(key, self._fetcher(None)))
+        self.assertEqual(len(self.fetches), 2)
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_evicted(self):
+        documents = [_document(100) for __ in range(3)]
+        cache = StructureCache(2 * len(BSON.encode(documents[0])))
+        cache.get(documents[0]['_id'], self._fetcher(documents[0]))
+        cache.get(documents[1]['_id'], self._fetcher(documents[1]))
+        # touch the first, so the second is the least recently used
+        cache.get(documents[0]['_id'], self._fetcher(documents[0]))
+        cache.get(documents[2]['_id'], self._fetcher(documents[2]))
+
+        self.assertIn(documents[0]['_id'], cache)
+        self.assertNotIn(documents[1]['_id'], cache)
+        self.assertIn(documents[2]['_id'], cache)
+        self.assertEqual(cache.stats['evictions'], 1)
+        self.assertLessEqual(cache.size, cache.max_size)
+
+    def test_oversized_document_not_kept(self):
+        cache = StructureCache(10)
+        document = _document(100)
+        self.assertEqual(cache.get(document['_id'], self._fetcher(document)), document)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+    def test_shared_tier(self):
+        shared = MemoryCache()
+        document = _document()
+        StructureCache(10000, shared_cache=shared).get(document['_id'], self._fetcher(document))
+
+        other_process = StructureCache(10000, shared_cache=shared)
+        self.assertEqual(other_process.get(document['_id'], self._fetcher(None)), document)
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(other_process.stats['shared_hits'], 1)
+        self.assertEqual(other_process.stats['misses'], 0)
+
+    def test_clear(self):
+        cache = StructureCache(10000)
+        document = _document()
+        cache.get(document['_id'], self._fetcher(document))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
@@ -5,6 +5,7 @@ import unittest
 import ddt
 from path import path
 from xmodule.contentstore.content import StaticContent, StaticContentStream
+from xmodule.contentstore.content import MAX_STREAM_BUFFER_SIZE, STREAM_DATA_CHUNK_SIZE
 from xmodule.contentstore.content import ContentStore
 from opaque_keys.edx.locations import SlashSeparatedCourseKey, AssetLocation
 from xmodule.static_content import _write_js, _list_descriptors
@@ -161,6 +162,28 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_static_content_stream_data_in_range(self):
+        """
+        Test that in-memory StaticContent streams the requested bytes.
+        """
+        static_content = StaticContent('loc', 'name', 'type', SAMPLE_STRING, length=len(SAMPLE_STRING))
+        self.assertEqual(''.join(static_content.stream_data_in_range(100, 1500)), SAMPLE_STRING[100:1501])
+
+    def test_static_content_stream_buffer_size(self):
+        """
+        Test that StaticContentStream reads a GridFS chunk at a time, up to MAX_STREAM_BUFFER_SIZE.
+        """
+        item = FakeGridFsItem(SAMPLE_STRING)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+        self.assertEqual(static_content_stream.buffer_size, STREAM_DATA_CHUNK_SIZE)
+
+        item.chunk_size = 100
+        self.assertEqual([len(chunk) for chunk in static_content_stream.stream_data_in_range(0, 249)], [100, 100, 50])
+        self.assertEqual(''.join(static_content_stream.stream_data()), SAMPLE_STRING)
+
+        item.chunk_size = MAX_STREAM_BUFFER_SIZE * 2
+        self.assertEqual(static_content_stream.buffer_size, MAX_STREAM_BUFFER_SIZE)
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
@@ -1,20 +1,20 @@
-from xmodule.modulestore.django import modulestore
-from xmodule.course_module import CourseDescriptor
 from django.conf import settings
 
+from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from microsite_configuration import microsite
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 
 
 def get_visible_courses():
     """
-    Return the set of CourseDescriptors that should be visible in this branded instance
-    """
-    _courses = modulestore().get_courses()
+    Return the set of CourseOverviews that should be visible in this branded instance
 
-    courses = [c for c in _courses
-               if isinstance(c, CourseDescriptor)]
-    courses = sorted(courses, key=lambda course: course.number)
+    The courses are listed from the modulestore, so that courses which can't be
+    loaded are left out, and courses which don't have an overview yet get one.
+    """
+    _courses = CourseOverview.get_from_courses(modulestore().get_courses()).values()
+    courses = sorted(_courses, key=lambda course: course.number)
 
     subdomain = microsite.get_value('subdomain', 'default')
 
@@ -12,6 +12,9 @@ file and check it in at the same time as your model changes. To do that,
 
 """
 import logging
+import re
+from string import Formatter
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models, transaction
@@ -19,8 +22,9 @@ from django.db import models, transaction
 from html_to_text import html_to_text
 from mail_utils import wrap_message
 
+from xmodule.modulestore.django import modulestore
 from xmodule_django.models import CourseKeyField
-from util.keyword_substitution import substitute_keywords_with_data
+from util.keyword_substitution import KEYWORD_FUNCTION_MAP, substitute_keywords, substitute_keywords_with_data
 
 log = logging.getLogger(__name__)
 
@@ -150,6 +154,9 @@ class Optout(models.Model):
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# The keys of the email context whose values differ for each recipient.
+COURSE_EMAIL_RECIPIENT_KEYS = ('name', 'email', 'user_id')
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -228,6 +235,104 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, context):
+        """
+        Return a CompiledCourseEmailTemplate which renders the same plain text
+        messages as `render_plaintext`, for recipients which share `context`.
+        """
+        return CompiledCourseEmailTemplate(self.plain_template, plaintext, context)
+
+    def compile_htmltext(self, htmltext, context):
+        """
+        Return a CompiledCourseEmailTemplate which renders the same HTML
+        messages as `render_htmltext`, for recipients which share `context`.
+        """
+        return CompiledCourseEmailTemplate(self.html_template, htmltext, context)
+
+
+class CompiledCourseEmailTemplate(object):
+    """
+    A course email template, rendered once around a message body for all the
+    recipients of a message.
+
+    The template is rendered with a placeholder for each of the values in
+    COURSE_EMAIL_RECIPIENT_KEYS, and for the message body if it has %%KEYWORDS%%
+    to be substituted.  Rendering it for a recipient then only replaces the
+    placeholders, and wraps the lines they're on.  Lines are wrapped one at a
+    time, so the result is the same as CourseEmailTemplate's.
+
+    Templates which format a recipient's values with a conversion, format spec,
+    attribute or index are rendered in full for each recipient.
+    """
+    PLACEHOLDER = u'\x00{}\x00'
+
+    def __init__(self, format_string, message_body, context):
+        self.format_string = format_string
+        self.message_body = message_body
+        self.course_id = context.get('course_id')
+        self.substitutes_keywords = any(keyword in message_body for keyword in KEYWORD_FUNCTION_MAP)
+        self._course = None
+        self._lines = None
+
+        recipient_keys = set()
+        for __, field_name, format_spec, conversion in Formatter().parse(format_string):
+            if field_name is None:
+                continue
+            key = re.match(r'[^.[]*', field_name).group()
+            if key in COURSE_EMAIL_RECIPIENT_KEYS:
+                if field_name != key or format_spec or conversion:
+                    return
+                recipient_keys.add(key)
+        self.recipient_keys = recipient_keys
+
+        compile_context = dict(context)
+        compile_context.update((key, self.PLACEHOLDER.format(key)) for key in COURSE_EMAIL_RECIPIENT_KEYS)
+        result = format_string.format(**compile_context)
+        body = self.PLACEHOLDER.format('message_body') if self.substitutes_keywords else message_body
+        result = result.replace(COURSE_EMAIL_MESSAGE_BODY_TAG.format(), body, 1)
+
+        # Lines without placeholders are the same for every recipient, so they're wrapped now.
+        self._lines = [
+            (line, True) if u'\x00' in line else (wrap_message(line), False)
+            for line in result.split('\n')
+        ]
+
+    def render(self, context, user=None):
+        """
+        Render the message for the recipient whose values are in `context`.
+
+        `user` is the recipient's User, if it's at hand, for substituting
+        %%KEYWORDS%% in the message body.
+        """
+        if self._lines is None:
+            return CourseEmailTemplate._render(self.format_string, self.message_body, context)  # pylint: disable=protected-access
+
+        values = [(self.PLACEHOLDER.format(key), u'{}'.format(context[key])) for key in self.recipient_keys]
+        if self.substitutes_keywords:
+            values.append((self.PLACEHOLDER.format('message_body'), self._substitute_keywords(context, user)))
+
+        lines = []
+        for line, has_placeholders in self._lines:
+            if has_placeholders:
+                for placeholder, value in values:
+                    line = line.replace(placeholder, value)
+                line = wrap_message(line)
+            lines.append(line)
+        return u'\n'.join(lines)
+
+    def _substitute_keywords(self, context, user):
+        """
+        Return the message body with its %%KEYWORDS%% substituted for the recipient.
+        """
+        user_id = context.get('user_id')
+        if user_id is None or self.course_id is None:
+            return self.message_body
+        if user is None:
+            user = User.objects.get(id=user_id)
+        if self._course is None:
+            self._course = modulestore().get_course(self.course_id, depth=0)
+        return substitute_keywords(self.message_body, user, self._course)
+
 
 class CourseAuthorization(models.Model):
     """
@@ -5,7 +5,7 @@ to a course.
 import re
 import random
 import json
-from time import sleep
+from time import sleep, time
 from collections import Counter
 import logging
 
@@ -93,6 +93,40 @@ BULK_EMAIL_FAILURE_ERRORS = (
 )
 
 
+class SendRateController(object):
+    """
+    Paces the emails sent by a subtask, from the responses of the mail server.
+
+    Emails are sent as fast as the server takes them until it throttles them.
+    A throttled subtask is retried, and the retry waits between emails, twice as
+    long for each time the subtask has been throttled, up to
+    BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS seconds.  Each email the server takes
+    shortens the wait slowly, but a retried subtask always waits at least
+    BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS seconds, so that it doesn't go back to
+    the rate it was throttled at.
+    """
+    # How much of the wait is left after an email is sent.
+    DECAY = 0.99
+
+    def __init__(self, retried_nomax):
+        self.min_delay = settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS
+        if retried_nomax > 0:
+            max_delay = getattr(settings, 'BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS', self.min_delay)
+            self.delay = min(self.min_delay * 2 ** (retried_nomax - 1), max(max_delay, self.min_delay))
+        else:
+            self.delay = 0
+
+    def wait(self):
+        """Wait before sending the next email."""
+        if self.delay > 0:
+            sleep(self.delay)
+
+    def sent(self):
+        """Shorten the wait, as the server took an email."""
+        if self.delay > 0:
+            self.delay = max(self.delay * self.DECAY, self.min_delay)
+
+
 def _get_recipient_querysets(user_id, to_option, course_id):
     """
     Returns a list of query sets of email recipients corresponding to the
@@ -140,6 +174,22 @@ def _get_recipient_querysets(user_id, to_option, course_id):
             return recipient_qsets
 
 
+def _with_optout_flag(recipient_qset, course_id):
+    """
+    Returns `recipient_qset` with an 'optout' value for each recipient, which is
+    true if the recipient has opted out of email from the course.
+
+    This lets the recipients who opted out be found by the same query which finds
+    the recipients, rather than by a query for each subtask.
+    """
+    optout_sql = 'EXISTS (SELECT 1 FROM {optout} WHERE {optout}.user_id = {user}.id AND {optout}.course_id = %s)'.format(
+        optout=Optout._meta.db_table,  # pylint: disable=protected-access
+        user=User._meta.db_table,  # pylint: disable=protected-access
+    )
+    course_id_value = Optout._meta.get_field('course_id').get_prep_value(course_id)  # pylint: disable=protected-access
+    return recipient_qset.extra(select={'optout': optout_sql}, select_params=[course_id_value])
+
+
 def _get_course_email_context(course):
     """
     Returns context arguments to apply to all emails, independent of recipient.
@@ -222,11 +272,14 @@ def perform_delegate_email_batches(entry_id, course_id, task_input, action_name)
     def _create_send_email_subtask(to_list, initial_subtask_status):
         """Creates a subtask to send email to a given recipient list."""
         subtask_id = initial_subtask_status.task_id
+        # Skip the recipients who opted out, and pass the rest as compact [pk, email, name] lists.
+        recipients = [(pk, email, name) for email, name, optout, pk in to_list if not optout]
+        initial_subtask_status.increment(skipped=len(to_list) - len(recipients))
         new_subtask = send_course_email.subtask(
             (
                 entry_id,
                 email_id,
-                to_list,
+                recipients,
                 global_email_context,
                 initial_subtask_status.to_dict(),
             ),
@@ -235,8 +288,11 @@ def perform_delegate_email_batches(entry_id, course_id, task_input, action_name)
         )
         return new_subtask
 
-    recipient_qsets = _get_recipient_querysets(user_id, to_option, course_id)
-    recipient_fields = ['profile__name', 'email']
+    recipient_qsets = [
+        _with_optout_flag(recipient_qset, course_id)
+        for recipient_qset in _get_recipient_querysets(user_id, to_option, course_id)
+    ]
+    recipient_fields = ['email', 'profile__name', 'optout']
 
     log.info(u"Task %s: Preparing to queue subtasks for sending emails for course %s, email %s, to_option %s",
              task_id, course_id, email_id, to_option)
@@ -266,7 +322,9 @@ def send_course_email(entry_id, email_id, to_list, global_email_context, subtask
     Inputs are:
       * `entry_id`: id of the InstructorTask object to which progress should be recorded.
       * `email_id`: id of the CourseEmail model that is to be emailed.
-      * `to_list`: list of recipients.  Each is represented as a dict with the following keys:
+      * `to_list`: list of recipients.  Each is represented as a list of [pk, email, name],
+        the primary key, email address and full name of the User, or as a dict with the
+        following keys:
         - 'profile__name': full name of User.
         - 'email': email address of User.
         - 'pk': primary key of User model.
@@ -404,7 +462,9 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
     Inputs are:
       * `entry_id`: id of the InstructorTask object to which progress should be recorded.
       * `email_id`: id of the CourseEmail model that is to be emailed.
-      * `to_list`: list of recipients.  Each is represented as a dict with the following keys:
+      * `to_list`: list of recipients.  Each is represented as a list of [pk, email, name],
+        the primary key, email address and full name of the User, or as a dict with the
+        following keys:
         - 'profile__name': full name of User.
         - 'email': email address of User.
         - 'pk': primary key of User model.
@@ -414,6 +474,7 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
       * `subtask_status` : object of class SubtaskStatus representing current status.
 
     Sends to all addresses contained in to_list that are not also in the Optout table.
+    (Recipients passed as lists have already been checked against it.)
     Emails are sent multi-part, in both plain text and html.
 
     Returns a tuple of two values:
@@ -451,13 +512,19 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         )
         raise
 
+    # Subtasks are queued with a list of [pk, email, name] for each recipient, from which
+    # the recipients who opted out have already been removed.  Subtasks queued before that
+    # was done, and retried subtasks, are passed a dict for each recipient.
+    if to_list and not isinstance(to_list[0], dict):
+        to_list = [{'pk': pk, 'email': email, 'profile__name': name} for pk, email, name in to_list]
+
     # Exclude optouts (if not a retry):
     # Note that we don't have to do the optout logic at all if this is a retry,
     # because we have presumably already performed the optout logic on the first
     # attempt.  Anyone on the to_list on a retry has already passed the filter
     # that existed at that time, and we don't need to keep checking for changes
     # in the Optout list.
-    if subtask_status.get_retry_count() == 0:
+    elif subtask_status.get_retry_count() == 0:
         to_list, num_optout = _filter_optouts_from_recipients(to_list, course_email.course_id)
         subtask_status.increment(skipped=num_optout)
 
@@ -470,6 +537,7 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
 
     # use the CourseEmailTemplate that was associated with the CourseEmail
     course_email_template = course_email.get_template()
+    send_start = time()
     try:
         connection = get_connection()
         connection.open()
@@ -477,6 +545,18 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         # Define context values to use in all course emails:
         email_context = {'name': '', 'email': ''}
         email_context.update(global_email_context)
+        email_context['course_id'] = course_email.course_id
+
+        # Render the templates around the message once, so that only the values
+        # which differ for each recipient are filled in for each of them.
+        plaintext_template = course_email_template.compile_plaintext(course_email.text_message, email_context)
+        html_template = course_email_template.compile_htmltext(course_email.html_message, email_context)
+        if plaintext_template.substitutes_keywords or html_template.substitutes_keywords:
+            users = User.objects.in_bulk([recipient['pk'] for recipient in to_list])
+        else:
+            users = {}
+
+        rate_controller = SendRateController(subtask_status.retried_nomax)
 
         while to_list:
             # Update context with user-specific values from the user at the end of the list.
@@ -490,11 +570,11 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             email_context['email'] = email
             email_context['name'] = current_recipient['profile__name']
             email_context['user_id'] = current_recipient['pk']
-            email_context['course_id'] = course_email.course_id
 
             # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
+            user = users.get(current_recipient['pk'])
+            plaintext_msg = plaintext_template.render(email_context, user)
+            html_msg = html_template.render(email_context, user)
 
             # Create email:
             email_msg = EmailMultiAlternatives(
@@ -506,13 +586,10 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             )
             email_msg.attach_alternative(html_msg, 'text/html')
 
-            # Throttle if we have gotten the rate limiter.  This is not very high-tech,
-            # but if a task has been retried for rate-limiting reasons, then we sleep
-            # for a period of time between all emails within this task.  Choice of
-            # the value depends on the number of workers that might be sending email in
-            # parallel, and what the SES throttle rate is.
-            if subtask_status.retried_nomax > 0:
-                sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+            # Throttle if we have gotten the rate limiter.  If a task has been retried
+            # for rate-limiting reasons, then we wait between emails within this task,
+            # for less time as the server takes them.
+            rate_controller.wait()
 
             try:
                 log.info(
@@ -591,6 +668,7 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
                     email
                 )
                 dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
+                rate_controller.sent()
                 if settings.BULK_EMAIL_LOG_SENT_EMAILS:
                     log.info('Email with id %s sent to %s', email_id, email)
                 else:
@@ -681,6 +759,13 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
     finally:
         # Clean up at the end.
         connection.close()
+        send_duration = time() - send_start
+        if total_recipients_successful and send_duration > 0:
+            dog_stats_api.histogram(
+                'course_email.send_rate',
+                total_recipients_successful / send_duration,
+                tags=[_statsd_tag(course_title)]
+            )
 
 
 def _get_current_task():
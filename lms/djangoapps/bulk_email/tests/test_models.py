@@ -133,6 +133,32 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def _get_recipient_contexts(self, base_context):
+        """Provide contexts for a few recipients, including one whose name makes a long line"""
+        for name, email in [(u'Robot', u'robot@test.com'), (u'R\xf6b\xf6t ' * 200, u'robot2@test.com')]:
+            context = dict(base_context, name=name, email=email, user_id=1)
+            yield context
+
+    def test_compiled_html_matches_render(self):
+        template = CourseEmailTemplate.get_template()
+        message = u"<p>Dear {name}, my new html text.</p>\n" + u"x " * 600
+        compiled = template.compile_htmltext(message, self._get_sample_html_context())
+        for context in self._get_recipient_contexts(self._get_sample_html_context()):
+            self.assertEquals(compiled.render(context), template.render_htmltext(message, context))
+
+    def test_compiled_plain_matches_render(self):
+        template = CourseEmailTemplate.get_template(name="branded.template")
+        message = u"My new plain text."
+        compiled = template.compile_plaintext(message, self._get_sample_plain_context())
+        for context in self._get_recipient_contexts(self._get_sample_plain_context()):
+            self.assertEquals(compiled.render(context), template.render_plaintext(message, context))
+
+    def test_compiled_with_format_spec(self):
+        template = CourseEmailTemplate(plain_template=u"Hi {name!r}, {email:>30}\n{{message_body}}")
+        compiled = template.compile_plaintext(u"Text.", {})
+        context = {'name': u'Robot', 'email': u'robot@test.com'}
+        self.assertEquals(compiled.render(context), template.render_plaintext(u"Text.", context))
+
 
 class CourseAuthorizationTest(TestCase):
     """Test the CourseAuthorization model."""
@@ -27,12 +27,14 @@ from celery.states import SUCCESS, FAILURE
 
 from django.conf import settings
 from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
 
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
-
+from bulk_email.tasks import SendRateController
 from instructor_task.tasks import send_bulk_course_email
 from instructor_task.subtasks import update_subtask_status, SubtaskStatus
-from instructor_task.models import InstructorTask
+from instructor_task.models import InstructorTask, InstructorSubtask
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
@@ -61,10 +63,8 @@ def my_update_subtask_status(entry_id, current_task_id, new_subtask_status):
     This should not be an issue in production, where status is updated before
     a task is retried, and is then updated afterwards if the retry fails.
     """
-    entry = InstructorTask.objects.get(pk=entry_id)
-    subtask_dict = json.loads(entry.subtasks)
-    subtask_status_info = subtask_dict['status']
-    current_subtask_status = SubtaskStatus.from_dict(subtask_status_info[current_task_id])
+    subtask = InstructorSubtask.objects.get(instructor_task_id=entry_id, subtask_id=current_task_id)
+    current_subtask_status = SubtaskStatus.from_dict(json.loads(subtask.status))
     current_retry_count = current_subtask_status.get_retry_count()
     new_retry_count = new_subtask_status.get_retry_count()
     if current_retry_count <= new_retry_count:
@@ -408,3 +408,45 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
 
     def test_failure_on_ses_domain_not_confirmed(self):
         self._test_immediate_failure(SESDomainNotConfirmedError(403, "You're out of bounds!"))
+
+
+@override_settings(BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS=0.02, BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS=0.1)
+class TestSendRateController(TestCase):
+    """Tests pacing the emails sent by a subtask."""
+
+    def test_not_throttled(self):
+        self.assertEquals(SendRateController(0).delay, 0)
+
+    def test_delay_doubles_with_retries(self):
+        self.assertAlmostEquals(SendRateController(1).delay, 0.02)
+        self.assertAlmostEquals(SendRateController(2).delay, 0.04)
+        self.assertAlmostEquals(SendRateController(10).delay, 0.1)
+
+    def test_delay_shortens_as_emails_are_sent(self):
+        controller = SendRateController(3)
+        delays = []
+        for __ in range(30):
+            delays.append(controller.delay)
+            controller.sent()
+        self.assertEquals(delays, sorted(delays, reverse=True))
+        self.assertLess(controller.delay, 0.08)
+        # The wait shortens slowly, rather than going back to full speed.
+        self.assertGreater(controller.delay, 0.05)
+
+    def test_retried_subtask_keeps_min_delay(self):
+        controller = SendRateController(1)
+        for __ in range(1000):
+            controller.sent()
+        self.assertAlmostEquals(controller.delay, 0.02)
+
+    def test_not_throttled_stays_at_full_speed(self):
+        controller = SendRateController(0)
+        controller.sent()
+        self.assertEquals(controller.delay, 0)
+
+    @patch('bulk_email.tasks.sleep')
+    def test_wait(self, mock_sleep):
+        SendRateController(0).wait()
+        self.assertFalse(mock_sleep.called)
+        SendRateController(1).wait()
+        mock_sleep.assert_called_once_with(0.02)
@@ -29,6 +29,7 @@ from student.roles import (
 from student.models import CourseEnrollment, CourseEnrollmentAllowed
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from util.milestones_helpers import get_pre_requisite_courses_not_completed
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 DEBUG_ACCESS = False
 
 log = logging.getLogger(__name__)
@@ -76,7 +77,7 @@ def has_access(user, action, obj, course_key=None):
 
     # delegate the work to type-specific functions.
     # (start with more specific types, then get more general)
-    if isinstance(obj, CourseDescriptor):
+    if isinstance(obj, (CourseDescriptor, CourseOverview)):
         return _has_access_course_desc(user, action, obj)
 
     if isinstance(obj, ErrorDescriptor):
@@ -107,7 +108,8 @@ def has_access(user, action, obj, course_key=None):
 # ================ Implementation helpers ================================
 def _has_access_course_desc(user, action, course):
     """
-    Check if user has access to a course descriptor.
+    Check if user has access to a course descriptor, or the CourseOverview of
+    a course.
 
     Valid actions:
 
@@ -128,6 +130,8 @@ def _has_access_course_desc(user, action, course):
 
         NOTE: this is not checking whether user is actually enrolled in the course.
         """
+        if isinstance(course, CourseOverview):
+            return _can_load_course_overview(user, course)
         # delegate to generic descriptor check to check start dates
         return _has_access_descriptor(user, 'load', course, course.id)
 
@@ -296,6 +300,34 @@ def _has_access_course_desc(user, action, course):
     return _dispatch(checkers, action, user, course)
 
 
+def _can_load_course_overview(user, course_overview):
+    """
+    Can this user load the course which `course_overview` summarizes?  Does the
+    same checks as _has_access_descriptor does for the course itself, except
+    group access, which isn't set on courses.
+    """
+    if course_overview.visible_to_staff_only and not _has_staff_access_to_descriptor(
+            user, course_overview, course_overview.id
+    ):
+        return False
+
+    # If start dates are off, can always load
+    if settings.FEATURES['DISABLE_START_DATES'] and not is_masquerading_as_student(user, course_overview.id):
+        debug("Allow: DISABLE_START_DATES")
+        return True
+
+    if course_overview.start is None:
+        debug("Allow: no start date")
+        return True
+
+    effective_start = _adjust_start_date_for_beta_testers(user, course_overview, course_key=course_overview.id)
+    if datetime.now(UTC()) > effective_start:
+        debug("Allow: now > effective start date")
+        return True
+    # otherwise, need staff access
+    return _has_staff_access_to_descriptor(user, course_overview, course_overview.id)
+
+
 def _has_access_error_desc(user, action, descriptor, course_key):
     """
     Only staff should see error descriptors.
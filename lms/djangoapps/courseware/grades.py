@@ -1,18 +1,21 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import hashlib
 import json
 import random
 import logging
 
 from contextlib import contextmanager
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.test.client import RequestFactory
 
 import dogstats_wrapper as dog_stats_api
 
-from courseware import courses
+from courseware import courses, persistent_grades
+from courseware.access import has_access
 from courseware.model_data import FieldDataCache
 from student.models import anonymous_id_for_user
 from util.module_utils import yield_dynamic_descriptor_descendents
@@ -29,6 +32,73 @@ from opaque_keys import InvalidKeyError
 
 log = logging.getLogger("edx.courseware")
 
+# Number of students whose scores are prefetched together by iterate_grades_for
+GRADING_BATCH_SIZE = 100
+
+# How long a course's table of problem maximum scores is cached, in seconds
+MAX_SCORES_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class MaxScoresCache(object):
+    """
+    A per-course table of the maximum score of each problem, so that the total
+    of a problem a student hasn't been graded on can be found without
+    instantiating the problem.
+
+    The table is kept in the django cache under a key which includes the
+    course's version (see persistent_grades.course_version), so republishing
+    the course starts a new table. Scores are added to it as problems are
+    instantiated while grading, and written back by push_to_remote.
+    """
+    def __init__(self, cache_key):
+        self.cache_key = cache_key
+        self._max_scores = {}
+        self._new_max_scores = {}
+
+    @classmethod
+    def create_for_course(cls, course):
+        """
+        Return the MaxScoresCache of `course`. Courses without a version get an
+        empty table which is never stored.
+        """
+        version = persistent_grades.course_version(course)
+        if version is None:
+            return cls(None)
+        key = u"{}\n{}".format(course.id, version).encode('utf-8')
+        return cls("grades.max_scores.{}".format(hashlib.md5(key).hexdigest()))
+
+    def fetch_from_remote(self):
+        """
+        Load the table from the django cache.
+        """
+        if self.cache_key is not None:
+            self._max_scores = cache.get(self.cache_key) or {}
+            self._max_scores.update(self._new_max_scores)
+
+    def push_to_remote(self):
+        """
+        Add the scores set since the table was loaded to the table in the django cache.
+        """
+        if self.cache_key is not None and self._new_max_scores:
+            max_scores = cache.get(self.cache_key) or {}
+            max_scores.update(self._new_max_scores)
+            cache.set(self.cache_key, max_scores, MAX_SCORES_CACHE_TIMEOUT)
+            self._new_max_scores = {}
+
+    def get(self, usage_key):
+        """
+        Return the maximum score of the problem `usage_key`, or None if it isn't known.
+        """
+        return self._max_scores.get(_module_state_key_string(usage_key))
+
+    def set(self, usage_key, max_score):
+        """
+        Record the maximum score of the problem `usage_key`.
+        """
+        key = _module_state_key_string(usage_key)
+        if self._max_scores.get(key) != max_score:
+            self._max_scores[key] = self._new_max_scores[key] = max_score
+
 
 def answer_distributions(course_key):
     """
@@ -122,16 +192,18 @@ def answer_distributions(course_key):
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, module_scores=None, submissions_scores=None,
+          max_scores_cache=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, module_scores, submissions_scores, max_scores_cache)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, module_scores=None, submissions_scores=None,
+           max_scores_cache=None):
     """
     Unwrapped version of "grade"
 
@@ -150,17 +222,47 @@ def _grade(student, request, course, keep_raw_scores):
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    module_scores and submissions_scores may be passed in by callers that have
+    already fetched this student's scores in bulk (see `iterate_grades_for`).
+    module_scores is a dict as returned by `get_student_module_scores`, and
+    submissions_scores is a dict as returned by `submissions.api.get_scores`.
+    If module_scores isn't given, this student's scores are fetched with a
+    single query, so no per-section or per-problem score queries are made.
+    max_scores_cache is a MaxScoresCache of the course, which callers grading
+    many students can share.
+
+    If persistent grades are enabled, a fresh stored grade for the student is
+    returned as is, and otherwise only the subsections whose scores changed
+    since they were last stored are rescored.
+
     More information on the format is in the docstring for CourseGrader.
     """
-    grading_context = course.grading_context
-    raw_scores = []
-
     # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
     # scores that were registered with the submissions API, which for the moment
     # means only openassessment (edx-ora2)
-    submissions_scores = sub_api.get_scores(
-        course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
-    )
+    if submissions_scores is None:
+        submissions_scores = sub_api.get_scores(
+            course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
+        )
+
+    version = None
+    if persistent_grades.is_enabled(course):
+        version = persistent_grades.grade_version(student, course, submissions_scores)
+        if not keep_raw_scores:
+            grade_summary = persistent_grades.get_course_grade(student, course, version)
+            if grade_summary is not None:
+                return grade_summary
+
+    grading_context = course.grading_context
+    raw_scores = []
+    if module_scores is None and student.is_authenticated():
+        module_scores = get_student_module_scores(course.id, [student.id])[student.id]
+    push_max_scores = max_scores_cache is None
+    if push_max_scores:
+        max_scores_cache = MaxScoresCache.create_for_course(course)
+        max_scores_cache.fetch_from_remote()
+    # Grades that depend on problems which are always recalculated can't be stored
+    persist_course_grade = version is not None
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -177,6 +279,8 @@ def _grade(student, request, course, keep_raw_scores):
             should_grade_section = any(
                 descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
             )
+            if should_grade_section:
+                persist_course_grade = False
 
             # If there are no problems that always have to be regraded, check to
             # see if any of our locations are in the scores from the submissions
@@ -187,7 +291,12 @@ def _grade(student, request, course, keep_raw_scores):
                     for descriptor in section['xmoduledescriptors']
                 )
 
-            if not should_grade_section:
+            if not should_grade_section and module_scores is not None:
+                should_grade_section = any(
+                    _module_state_key_string(descriptor.location) in module_scores
+                    for descriptor in section['xmoduledescriptors']
+                )
+            elif not should_grade_section:
                 with manual_transaction():
                     should_grade_section = StudentModule.objects.filter(
                         student=student,
@@ -209,26 +318,22 @@ def _grade(student, request, course, keep_raw_scores):
                         field_data_cache = FieldDataCache([descriptor], course.id, student)
                     return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
 
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
-
-                    (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
+                subsection_scores = _get_subsection_scores(
+                    student, course, section_descriptor, create_module, submissions_scores, module_scores, version,
+                    max_scores_cache
+                )
+                for (correct, total, graded, display_name) in subsection_scores:
                     if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
                         if total > 1:
                             correct = random.randrange(max(total - 2, 1), total + 1)
                         else:
                             correct = total
 
-                    graded = module_descriptor.graded
                     if not total > 0:
                         #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
                         graded = False
 
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                    scores.append(Score(correct, total, graded, display_name))
 
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
@@ -247,6 +352,9 @@ def _grade(student, request, course, keep_raw_scores):
 
         totaled_scores[section_format] = format_scores
 
+    if push_max_scores:
+        max_scores_cache.push_to_remote()
+
     grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
 
     # We round the grade here, to make sure that the grade is an whole percentage and
@@ -256,6 +364,8 @@ def _grade(student, request, course, keep_raw_scores):
     letter_grade = grade_for_percentage(course.grade_cutoffs, grade_summary['percent'])
     grade_summary['grade'] = letter_grade
     grade_summary['totaled_scores'] = totaled_scores  	# make this available, eg for instructor download & debugging
+    if persist_course_grade:
+        persistent_grades.set_course_grade(student, course, version, grade_summary)
     if keep_raw_scores:
         # way to get all RAW scores out to instructor
         # so grader can be double-checked
@@ -263,6 +373,44 @@ def _grade(student, request, course, keep_raw_scores):
     return grade_summary
 
 
+def _get_subsection_scores(student, course, section, module_creator, submissions_scores, module_scores, version,
+                           max_scores_cache=None):
+    """
+    Return a list of (earned, possible, graded, display_name) tuples, one for
+    each block with a score in `section` (a subsection descriptor or module).
+    `graded` is whether the block itself is marked as graded.
+
+    If `version` is the student's grade version (see
+    persistent_grades.grade_version) rather than None, the stored scores for
+    the subsection are returned when they are fresh, and freshly computed
+    scores are stored.
+    """
+    if version is not None:
+        scores = persistent_grades.get_subsection_scores(student, course, version, section.location)
+        if scores is not None:
+            return scores
+
+    scores = []
+    module_keys = set()
+    for module_descriptor in yield_dynamic_descriptor_descendents(section, module_creator):
+        module_keys.add(module_descriptor.location)
+        if module_descriptor.always_recalculate_grades:
+            version = None
+
+        (correct, total) = get_score(
+            course.id, student, module_descriptor, module_creator, scores_cache=submissions_scores,
+            module_scores=module_scores, max_scores_cache=max_scores_cache
+        )
+        if correct is None and total is None:
+            continue
+
+        scores.append((correct, total, module_descriptor.graded, module_descriptor.display_name_with_default))
+
+    if version is not None:
+        persistent_grades.set_subsection_scores(student, course, version, section.location, module_keys, scores)
+    return scores
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -331,6 +479,12 @@ def _progress_summary(student, request, course):
             return None
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+    version = None
+    if persistent_grades.is_enabled(course):
+        version = persistent_grades.grade_version(student, course, submissions_scores)
+    module_scores = get_student_module_scores(course.id, [student.id])[student.id]
+    max_scores_cache = MaxScoresCache.create_for_course(course)
+    max_scores_cache.fetch_from_remote()
 
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
@@ -352,15 +506,12 @@ def _progress_summary(student, request, course):
 
                 module_creator = section_module.xmodule_runtime.get_module
 
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                subsection_scores = _get_subsection_scores(
+                    student, course, section_module, module_creator, submissions_scores, module_scores, version,
+                    max_scores_cache
+                )
+                for (correct, total, _, display_name) in subsection_scores:
+                    scores.append(Score(correct, total, graded, display_name))
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -384,10 +535,12 @@ def _progress_summary(student, request, course):
             'sections': sections
         })
 
+    max_scores_cache.push_to_remote()
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, module_scores=None,
+              max_scores_cache=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -401,6 +554,12 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    module_scores: A dict of this user's StudentModule scores for the course, as
+           returned by `get_student_module_scores`. If given, it is used instead
+           of querying StudentModule for this problem.
+    max_scores_cache: A MaxScoresCache of the course. If the user hasn't been
+           graded on this problem, its total is looked up there rather than by
+           instantiating the problem, and recorded there when it is instantiated.
     """
     scores_cache = scores_cache or {}
 
@@ -427,39 +586,51 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
+    if module_scores is not None:
+        module_grade, module_max_grade = module_scores.get(
+            _module_state_key_string(problem_descriptor.location), (None, None)
         )
-    except StudentModule.DoesNotExist:
-        student_module = None
-
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
     else:
-        # If the problem was not in the cache, or hasn't been graded yet,
-        # we need to instantiate the problem.
-        # Otherwise, the max score (cached in student_module) won't be available
-        problem = module_creator(problem_descriptor)
-        if problem is None:
-            return (None, None)
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+            module_grade, module_max_grade = student_module.grade, student_module.max_grade
+        except StudentModule.DoesNotExist:
+            module_grade, module_max_grade = None, None
 
+    if module_max_grade is not None:
+        correct = module_grade if module_grade is not None else 0
+        total = module_max_grade
+    else:
         correct = 0.0
-        total = problem.max_score()
-
-        # Problem may be an error module (if something in the problem builder failed)
-        # In which case total might be None
-        if total is None:
-            return (None, None)
+        total = max_scores_cache.get(problem_descriptor.location) if max_scores_cache is not None else None
+        # module_creator returns None if the user can't load the problem, so the
+        # access check is still needed when the total comes from the table
+        if total is None or not has_access(user, 'load', problem_descriptor, course_id):
+            # If the problem was not in the cache, or hasn't been graded yet,
+            # we need to instantiate the problem.
+            # Otherwise, the max score (cached in student_module) won't be available
+            problem = module_creator(problem_descriptor)
+            if problem is None:
+                return (None, None)
+
+            total = problem.max_score()
+
+            # Problem may be an error module (if something in the problem builder failed)
+            # In which case total might be None
+            if total is None:
+                return (None, None)
+            if max_scores_cache is not None:
+                max_scores_cache.set(problem_descriptor.location, total)
 
     # Now we re-weight the problem, if specified
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(problem_descriptor.location))
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -467,6 +638,48 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     return (correct, total)
 
 
+def _module_state_key_string(usage_key):
+    """
+    Return the string under which `usage_key` is stored in
+    StudentModule.module_state_key, so that in-memory lookups match exactly the
+    rows a `module_state_key=usage_key` query would find.
+    """
+    return StudentModule._meta.get_field('module_state_key').get_prep_value(usage_key)
+
+
+def get_student_module_scores(course_key, student_ids):
+    """
+    Fetch the StudentModule grades for many students in a course with a single
+    query.
+
+    Returns a dict mapping each student id to a dict of
+    {module_state_key string: (grade, max_grade)}. Every StudentModule row is
+    included, even ungraded ones, so that the presence of a key means the
+    student has state for that module. Students with no state at all are
+    mapped to an empty dict.
+    """
+    scores = dict((student_id, {}) for student_id in student_ids)
+    rows = StudentModule.objects.filter(
+        course_id=course_key,
+        student__in=student_ids,
+    ).values_list('student', 'module_state_key', 'grade', 'max_grade')
+    for student_id, module_state_key, module_grade, module_max_grade in rows:
+        scores[student_id][module_state_key] = (module_grade, module_max_grade)
+    return scores
+
+
+def _chunks(iterable, size):
+    """Yield successive lists of at most `size` items from `iterable`."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 @contextmanager
 def manual_transaction():
     """A context manager for managing manual transactions"""
@@ -480,11 +693,17 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def iterate_grades_for(course_id, students, batch_size=GRADING_BATCH_SIZE):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
 
+    Students are graded in batches of `batch_size`. The StudentModule scores
+    for each batch are fetched up front in a single query, and the course
+    grader then runs over that in-memory table, so the resulting gradesets are
+    the same as calling `grade` for each student. Scores registered with the
+    submissions API are fetched through that API for each student.
+
     If an error occurred, gradeset will be an empty dict and err_msg will be an
     exception message. If there was no error, err_msg is an empty string.
 
@@ -504,26 +723,46 @@ def iterate_grades_for(course_id, students):
     # the request. We have to attach the correct user to the request before
     # grading that student.
     request = RequestFactory().get('/')
+    max_scores_cache = MaxScoresCache.create_for_course(course)
+    max_scores_cache.fetch_from_remote()
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    for batch in _chunks(students, batch_size):
+        student_ids = [student.id for student in batch]
+        try:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for.prefetch', tags=[u'action:{}'.format(course_id)]):
+                module_scores = get_student_module_scores(course.id, student_ids)
+        except Exception:  # pylint: disable=broad-except
+            # Fall back to fetching each student's scores as they're graded, so
+            # that an error only fails the students it affects.
+            log.exception('Cannot prefetch scores for %d students in course %s', len(batch), course_id)
+            module_scores = {}
+
+        for student in batch:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(
+                        student,
+                        request,
+                        course,
+                        module_scores=module_scores.get(student.id),
+                        max_scores_cache=max_scores_cache,
+                    )
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course_id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
+        max_scores_cache.push_to_remote()
@@ -0,0 +1,144 @@
+"""
+Writes StudentModuleHistory rows, either one at a time as StudentModules are
+saved, or buffered and inserted in bulk.
+
+The STUDENT_MODULE_HISTORY_WRITES setting chooses how durable the history is:
+
+    'immediate': each row is inserted as its StudentModule is saved, in the same
+        transaction. This is the default.
+
+    'request_end': rows are buffered, and inserted in bulk when the request or
+        celery task ends. Rows buffered by a process which dies before then are
+        lost.
+
+    'celery': rows are buffered, and when the request or celery task ends they
+        are sent to a celery task which inserts them in bulk. Rows are lost if
+        the task is.
+
+In both buffered modes, the buffer is also written whenever it holds
+STUDENT_MODULE_HISTORY_BATCH_SIZE rows, and it's discarded when a request fails
+with an exception, as the request's own writes are rolled back.
+
+Requests are flushed by HistoryWriterMiddleware, once the request's transaction
+is committed, and celery tasks by the task_postrun receiver in courseware.tasks.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import got_request_exception
+from django.dispatch import receiver
+
+log = logging.getLogger(__name__)
+
+IMMEDIATE = 'immediate'
+REQUEST_END = 'request_end'
+CELERY = 'celery'
+
+DEFAULT_BATCH_SIZE = 100
+
+# Each thread buffers the rows written by the request or task it's handling.
+_BUFFER = threading.local()
+
+
+def _write_mode():
+    """
+    Return the configured STUDENT_MODULE_HISTORY_WRITES mode.
+    """
+    return getattr(settings, 'STUDENT_MODULE_HISTORY_WRITES', IMMEDIATE)
+
+
+def _buffered_entries():
+    """
+    Return this thread's list of buffered StudentModuleHistory rows.
+    """
+    if not hasattr(_BUFFER, 'entries'):
+        _BUFFER.entries = []
+    return _BUFFER.entries
+
+
+def write_history(entry):
+    """
+    Write the unsaved StudentModuleHistory `entry`, as the configured mode says.
+    """
+    if _write_mode() == IMMEDIATE:
+        entry.save()
+        return
+
+    entries = _buffered_entries()
+    entries.append(entry)
+    if len(entries) >= getattr(settings, 'STUDENT_MODULE_HISTORY_BATCH_SIZE', DEFAULT_BATCH_SIZE):
+        flush_history()
+
+
+def history_entry_to_dict(entry):
+    """
+    Return the fields of the StudentModuleHistory `entry`, in a form which can be
+    sent to a celery task.
+    """
+    return {
+        'student_module_id': entry.student_module_id,
+        'version': entry.version,
+        'created': entry.created.isoformat() if entry.created else None,
+        'state': entry.state,
+        'grade': entry.grade,
+        'max_grade': entry.max_grade,
+    }
+
+
+def insert_history(entries):
+    """
+    Insert the unsaved StudentModuleHistory `entries` in bulk.
+    """
+    type(entries[0]).objects.bulk_create(entries)
+
+
+def flush_history(**kwargs):  # pylint: disable=unused-argument
+    """
+    Write this thread's buffered StudentModuleHistory rows.
+    """
+    entries = _buffered_entries()
+    if not entries:
+        return
+    _BUFFER.entries = []
+
+    try:
+        if _write_mode() == CELERY:
+            # imported here, as the tasks import the models which import this module
+            from courseware.tasks import write_student_module_history
+            write_student_module_history.delay([history_entry_to_dict(entry) for entry in entries])
+        else:
+            insert_history(entries)
+    except Exception:  # pylint: disable=broad-except
+        # Losing the history isn't worth failing the request or task for.
+        log.exception(u"Couldn't write %d StudentModuleHistory rows", len(entries))
+
+
+@receiver(got_request_exception)
+def discard_history(**kwargs):  # pylint: disable=unused-argument
+    """
+    Discard this thread's buffered StudentModuleHistory rows.
+    """
+    _BUFFER.entries = []
+
+
+class HistoryWriterMiddleware(object):
+    """
+    Write the StudentModuleHistory rows buffered by each request.
+
+    This goes before TransactionMiddleware, so that the rows are written once the
+    request's transaction is committed, but before Django closes the database
+    connection when the request finishes.
+    """
+    def process_response(self, request, response):  # pylint: disable=unused-argument
+        """
+        Write the request's buffered rows.
+        """
+        flush_history()
+        return response
+
+
+# Write what's left when a process which doesn't handle requests or tasks (e.g.
+# a management command) exits.
+atexit.register(flush_history)
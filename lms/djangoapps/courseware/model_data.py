@@ -2,6 +2,7 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import copy
 import json
 from collections import defaultdict
 from itertools import chain
@@ -62,6 +63,9 @@ class FieldDataCache(object):
         asides: The list of aside types to load, or None to prefetch no asides.
         '''
         self.cache = {}
+        # The decoded state of each StudentModule in the cache, by cache key:
+        # (the state string it was decoded from, the decoded state)
+        self._decoded_states = {}
         self.descriptors = descriptors
         self.select_for_update = select_for_update
 
@@ -305,6 +309,36 @@ class FieldDataCache(object):
         self.cache[cache_key] = field_object
         return field_object
 
+    def get_state(self, key):
+        '''
+        Return the decoded state of the StudentModule for the Scope.user_state `key`,
+        or None if there isn't one in this cache.
+
+        The state is decoded once, and the same dict is returned until the
+        StudentModule's state is replaced, so changes made to it are seen by
+        later calls. `encode_state` writes them back to the StudentModule.
+        '''
+        field_object = self.find(key)
+        if field_object is None:
+            return None
+
+        cache_key = self._cache_key_from_kvs_key(key)
+        decoded_from, state = self._decoded_states.get(cache_key, (None, None))
+        if state is None or decoded_from is not field_object.state:
+            state = json.loads(field_object.state)
+            self._decoded_states[cache_key] = (field_object.state, state)
+        return state
+
+    def encode_state(self, key):
+        '''
+        Write the decoded state of the StudentModule for the Scope.user_state `key`
+        back to the StudentModule, ready to be saved.
+        '''
+        field_object = self.find(key)
+        state = self.get_state(key)
+        field_object.state = json.dumps(state)
+        self._decoded_states[self._cache_key_from_kvs_key(key)] = (field_object.state, state)
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -317,6 +351,8 @@ class DjangoKeyValueStore(KeyValueStore):
     Access to any other scopes will raise an InvalidScopeError
 
     Data for Scope.user_state is stored as StudentModule objects via the django orm.
+    Their state is decoded once by the FieldDataCache, and encoded again only when
+    it's saved.
 
     Data for the other scopes is stored in individual objects that are named for the
     scope involved and have the field name as a key
@@ -343,7 +379,8 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            # Copied, so that changes made to the value don't change the cached state
+            return copy.deepcopy(self._field_data_cache.get_state(key)[key.field_name])
         else:
             return json.loads(field_object.value)
 
@@ -364,6 +401,9 @@ class DjangoKeyValueStore(KeyValueStore):
         saved_fields = []
         # field_objects maps a field_object to a list of associated fields
         field_objects = dict()
+        # changed_states maps a StudentModule to a key for its state, which is
+        # encoded once all its fields are set
+        changed_states = dict()
         for field in kv_dict:
             # Check field for validity
             if field.scope not in self._allowed_scopes:
@@ -378,14 +418,17 @@ class DjangoKeyValueStore(KeyValueStore):
 
             # Special case when scope is for the user state, because this scope saves fields in a single row
             if field.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[field.field_name] = kv_dict[field]
-                field_object.state = json.dumps(state)
+                state = self._field_data_cache.get_state(field)
+                state[field.field_name] = copy.deepcopy(kv_dict[field])
+                changed_states[field_object] = field
             else:
                 # The remaining scopes save fields on different rows, so
                 # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[field])
 
+        for field in changed_states.itervalues():
+            self._field_data_cache.encode_state(field)
+
         for field_object in field_objects:
             try:
                 # Save the field object that we made above
@@ -406,9 +449,9 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
+            state = self._field_data_cache.get_state(key)
             del state[key.field_name]
-            field_object.state = json.dumps(state)
+            self._field_data_cache.encode_state(key)
             field_object.save()
         else:
             field_object.delete()
@@ -422,6 +465,6 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.get_state(key)
         else:
             return True
@@ -15,11 +15,13 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
 
+from courseware.history_writer import write_history
+
 
 class StudentModule(models.Model):
     """
@@ -119,7 +121,8 @@ class StudentModuleHistory(models.Model):
         """
         Checks the instance's module_type, and creates & saves a
         StudentModuleHistory entry if the module_type is one that
-        we save.
+        we save. The entry is saved as the STUDENT_MODULE_HISTORY_WRITES
+        setting says (see courseware.history_writer).
         """
         if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
             history_entry = StudentModuleHistory(student_module=instance,
@@ -128,7 +131,7 @@ class StudentModuleHistory(models.Model):
                                                  state=instance.state,
                                                  grade=instance.grade,
                                                  max_grade=instance.max_grade)
-            history_entry.save()
+            write_history(history_entry)
 
 
 class XBlockFieldBase(models.Model):
@@ -195,6 +198,96 @@ class XModuleStudentInfoField(XBlockFieldBase):
     student = models.ForeignKey(User, db_index=True)
 
 
+class PersistentCourseGrade(models.Model):
+    """
+    The course grade summary last computed for a student by courseware.grades,
+    stored as JSON. A row is only valid for the grade version it was computed
+    against (see courseware.persistent_grades.grade_version), and is deleted whenever one of the student's scores in the course
+    changes. See courseware.persistent_grades.
+    """
+    class Meta:  # pylint: disable=missing-docstring
+        unique_together = (('student', 'course_id'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The student's grade version when this grade was computed
+    course_version = models.CharField(max_length=255)
+    grade_summary = models.TextField()
+
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class PersistentSubsectionGrade(models.Model):
+    """
+    The problem scores last computed for a student in one subsection, stored as
+    a JSON list of [earned, possible, graded, display_name] entries.
+
+    Each block visited while scoring the subsection has a
+    PersistentSubsectionGradeModule row, so that a score change on any of them
+    can find and delete the rows it affects.
+    """
+    class Meta:  # pylint: disable=missing-docstring
+        unique_together = (('student', 'course_id', 'usage_key'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+    # The student's grade version when these scores were computed
+    course_version = models.CharField(max_length=255)
+    scores = models.TextField()
+
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class PersistentSubsectionGradeModule(models.Model):
+    """
+    A block visited while computing a PersistentSubsectionGrade.
+    """
+    subsection_grade = models.ForeignKey(PersistentSubsectionGrade, related_name='modules')
+    module_state_key = LocationKeyField(max_length=255, db_index=True)
+
+
+# The receivers which keep persisted grades fresh are connected here, so that
+# they're connected wherever StudentModules are saved.
+
+@receiver(post_init, sender=StudentModule)
+def remember_loaded_score(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remember the score a StudentModule was loaded with, so that saving it only
+    invalidates persisted grades when the score actually changed.
+    """
+    instance._loaded_score = (instance.grade, instance.max_grade)  # pylint: disable=protected-access
+
+
+@receiver(post_save, sender=StudentModule)
+def invalidate_grades_on_score_change(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Delete the persisted grades that depend on a StudentModule when its score
+    changes. New StudentModules invalidate as well, since whether a student
+    has any state in a subsection affects how it is graded.
+    """
+    # imported here, as persistent_grades imports these models
+    from courseware.persistent_grades import invalidate_grades
+
+    if created or instance._loaded_score != (instance.grade, instance.max_grade):  # pylint: disable=protected-access
+        invalidate_grades(instance.student_id, instance.course_id, instance.module_state_key)
+        instance._loaded_score = (instance.grade, instance.max_grade)  # pylint: disable=protected-access
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_grades_on_state_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Delete the persisted grades that depend on a StudentModule that is being
+    deleted, e.g. when an instructor resets a student's state.
+    """
+    # imported here, as persistent_grades imports these models
+    from courseware.persistent_grades import invalidate_grades
+
+    invalidate_grades(instance.student_id, instance.course_id, instance.module_state_key)
+
+
 class OfflineComputedGrade(models.Model):
     """
     Table of grades computed offline for a given user and course.
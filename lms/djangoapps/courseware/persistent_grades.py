@@ -0,0 +1,208 @@
+"""
+Storage for computed course and subsection grades.
+
+courseware.grades stores the result of grading a student in a
+PersistentCourseGrade row, and the problem scores of each subsection it
+visits in a PersistentSubsectionGrade row. Later calls to grade() and
+progress_summary() read those rows back instead of walking the course and
+loading every problem, as long as they are still fresh:
+
+* Every row records the student's grade version when it was computed (see
+  grade_version), which changes when the course is republished, when a
+  block's release date passes, when the student's staff or beta tester role
+  changes, and when the submissions API records a new score for them.
+* When one of a student's StudentModule scores changes, the student's course
+  grade and the subsections containing that module are deleted, so only
+  those subsections are recomputed. The receivers which do this are in
+  courseware.models, so they're connected wherever StudentModules are saved.
+
+Grades in courses with user partitions (content groups or experiments)
+aren't stored, as which blocks a student sees there can change without any
+of the above.
+
+This is only active when FEATURES['ENABLE_PERSISTENT_GRADES'] is set.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.db import IntegrityError
+from pytz import UTC
+
+from courseware.access import has_access
+from courseware.models import (
+    PersistentCourseGrade, PersistentSubsectionGrade, PersistentSubsectionGradeModule
+)
+from student.roles import CourseBetaTesterRole
+from xmodule.graders import Score
+
+
+log = logging.getLogger("edx.courseware")
+
+
+def course_version(course):
+    """
+    Return the version stamp of `course`'s content, or None if the course
+    doesn't have one (in which case grades for it are never persisted).
+    """
+    edited_on = getattr(course, 'subtree_edited_on', None)
+    if edited_on is None:
+        return None
+    return unicode(edited_on)
+
+
+def is_enabled(course):
+    """
+    Return whether grades for `course` may be read from and written to the
+    persistent grade tables.
+    """
+    return (
+        settings.FEATURES.get('ENABLE_PERSISTENT_GRADES', False) and
+        not settings.GENERATE_PROFILE_SCORES and
+        not course.user_partitions and
+        course_version(course) is not None
+    )
+
+
+def grade_version(student, course, submissions_scores):
+    """
+    Return the version stamp that `student`'s persisted grades in `course` are
+    checked against.
+
+    Besides the course's content, it covers everything which decides the
+    blocks the student can load, and so the scores which are counted: their
+    staff and beta tester roles, and which blocks have been released to them.
+    It also covers `submissions_scores`, the student's scores from the
+    submissions API.
+    """
+    is_beta_tester = CourseBetaTesterRole(course.id).has_user(student)
+    version = [
+        course_version(course),
+        bool(has_access(student, 'staff', course)),
+        is_beta_tester,
+        _released_block_count(course, is_beta_tester),
+        sorted(submissions_scores.iteritems()),
+    ]
+    return hashlib.sha1(json.dumps(version)).hexdigest()
+
+
+def _released_block_count(course, is_beta_tester):
+    """
+    Return the number of the course's chapters and graded blocks which have
+    been released, to a beta tester if `is_beta_tester`. As release dates only
+    pass, the count changes whenever a block is released.
+    """
+    if settings.FEATURES['DISABLE_START_DATES']:
+        return None
+
+    now = datetime.now(UTC)
+    count = 0
+    for descriptor in chain(course.get_children(), course.grading_context['all_descriptors']):
+        start = descriptor.start
+        if start is not None and is_beta_tester and descriptor.days_early_for_beta is not None:
+            start -= timedelta(descriptor.days_early_for_beta)
+        if start is None or start <= now:
+            count += 1
+    return count
+
+
+def get_course_grade(student, course, version):
+    """
+    Return the stored grade summary for `student` in `course`, in the form
+    returned by courseware.grades.grade(), or None if there is none for the
+    grade version `version`.
+    """
+    try:
+        stored = PersistentCourseGrade.objects.get(student=student, course_id=course.id)
+    except PersistentCourseGrade.DoesNotExist:
+        return None
+    if stored.course_version != version:
+        return None
+
+    grade_summary = json.loads(stored.grade_summary)
+    grade_summary['totaled_scores'] = {
+        section_format: [Score(*score) for score in scores]
+        for section_format, scores in grade_summary['totaled_scores'].iteritems()
+    }
+    return grade_summary
+
+
+def set_course_grade(student, course, version, grade_summary):
+    """
+    Store `grade_summary` as the current grade for `student` in `course`.
+    """
+    _update_or_create(
+        PersistentCourseGrade,
+        {'student': student, 'course_id': course.id},
+        course_version=version,
+        grade_summary=json.dumps(grade_summary),
+    )
+
+
+def get_subsection_scores(student, course, version, usage_key):
+    """
+    Return the stored list of (earned, possible, graded, display_name) tuples
+    for the problems `student` can see in the subsection `usage_key`, or None
+    if there is none for the grade version `version`.
+    """
+    try:
+        stored = PersistentSubsectionGrade.objects.get(student=student, course_id=course.id, usage_key=usage_key)
+    except PersistentSubsectionGrade.DoesNotExist:
+        return None
+    if stored.course_version != version:
+        return None
+    return [tuple(score) for score in json.loads(stored.scores)]
+
+
+def set_subsection_scores(student, course, version, usage_key, module_keys, scores):
+    """
+    Store the problem `scores` computed for `student` in the subsection
+    `usage_key`. `module_keys` are the usage keys of all the blocks visited
+    to compute them.
+    """
+    lookup = {'student': student, 'course_id': course.id, 'usage_key': usage_key}
+    PersistentSubsectionGrade.objects.filter(**lookup).delete()
+    try:
+        subsection_grade = PersistentSubsectionGrade.objects.create(
+            course_version=version,
+            scores=json.dumps(scores),
+            **lookup
+        )
+    except IntegrityError:
+        log.info(u"Persistent grade for %s was created concurrently", lookup)
+        return
+    PersistentSubsectionGradeModule.objects.bulk_create([
+        PersistentSubsectionGradeModule(subsection_grade=subsection_grade, module_state_key=module_key)
+        for module_key in module_keys
+    ])
+
+
+def invalidate_grades(student_id, course_key, module_state_key=None):
+    """
+    Delete the stored grades of a student in a course that depend on the
+    module with the given module_state_key. If no module_state_key is given,
+    all of the student's stored grades in the course are deleted.
+    """
+    PersistentCourseGrade.objects.filter(student_id=student_id, course_id=course_key).delete()
+    subsections = PersistentSubsectionGrade.objects.filter(student_id=student_id, course_id=course_key)
+    if module_state_key is not None:
+        subsections = subsections.filter(modules__module_state_key=module_state_key)
+    subsections.delete()
+
+
+def _update_or_create(model, lookup, **values):
+    """
+    Update the `model` row matching `lookup` with `values`, creating it if
+    needed. Losing a race to create the row is harmless, as whichever writer
+    won stored an equally valid result.
+    """
+    updated = model.objects.filter(**lookup).update(**values)
+    if not updated:
+        values.update(lookup)
+        try:
+            model.objects.create(**values)
+        except IntegrityError:
+            log.info(u"Persistent grade for %s was created concurrently", lookup)
@@ -0,0 +1,34 @@
+"""
+Celery tasks of the courseware app.
+"""
+from celery import task
+from celery.signals import task_postrun
+from dateutil.parser import parse as parse_date
+
+from courseware.history_writer import flush_history, insert_history
+from courseware.models import StudentModuleHistory
+
+
+@task()  # pylint: disable=not-callable
+def write_student_module_history(entries):
+    """
+    Insert StudentModuleHistory rows in bulk. `entries` is a list of dicts of
+    their fields, from courseware.history_writer.history_entry_to_dict.
+    """
+    if not entries:
+        return
+    insert_history([
+        StudentModuleHistory(
+            student_module_id=entry['student_module_id'],
+            version=entry['version'],
+            created=parse_date(entry['created']) if entry['created'] else None,
+            state=entry['state'],
+            grade=entry['grade'],
+            max_grade=entry['max_grade'],
+        )
+        for entry in entries
+    ])
+
+
+# Write the StudentModuleHistory rows each task buffered.
+task_postrun.connect(flush_history, dispatch_uid='courseware.history_writer.flush_history')
@@ -2,18 +2,22 @@
 Test grade calculation.
 """
 from django.http import Http404
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
-from mock import patch
+from mock import MagicMock, patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import MaxScoresCache, get_score, get_student_module_scores, grade, iterate_grades_for
+from courseware.tests.factories import StudentModuleFactory
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MOCK_MODULESTORE
+from student.models import anonymous_id_for_user
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from submissions import api as sub_api
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, **kwargs):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -24,7 +28,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, **kwargs)
 
 
 class TestGradeIteration(ModuleStoreTestCase):
@@ -106,7 +110,105 @@ class TestGradeIteration(ModuleStoreTestCase):
         self.assertTrue(all_gradesets[student2])
         self.assertTrue(all_gradesets[student5])
 
+    def test_batched_grades_match_grade(self):
+        """Grades computed from the prefetched score tables should be the
+        same as grading each student individually, whatever the batch size."""
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        homework = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        problems = [
+            ItemFactory.create(parent_location=homework.location, category='problem', display_name=name)
+            for name in ('p1', 'p2')
+        ]
+        self.course = self.store.get_course(self.course.id)
+
+        student1, student2, student3, _student4, _student5 = self.students
+        StudentModuleFactory.create(
+            student=student1, course_id=self.course.id, module_state_key=problems[0].location, grade=1, max_grade=1
+        )
+        StudentModuleFactory.create(
+            student=student1, course_id=self.course.id, module_state_key=problems[1].location, grade=1, max_grade=1
+        )
+        StudentModuleFactory.create(
+            student=student2, course_id=self.course.id, module_state_key=problems[0].location, grade=0, max_grade=1
+        )
+        # Viewed, but never graded
+        StudentModuleFactory.create(
+            student=student3, course_id=self.course.id, module_state_key=problems[1].location
+        )
+
+        request = RequestFactory().get('/')
+        request.session = {}
+        expected = {}
+        for student in self.students:
+            request.user = student
+            expected[student] = grade(student, request, self.course)
+
+        for batch_size in (1, 2, 100):
+            gradesets = {}
+            for student, gradeset, err_msg in iterate_grades_for(self.course.id, self.students, batch_size=batch_size):
+                self.assertEqual(err_msg, "")
+                gradesets[student] = gradeset
+            for student in self.students:
+                self.assertEqual(gradesets[student]['percent'], expected[student]['percent'])
+                self.assertEqual(gradesets[student]['grade'], expected[student]['grade'])
+                self.assertEqual(gradesets[student]['section_breakdown'], expected[student]['section_breakdown'])
+
+        self.assertGreater(expected[student1]['percent'], expected[student2]['percent'])
+
+    def test_submissions_api_scores(self):
+        """Scores registered with the submissions API count towards the
+        grades of the students they belong to."""
+        problem = self._create_graded_problem()
+        student1 = self.students[0]
+        submission = sub_api.create_submission(
+            {
+                'student_id': anonymous_id_for_user(student1, self.course.id),
+                'course_id': self.course.id.to_deprecated_string(),
+                'item_id': problem.location.to_deprecated_string(),
+                'item_type': 'openassessment'
+            },
+            'test answer'
+        )
+        sub_api.set_score(submission['uuid'], 1, 2)
+
+        all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students)
+        self.assertEqual(all_errors, {})
+        self.assertGreater(all_gradesets[student1]['percent'], 0.0)
+        for student in self.students[1:]:
+            self.assertEqual(all_gradesets[student]['percent'], 0.0)
+
+    def test_prefetch_exception(self):
+        """If the scores of a batch can't be prefetched, its students are
+        graded one at a time, and only those which fail get errors."""
+        def _get_student_module_scores(course_key, student_ids):
+            """Fails to fetch the scores of more than one student."""
+            if len(student_ids) > 1:
+                raise Exception("Can't prefetch")
+            return get_student_module_scores(course_key, student_ids)
+
+        with patch('courseware.grades.get_student_module_scores', _get_student_module_scores):
+            with patch('courseware.grades.grade', _grade_with_errors):
+                all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students)
+        self.assertEqual(set(all_errors), set(self.students[2:4]))
+        self.assertEqual(len(all_gradesets), 5)
+
     ################################# Helpers #################################
+    def _create_graded_problem(self):
+        """Add a problem worth all the course grade, and return it."""
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        homework = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        problem = ItemFactory.create(parent_location=homework.location, category='problem')
+        self.course = self.store.get_course(self.course.id)
+        return problem
+
     def _gradesets_and_errors_for(self, course_id, students):
         """Simple helper method to iterate through student grades and give us
         two dictionaries -- one that has all students and their respective
@@ -121,3 +223,49 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+class TestMaxScoresCache(ModuleStoreTestCase):
+    """
+    Tests for the per-course table of problem maximum scores.
+    """
+    def setUp(self):
+        super(TestMaxScoresCache, self).setUp()
+        self.student = UserFactory.create()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        sequential = ItemFactory.create(parent_location=chapter.location, category='sequential')
+        self.problem = ItemFactory.create(parent_location=sequential.location, category='problem')
+        self.course = self.store.get_course(self.course.id)
+
+    def test_round_trip(self):
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        max_scores_cache.fetch_from_remote()
+        self.assertIsNone(max_scores_cache.get(self.problem.location))
+        max_scores_cache.set(self.problem.location, 3)
+        max_scores_cache.push_to_remote()
+
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        max_scores_cache.fetch_from_remote()
+        self.assertEqual(max_scores_cache.get(self.problem.location), 3)
+
+    def test_unattempted_problem_not_instantiated(self):
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        problem_module = MagicMock()
+        problem_module.max_score.return_value = 2
+        module_creator = MagicMock(return_value=problem_module)
+
+        score = get_score(
+            self.course.id, self.student, self.problem, module_creator, module_scores={},
+            max_scores_cache=max_scores_cache
+        )
+        self.assertEqual(score, (0.0, 2))
+        self.assertEqual(module_creator.call_count, 1)
+
+        # now the problem's total comes from the table
+        score = get_score(
+            self.course.id, self.student, self.problem, module_creator, module_scores={},
+            max_scores_cache=max_scores_cache
+        )
+        self.assertEqual(score, (0.0, 2))
+        self.assertEqual(module_creator.call_count, 1)
@@ -0,0 +1,89 @@
+"""
+Tests for writing StudentModuleHistory rows.
+"""
+from celery.signals import task_postrun
+from django.core.signals import got_request_exception
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from courseware.history_writer import HistoryWriterMiddleware, discard_history
+from courseware.models import StudentModuleHistory
+from courseware.tests.factories import StudentModuleFactory
+
+
+class TestHistoryWriter(TestCase):
+    """
+    Test each of the STUDENT_MODULE_HISTORY_WRITES modes.
+    """
+    def setUp(self):
+        super(TestHistoryWriter, self).setUp()
+        self.addCleanup(discard_history)
+
+    def assert_history_count(self, count):
+        """
+        Assert that there are `count` StudentModuleHistory rows.
+        """
+        self.assertEqual(StudentModuleHistory.objects.count(), count)
+
+    def finish_request(self):
+        """
+        Pass a response through HistoryWriterMiddleware, as a request ends.
+        """
+        response = HttpResponse()
+        self.assertIs(HistoryWriterMiddleware().process_response(None, response), response)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITES='immediate')
+    def test_immediate(self):
+        StudentModuleFactory.create(state='{"attempts": 1}')
+        self.assert_history_count(1)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITES='immediate')
+    def test_history_only_for_problems(self):
+        StudentModuleFactory.create(module_type='sequential')
+        self.assert_history_count(0)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITES='request_end')
+    def test_request_end(self):
+        module = StudentModuleFactory.create(state='{"attempts": 1}')
+        module.state = '{"attempts": 2}'
+        module.save()
+        self.assert_history_count(0)
+
+        self.finish_request()
+        self.assert_history_count(2)
+        history = StudentModuleHistory.objects.filter(student_module=module).order_by('id')
+        self.assertEqual([entry.state for entry in history], ['{"attempts": 1}', '{"attempts": 2}'])
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITES='request_end')
+    def test_task_end(self):
+        # imported here, so that the task_postrun receiver is connected
+        import courseware.tasks  # pylint: disable=unused-variable
+        StudentModuleFactory.create()
+        task_postrun.send(sender=self.__class__)
+        self.assert_history_count(1)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITES='request_end', STUDENT_MODULE_HISTORY_BATCH_SIZE=2)
+    def test_batch_size(self):
+        StudentModuleFactory.create()
+        self.assert_history_count(0)
+        StudentModuleFactory.create()
+        self.assert_history_count(2)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITES='request_end')
+    def test_request_exception(self):
+        StudentModuleFactory.create()
+        got_request_exception.send(sender=self.__class__)
+        self.finish_request()
+        self.assert_history_count(0)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITES='celery')
+    def test_celery(self):
+        module = StudentModuleFactory.create(state='{"attempts": 1}', grade=1, max_grade=2)
+        self.assert_history_count(0)
+
+        self.finish_request()
+        entry = StudentModuleHistory.objects.get(student_module=module)
+        self.assertEqual(entry.state, '{"attempts": 1}')
+        self.assertEqual((entry.grade, entry.max_grade), (1, 2))
+        self.assertEqual(entry.created, module.modified)
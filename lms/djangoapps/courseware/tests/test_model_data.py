@@ -178,6 +178,43 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
                 self.kvs.set_many(kv_dict)
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
+    def test_state_decoded_once(self):
+        "Test that the state of a StudentModule is only decoded once for many field accesses"
+        with patch('courseware.model_data.json.loads', wraps=json.loads) as mock_loads:
+            self.assertTrue(self.kvs.has(user_state_key('a_field')))
+            self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+            self.assertEquals('b_value', self.kvs.get(user_state_key('b_field')))
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+            self.assertEquals('new_value', self.kvs.get(user_state_key('a_field')))
+        self.assertEquals(mock_loads.call_count, 1)
+
+    def test_state_encoded_once(self):
+        "Test that set_many encodes the state of a StudentModule once"
+        kv_dict = self.construct_kv_dict()
+        with patch('courseware.model_data.json.dumps', wraps=json.dumps) as mock_dumps:
+            self.kvs.set_many(kv_dict)
+        state_dumps = [call for call in mock_dumps.call_args_list if isinstance(call[0][0], dict)]
+        self.assertEquals(len(state_dumps), 1)
+        self.assertEquals(
+            {'a_field': 'a_value', 'b_field': 'b_value', 'field_a': 'new value', 'field_b': 'newer value'},
+            json.loads(StudentModule.objects.all()[0].state)
+        )
+
+    def test_values_not_shared(self):
+        "Test that changing values set or gotten doesn't change the stored state"
+        value = {'answers': [1, 2]}
+        self.kvs.set(user_state_key('a_field'), value)
+        value['answers'].append(3)
+        self.kvs.get(user_state_key('a_field'))['answers'].append(4)
+        self.assertEquals({'answers': [1, 2]}, self.kvs.get(user_state_key('a_field')))
+
+    def test_state_replaced(self):
+        "Test that a StudentModule's state is decoded again after it's replaced"
+        self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+        student_module = self.field_data_cache.find(user_state_key('a_field'))
+        student_module.state = json.dumps({'a_field': 'other_value'})
+        self.assertEquals('other_value', self.kvs.get(user_state_key('a_field')))
+
 
 class TestMissingStudentModule(TestCase):
     def setUp(self):
@@ -0,0 +1,157 @@
+"""
+Tests for storing and invalidating computed grades.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.test.client import RequestFactory
+from mock import patch
+from pytz import UTC
+
+from courseware.grades import grade, progress_summary
+from courseware.models import PersistentCourseGrade, PersistentSubsectionGrade, StudentModule
+from courseware.persistent_grades import _released_block_count
+from courseware.tests.factories import StudentModuleFactory
+from student.roles import CourseStaffRole
+from student.tests.factories import UserFactory
+from xmodule.partitions.partitions import Group, UserPartition
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+@patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_GRADES': True})
+class TestPersistentGrades(ModuleStoreTestCase):
+    """
+    Test that grades are served from, and kept in step with, the persistent
+    grade tables.
+    """
+    def setUp(self):
+        super(TestPersistentGrades, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.homework = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problem = ItemFactory.create(parent_location=self.homework.location, category='problem')
+        self.course = self.store.get_course(self.course.id)
+
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+        self.student_module = StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problem.location,
+            grade=0,
+            max_grade=1,
+        )
+
+    def _grade(self):
+        """Grade the student in the course"""
+        return grade(self.student, self.request, self.course)
+
+    def test_grade_is_stored(self):
+        self.assertEqual(self._grade()['percent'], 0.0)
+        self.assertTrue(PersistentCourseGrade.objects.filter(student=self.student, course_id=self.course.id).exists())
+        self.assertTrue(
+            PersistentSubsectionGrade.objects.filter(
+                student=self.student, course_id=self.course.id, usage_key=self.homework.location
+            ).exists()
+        )
+
+    def test_stored_grade_is_served(self):
+        first = self._grade()
+        with patch('courseware.grades._get_subsection_scores') as mock_scores:
+            second = self._grade()
+        self.assertFalse(mock_scores.called)
+        self.assertEqual(first['percent'], second['percent'])
+        self.assertEqual(first['section_breakdown'], second['section_breakdown'])
+        self.assertEqual(first['totaled_scores'], second['totaled_scores'])
+
+    def test_score_change_invalidates(self):
+        self.assertEqual(self._grade()['percent'], 0.0)
+        self.student_module.grade = 1
+        self.student_module.save()
+        self.assertFalse(PersistentCourseGrade.objects.filter(student=self.student).exists())
+        self.assertFalse(PersistentSubsectionGrade.objects.filter(student=self.student).exists())
+        self.assertEqual(self._grade()['percent'], 1.0)
+
+    def test_unchanged_score_keeps_stored_grade(self):
+        self._grade()
+        self.student_module.state = '{"seed": 1}'
+        self.student_module.save()
+        self.assertTrue(PersistentCourseGrade.objects.filter(student=self.student).exists())
+
+    def test_other_students_unaffected(self):
+        other = UserFactory.create()
+        self.request.user = other
+        grade(other, self.request, self.course)
+        self.student_module.grade = 1
+        self.student_module.save()
+        self.assertTrue(PersistentCourseGrade.objects.filter(student=other).exists())
+
+    def test_republish_makes_grades_stale(self):
+        self._grade()
+        PersistentCourseGrade.objects.filter(student=self.student).update(course_version='an older version')
+        PersistentSubsectionGrade.objects.filter(student=self.student).update(course_version='an older version')
+        # Bypass the invalidation signals, as only the version stamp should matter here
+        StudentModule.objects.filter(id=self.student_module.id).update(grade=1)
+        self.assertEqual(self._grade()['percent'], 1.0)
+
+    def test_progress_summary_uses_stored_scores(self):
+        self._grade()
+        with patch('courseware.grades.get_score') as mock_get_score:
+            chapters = progress_summary(self.student, self.request, self.course)
+        self.assertFalse(mock_get_score.called)
+        scores = chapters[0]['sections'][0]['scores']
+        self.assertEqual([(score.earned, score.possible) for score in scores], [(0, 1)])
+
+    def _assert_regraded(self):
+        """Assert that grading the student doesn't use their stored grade"""
+        with patch('courseware.grades._get_subsection_scores', return_value=[]) as mock_scores:
+            self._grade()
+        self.assertTrue(mock_scores.called)
+
+    def test_role_change_makes_grades_stale(self):
+        self._grade()
+        CourseStaffRole(self.course.id).add_users(self.student)
+        self._assert_regraded()
+
+    def test_submissions_score_makes_grades_stale(self):
+        self._grade()
+        with patch('submissions.api.get_scores', return_value={'some/item': (1, 2)}):
+            self._assert_regraded()
+
+    def test_release_makes_grades_stale(self):
+        self._grade()
+        with patch('courseware.persistent_grades._released_block_count', return_value=0):
+            self._assert_regraded()
+
+    @patch.dict(settings.FEATURES, {'DISABLE_START_DATES': False})
+    def test_released_block_count(self):
+        released = _released_block_count(self.course, False)
+        ItemFactory.create(
+            parent_location=self.course.location,
+            category='chapter',
+            metadata={'start': datetime.now(UTC) + timedelta(days=2), 'days_early_for_beta': 5.0},
+        )
+        self.course = self.store.get_course(self.course.id)
+        self.assertEqual(_released_block_count(self.course, False), released)
+        self.assertEqual(_released_block_count(self.course, True), released + 1)
+
+    def test_user_partitions_not_stored(self):
+        self.course.user_partitions = [
+            UserPartition(0, 'Experiment', 'An experiment', [Group(0, 'A'), Group(1, 'B')])
+        ]
+        self._grade()
+        self.assertFalse(PersistentCourseGrade.objects.exists())
+        self.assertFalse(PersistentSubsectionGrade.objects.exists())
+
+    @patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_GRADES': False})
+    def test_disabled(self):
+        self._grade()
+        self.assertFalse(PersistentCourseGrade.objects.exists())
+        self.assertFalse(PersistentSubsectionGrade.objects.exists())
@@ -197,10 +197,13 @@ def forum_form_discussion(request, course_key):
     course_settings = make_course_settings(course)
 
     user = cc.User.from_django_user(request.user)
-    user_info = user.to_dict()
 
     try:
-        unsafethreads, query_params = get_threads(request, course_key)   # This might process a search query
+        # The user is retrieved while the threads are.
+        (unsafethreads, query_params), user_info = cc.utils.perform_concurrently(
+            lambda: get_threads(request, course_key),   # This might process a search query
+            user.to_dict,
+        )
         is_staff = cached_has_permission(request.user, 'openclose_thread', course.id)
         threads = [utils.prepare_content(thread, course_key, is_staff) for thread in unsafethreads]
     except cc.utils.CommentClientMaintenanceError:
@@ -264,18 +267,21 @@ def single_thread(request, course_key, discussion_id, thread_id):
     course = get_course_with_access(request.user, 'load_forum', course_key)
     course_settings = make_course_settings(course)
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
     is_moderator = cached_has_permission(request.user, "see_all_cohorts", course_key)
 
     # Currently, the front end always loads responses via AJAX, even for this
     # page; it would be a nice optimization to avoid that extra round trip to
     # the comments service.
     try:
-        thread = cc.Thread.find(thread_id).retrieve(
-            recursive=request.is_ajax(),
-            user_id=request.user.id,
-            response_skip=request.GET.get("resp_skip"),
-            response_limit=request.GET.get("resp_limit")
+        # The user is retrieved while the thread is.
+        user_info, thread = cc.utils.perform_concurrently(
+            cc_user.to_dict,
+            lambda: cc.Thread.find(thread_id).retrieve(
+                recursive=request.is_ajax(),
+                user_id=request.user.id,
+                response_skip=request.GET.get("resp_skip"),
+                response_limit=request.GET.get("resp_limit")
+            ),
         )
     except cc.utils.CommentClientRequestError as e:
         if e.status_code == 404:
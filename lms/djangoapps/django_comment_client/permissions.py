@@ -18,8 +18,7 @@ def cached_has_permission(user, permission, course_id=None):
     a role's permissions will only become effective after CACHE_LIFESPAN seconds.
     """
     assert isinstance(course_id, (NoneType, CourseKey))
-    key = u"permission_{user_id:d}_{course_id}_{permission}".format(
-        user_id=user.id, course_id=course_id, permission=permission)
+    key = _permission_cache_key(user, permission, course_id)
     val = CACHE.get(key, None)
     if val not in [True, False]:
         val = has_permission(user, permission, course_id=course_id)
@@ -27,6 +26,36 @@ def cached_has_permission(user, permission, course_id=None):
     return val
 
 
+def cached_permissions(user, permissions, course_id=None):
+    """
+    Returns the set of those of `permissions` which the user has, as
+    cached_has_permission checks them, with one cache lookup.
+    """
+    assert isinstance(course_id, (NoneType, CourseKey))
+    keys = dict((_permission_cache_key(user, permission, course_id), permission) for permission in permissions)
+    cached = CACHE.get_many(keys.keys())
+    result = set()
+    missing = {}
+    for key, permission in keys.iteritems():
+        val = cached.get(key)
+        if val not in [True, False]:
+            val = has_permission(user, permission, course_id=course_id)
+            missing[key] = val
+        if val:
+            result.add(permission)
+    if missing:
+        CACHE.set_many(missing, CACHE_LIFESPAN)
+    return result
+
+
+def _permission_cache_key(user, permission, course_id):
+    """
+    Returns the key under which whether the user has the permission is cached.
+    """
+    return u"permission_{user_id:d}_{course_id}_{permission}".format(
+        user_id=user.id, course_id=course_id, permission=permission)
+
+
 def has_permission(user, permission, course_id=None):
     assert isinstance(course_id, (NoneType, CourseKey))
     for role in user.roles.filter(course_id=course_id):
@@ -38,7 +67,12 @@ def has_permission(user, permission, course_id=None):
 CONDITIONS = ['is_open', 'is_author', 'is_question_author']
 
 
-def _check_condition(user, condition, content):
+def _check_condition(user, condition, content, threads=None):
+    """
+    Checks the condition against the content.  `threads`, if given, is a dict of
+    the threads already retrieved by id, to which the threads retrieved to check
+    'is_question_author' are added.
+    """
     def check_open(user, content):
         try:
             return content and not content['closed']
@@ -58,8 +92,14 @@ def _check_condition(user, condition, content):
             if content["type"] == "thread":
                 return content["thread_type"] == "question" and content["user_id"] == str(user.id)
             else:
+                thread_id = content["thread_id"]
+                if threads is not None and thread_id in threads:
+                    return check_question_author(user, threads[thread_id])
                 # N.B. This will trigger a comments service query
-                return check_question_author(user, Thread(id=content["thread_id"]).to_dict())
+                thread = Thread(id=thread_id).to_dict()
+                if threads is not None:
+                    threads[thread_id] = thread
+                return check_question_author(user, thread)
         except KeyError:
             return False
 
@@ -72,18 +112,24 @@ def _check_condition(user, condition, content):
     return handlers[condition](user, content)
 
 
-def _check_conditions_permissions(user, permissions, course_id, content):
+def _check_conditions_permissions(user, permissions, course_id, content, user_permissions=None, threads=None):
     """
     Accepts a list of permissions and proceed if any of the permission is valid.
     Note that ["can_view", "can_edit"] will proceed if the user has either
     "can_view" or "can_edit" permission. To use AND operator in between, wrap them in
     a list.
+
+    If `user_permissions`, the set of the permissions the user has (as returned by
+    get_view_permissions), is given, the permissions are looked up in it rather
+    than the cache.  `threads` is passed to _check_condition.
     """
 
     def test(user, per, operator="or"):
         if isinstance(per, basestring):
             if per in CONDITIONS:
-                return _check_condition(user, per, content)
+                return _check_condition(user, per, content, threads)
+            if user_permissions is not None:
+                return per in user_permissions
             return cached_has_permission(user, per, course_id=course_id)
         elif isinstance(per, list) and operator in ["and", "or"]:
             results = [test(user, x, operator="and") for x in per]
@@ -123,10 +169,27 @@ VIEW_PERMISSIONS = {
 }
 
 
-def check_permissions_by_view(user, course_id, content, name):
+def check_permissions_by_view(user, course_id, content, name, user_permissions=None, threads=None):
     assert isinstance(course_id, CourseKey)
     try:
         p = VIEW_PERMISSIONS[name]
     except KeyError:
         logging.warning("Permission for view named %s does not exist in permissions.py" % name)
-    return _check_conditions_permissions(user, p, course_id, content)
+    return _check_conditions_permissions(user, p, course_id, content, user_permissions, threads)
+
+
+def get_view_permissions(user, course_id, names):
+    """
+    Returns the set of the permissions the user has, out of those checked for
+    the views `names`, so that check_permissions_by_view can check them for
+    many contents without looking each up again.
+    """
+    assert isinstance(course_id, CourseKey)
+
+    def permission_names(per):
+        if isinstance(per, basestring):
+            return set() if per in CONDITIONS else set([per])
+        return set().union(*[permission_names(x) for x in per])
+
+    permissions = set().union(*[permission_names(VIEW_PERMISSIONS[name]) for name in names])
+    return cached_permissions(user, permissions, course_id=course_id)
@@ -8,6 +8,7 @@ from django.test import TestCase
 from edxmako import add_lookup
 import mock
 
+from django_comment_client import permissions
 from django_comment_client.tests.factories import RoleFactory
 from django_comment_client.tests.unicode import UnicodeTestMixin
 import django_comment_client.utils as utils
@@ -642,6 +643,69 @@ class CategoryMapTestCase(ModuleStoreTestCase):
         )
 
 
+class AnnotatedContentInfoTestCase(ModuleStoreTestCase):
+    """
+    Test that the abilities of a user on a thread and its children are found
+    with one lookup of the user's permissions.
+    """
+    def setUp(self):
+        super(AnnotatedContentInfoTestCase, self).setUp(create_user=False)
+
+        self.course = CourseFactory.create()
+        self.student_role = RoleFactory(name='Student', course_id=self.course.id)
+        for permission in ['update_thread', 'update_comment', 'create_comment', 'create_sub_comment', 'vote']:
+            self.student_role.add_permission(permission)
+        self.student = UserFactory(username='student', email='student@edx.org')
+        self.student_role.users.add(self.student)
+        self.other_id = str(self.student.id + 1)
+        permissions.CACHE.clear()
+
+        self.thread = {
+            'id': 'thread', 'type': 'thread', 'thread_type': 'question', 'user_id': str(self.student.id),
+            'closed': False,
+            'children': [
+                {
+                    'id': 'response', 'type': 'comment', 'thread_id': 'thread', 'user_id': self.other_id,
+                    'closed': False,
+                    'children': [
+                        {
+                            'id': 'comment', 'type': 'comment', 'thread_id': 'thread',
+                            'user_id': str(self.student.id), 'closed': False,
+                        },
+                    ],
+                },
+            ],
+        }
+        self.user_info = {'upvoted_ids': ['response'], 'downvoted_ids': [], 'subscribed_thread_ids': ['thread']}
+
+    def test_same_as_each_content(self):
+        infos = utils.get_annotated_content_infos(self.course.id, self.thread, self.student, self.user_info)
+        response = self.thread['children'][0]
+        comment = response['children'][0]
+        self.assertEqual(infos, {
+            content['id']: utils.get_annotated_content_info(self.course.id, content, self.student, self.user_info)
+            for content in [self.thread, response, comment]
+        })
+        self.assertEqual(infos['response']['voted'], 'up')
+        self.assertFalse(infos['response']['ability']['editable'])
+        self.assertTrue(infos['comment']['ability']['editable'])
+
+    def test_permissions_looked_up_once(self):
+        with mock.patch.object(permissions.CACHE, 'get_many', wraps=permissions.CACHE.get_many) as mock_get_many:
+            with mock.patch.object(permissions.CACHE, 'get', wraps=permissions.CACHE.get) as mock_get:
+                utils.get_metadata_for_threads(self.course.id, [self.thread, self.thread], self.student, self.user_info)
+        self.assertEqual(mock_get_many.call_count, 1)
+        self.assertFalse(mock_get.called)
+
+    def test_question_author_checked_against_thread(self):
+        response = self.thread['children'][0]
+        with mock.patch('django_comment_client.permissions.Thread') as mock_thread:
+            self.assertTrue(permissions.check_permissions_by_view(
+                self.student, self.course.id, response, 'endorse_comment', threads={'thread': self.thread}
+            ))
+        self.assertFalse(mock_thread.called)
+
+
 class JsonResponseTestCase(TestCase, UnicodeTestMixin):
     def _test_unicode_data(self, text):
         response = utils.JsonResponse(text)
@@ -3,6 +3,7 @@ from datetime import datetime
 import json
 import logging
 
+import dateutil.parser
 import pytz
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
@@ -11,11 +12,10 @@ from django.http import HttpResponse
 from django.utils.timezone import UTC
 import pystache_custom as pystache
 from opaque_keys.edx.locations import i4xEncoder
-from opaque_keys.edx.keys import CourseKey
-from xmodule.modulestore.django import modulestore
+from opaque_keys.edx.keys import CourseKey, UsageKey
 
-from django_comment_common.models import Role, FORUM_ROLE_STUDENT
-from django_comment_client.permissions import check_permissions_by_view, cached_has_permission
+from django_comment_common.models import Role, FORUM_ROLE_STUDENT, get_discussion_topics
+from django_comment_client.permissions import check_permissions_by_view, cached_has_permission, get_view_permissions
 from edxmako import lookup_template
 
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort_by_id, get_cohort_id, is_commentable_cohorted, \
@@ -59,33 +59,28 @@ def has_forum_access(uname, course_id, rolename):
     return role.users.filter(username=uname).exists()
 
 
-def _get_discussion_modules(course):
+def _get_discussion_topics(course):
     """
-    Return a list of all valid discussion modules in this course.
+    Return a list of a dict for each valid discussion module in this course, from the
+    course's discussion topic index (see django_comment_common.models.get_discussion_topics),
+    with its 'location' as a usage key and its 'start' as a datetime.
     """
-    all_modules = modulestore().get_items(course.id, qualifiers={'category': 'discussion'})
-
-    def has_required_keys(module):
-        for key in ('discussion_id', 'discussion_category', 'discussion_target'):
-            if getattr(module, key) is None:
-                log.warning("Required key '%s' not in discussion %s, leaving out of category map" % (key, module.location))
-                return False
-        return True
-
-    return filter(has_required_keys, all_modules)
+    topics = get_discussion_topics(course.id)
+    for topic in topics:
+        topic['location'] = UsageKey.from_string(topic['location']).map_into_course(course.id)
+        topic['start'] = dateutil.parser.parse(topic['start']) if topic['start'] else None
+    return topics
 
 
 def get_discussion_id_map(course):
     """
     Transform the list of this course's discussion modules into a dictionary of metadata keyed by discussion_id.
     """
-    def get_entry(module):  # pylint: disable=missing-docstring
-        discussion_id = module.discussion_id
-        title = module.discussion_target
-        last_category = module.discussion_category.split("/")[-1].strip()
-        return (discussion_id, {"location": module.location, "title": last_category + " / " + title})
+    def get_entry(topic):  # pylint: disable=missing-docstring
+        last_category = topic['category'].split("/")[-1].strip()
+        return (topic['id'], {"location": topic['location'], "title": last_category + " / " + topic['title']})
 
-    return dict(map(get_entry, _get_discussion_modules(course)))
+    return dict(map(get_entry, _get_discussion_topics(course)))
 
 
 def _filter_unstarted_categories(category_map):
@@ -145,18 +140,18 @@ def get_discussion_category_map(course):
     """
     unexpanded_category_map = defaultdict(list)
 
-    modules = _get_discussion_modules(course)
+    topics = _get_discussion_topics(course)
 
     is_course_cohorted = course.is_cohorted
     cohorted_discussion_ids = course.cohorted_discussions
 
-    for module in modules:
-        id = module.discussion_id
-        title = module.discussion_target
-        sort_key = module.sort_key
-        category = " / ".join([x.strip() for x in module.discussion_category.split("/")])
-        #Handle case where module.start is None
-        entry_start_date = module.start if module.start else datetime.max.replace(tzinfo=pytz.UTC)
+    for topic in topics:
+        id = topic['id']
+        title = topic['title']
+        sort_key = topic['sort_key']
+        category = " / ".join([x.strip() for x in topic['category'].split("/")])
+        #Handle case where the module's start is None
+        entry_start_date = topic['start'] if topic['start'] else datetime.max.replace(tzinfo=pytz.UTC)
         unexpanded_category_map[category].append({"title": title, "id": id, "sort_key": sort_key, "start_date": entry_start_date})
 
     category_map = {"entries": defaultdict(dict), "subcategories": defaultdict(dict)}
@@ -287,21 +282,37 @@ class QueryCountDebugMiddleware(object):
         return response
 
 
-def get_ability(course_id, content, user):
+# The views whose permissions get_ability checks.
+ABILITY_VIEWS = [
+    'update_thread', 'update_comment', 'create_comment', 'create_sub_comment', 'delete_thread', 'delete_comment',
+    'openclose_thread', 'vote_for_thread', 'vote_for_comment',
+]
+
+
+def get_ability(course_id, content, user, user_permissions=None, threads=None):
+    """
+    Returns what the user can do with the content.  `user_permissions` and
+    `threads` are passed to check_permissions_by_view.
+    """
+    def check(name):
+        return check_permissions_by_view(user, course_id, content, name, user_permissions, threads)
+
     return {
-        'editable': check_permissions_by_view(user, course_id, content, "update_thread" if content['type'] == 'thread' else "update_comment"),
-        'can_reply': check_permissions_by_view(user, course_id, content, "create_comment" if content['type'] == 'thread' else "create_sub_comment"),
-        'can_delete': check_permissions_by_view(user, course_id, content, "delete_thread" if content['type'] == 'thread' else "delete_comment"),
-        'can_openclose': check_permissions_by_view(user, course_id, content, "openclose_thread") if content['type'] == 'thread' else False,
-        'can_vote': check_permissions_by_view(user, course_id, content, "vote_for_thread" if content['type'] == 'thread' else "vote_for_comment"),
+        'editable': check("update_thread" if content['type'] == 'thread' else "update_comment"),
+        'can_reply': check("create_comment" if content['type'] == 'thread' else "create_sub_comment"),
+        'can_delete': check("delete_thread" if content['type'] == 'thread' else "delete_comment"),
+        'can_openclose': check("openclose_thread") if content['type'] == 'thread' else False,
+        'can_vote': check("vote_for_thread" if content['type'] == 'thread' else "vote_for_comment"),
     }
 
 # TODO: RENAME
 
 
-def get_annotated_content_info(course_id, content, user, user_info):
+def get_annotated_content_info(course_id, content, user, user_info, user_permissions=None, threads=None):
     """
     Get metadata for an individual content (thread or comment)
+
+    `user_permissions` and `threads` are passed to get_ability.
     """
     voted = ''
     if content['id'] in user_info['upvoted_ids']:
@@ -311,20 +322,30 @@ def get_annotated_content_info(course_id, content, user, user_info):
     return {
         'voted': voted,
         'subscribed': content['id'] in user_info['subscribed_thread_ids'],
-        'ability': get_ability(course_id, content, user),
+        'ability': get_ability(course_id, content, user, user_permissions, threads),
     }
 
 # TODO: RENAME
 
 
-def get_annotated_content_infos(course_id, thread, user, user_info):
+def get_annotated_content_infos(course_id, thread, user, user_info, user_permissions=None):
     """
     Get metadata for a thread and its children
+
+    The user's permissions are looked up once for all of them, unless
+    `user_permissions` (as returned by get_view_permissions for ABILITY_VIEWS)
+    is given.
     """
     infos = {}
+    if user_permissions is None:
+        user_permissions = get_view_permissions(user, course_id, ABILITY_VIEWS)
+    # the children's conditions are checked against this thread, rather than retrieving it again
+    threads = {thread['id']: thread}
 
     def annotate(content):
-        infos[str(content['id'])] = get_annotated_content_info(course_id, content, user, user_info)
+        infos[str(content['id'])] = get_annotated_content_info(
+            course_id, content, user, user_info, user_permissions, threads
+        )
         for child in (
                 content.get('children', []) +
                 content.get('endorsed_responses', []) +
@@ -336,8 +357,10 @@ def get_annotated_content_infos(course_id, thread, user, user_info):
 
 
 def get_metadata_for_threads(course_id, threads, user, user_info):
+    user_permissions = get_view_permissions(user, course_id, ABILITY_VIEWS)
+
     def infogetter(thread):
-        return get_annotated_content_infos(course_id, thread, user, user_info)
+        return get_annotated_content_infos(course_id, thread, user, user_info, user_permissions)
 
     metadata = reduce(merge_dict, map(infogetter, threads), {})
     return metadata
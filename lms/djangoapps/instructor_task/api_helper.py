@@ -19,6 +19,7 @@ from courseware.courses import get_problems_in_section
 from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.keys import UsageKey
 from instructor_task.models import InstructorTask, PROGRESS
+from instructor_task.subtasks import get_subtask_task_output
 
 
 log = logging.getLogger(__name__)
@@ -120,10 +121,10 @@ def _update_instructor_task(instructor_task, task_result):
     opportunity to update the InstructorTask entry.
 
     Tasks that are in progress and have subtasks doing the processing do not look
-    to the task's AsyncResult object.  When subtasks are running, the
-    InstructorTask object itself is updated with the subtasks' progress,
-    not any AsyncResult object.  In this case, the InstructorTask is
-    not updated at all.
+    to the task's AsyncResult object.  When subtasks are running, each
+    subtask records its progress in its own InstructorSubtask row,
+    not any AsyncResult object.  In this case, only the "task_output" of
+    the InstructorTask is updated, with the progress added up from those rows.
 
     Calculates json to store in "task_output" field of the `instructor_task`,
     as well as updating the task_state.
@@ -153,8 +154,11 @@ def _update_instructor_task(instructor_task, task_result):
         # meaning that the subtasks have successfully been defined.  However, the InstructorTask
         # will be marked as in PROGRESS, until the last subtask completes and marks it as SUCCESS.
         # We want to ignore the parent SUCCESS if subtasks are still running, and just trust the
-        # contents of the InstructorTask.
+        # contents of the InstructorTask and the rows of its subtasks.
         entry_needs_updating = False
+        subtask_task_output = get_subtask_task_output(instructor_task)
+        if subtask_task_output is not None:
+            instructor_task.task_output = subtask_task_output
     elif result_state in [PROGRESS, SUCCESS]:
         # construct a status message directly from the task result's result:
         # it needs to go back with the entry passed in.
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'InstructorSubtask'
+        db.create_table('instructor_task_instructorsubtask', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('instructor_task', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['instructor_task.InstructorTask'])),
+            ('subtask_id', self.gf('django.db.models.fields.CharField')(max_length=255, db_index=True)),
+            ('state', self.gf('django.db.models.fields.CharField')(max_length=50)),
+            ('attempted', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('succeeded', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('failed', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('skipped', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('status', self.gf('django.db.models.fields.TextField')()),
+            ('duration_ms', self.gf('django.db.models.fields.IntegerField')(default=0)),
+        ))
+        db.send_create_signal('instructor_task', ['InstructorSubtask'])
+
+        # Adding unique constraint on 'InstructorSubtask', fields ['instructor_task', 'subtask_id']
+        db.create_unique('instructor_task_instructorsubtask', ['instructor_task_id', 'subtask_id'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'InstructorSubtask', fields ['instructor_task', 'subtask_id']
+        db.delete_unique('instructor_task_instructorsubtask', ['instructor_task_id', 'subtask_id'])
+
+        # Deleting model 'InstructorSubtask'
+        db.delete_table('instructor_task_instructorsubtask')
+
+
+    models = {
+        'auth.group': {
+            'Meta': {'object_name': 'Group'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '80'}),
+            'permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'})
+        },
+        'auth.permission': {
+            'Meta': {'ordering': "('content_type__app_label', 'content_type__model', 'codename')", 'unique_together': "(('content_type', 'codename'),)", 'object_name': 'Permission'},
+            'codename': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'})
+        },
+        'auth.user': {
+            'Meta': {'object_name': 'User'},
+            'date_joined': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '75', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'groups': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Group']", 'symmetrical': 'False', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'is_staff': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_superuser': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'last_login': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'password': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'user_permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '30'})
+        },
+        'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        'instructor_task.instructorsubtask': {
+            'Meta': {'unique_together': "(('instructor_task', 'subtask_id'),)", 'object_name': 'InstructorSubtask'},
+            'attempted': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'duration_ms': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'failed': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'instructor_task': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['instructor_task.InstructorTask']"}),
+            'skipped': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'state': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'status': ('django.db.models.fields.TextField', [], {}),
+            'subtask_id': ('django.db.models.fields.CharField', [], {'max_length': '255', 'db_index': 'True'}),
+            'succeeded': ('django.db.models.fields.IntegerField', [], {'default': '0'})
+        },
+        'instructor_task.instructortask': {
+            'Meta': {'object_name': 'InstructorTask'},
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'max_length': '255', 'db_index': 'True'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'null': 'True', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'requester': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']"}),
+            'subtasks': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'task_id': ('django.db.models.fields.CharField', [], {'max_length': '255', 'db_index': 'True'}),
+            'task_input': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'task_key': ('django.db.models.fields.CharField', [], {'max_length': '255', 'db_index': 'True'}),
+            'task_output': ('django.db.models.fields.CharField', [], {'max_length': '1024', 'null': 'True'}),
+            'task_state': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True', 'db_index': 'True'}),
+            'task_type': ('django.db.models.fields.CharField', [], {'max_length': '50', 'db_index': 'True'}),
+            'updated': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'})
+        }
+    }
+
+    complete_apps = ['instructor_task']
@@ -190,6 +190,46 @@ class InstructorTask(models.Model):
         return json.dumps({'message': 'Task revoked before running'})
 
 
+class InstructorSubtask(models.Model):
+    """
+    Stores the status of one subtask of an InstructorTask.
+
+    Each subtask updates only its own row, so subtasks finishing at the same time
+    don't wait on each other for a lock on the InstructorTask.  The progress of the
+    InstructorTask is added up from the rows of its subtasks when it's needed.
+
+    `instructor_task` is the InstructorTask the subtask does part of the work of.
+    `subtask_id` stores the id used by celery for the subtask.
+    `state` stores the last known state of the subtask.
+    `attempted`, `succeeded`, `failed` and `skipped` store the subtask's counts.
+    `status` stores the subtask's status, as a JSON-serialized SubtaskStatus.to_dict().
+    `duration_ms` stores how long the InstructorTask had been running when the
+        subtask's status was last updated.
+    """
+    instructor_task = models.ForeignKey(InstructorTask, db_index=True)
+    subtask_id = models.CharField(max_length=255, db_index=True)
+    state = models.CharField(max_length=50)
+    attempted = models.IntegerField(default=0)
+    succeeded = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    status = models.TextField()
+    duration_ms = models.IntegerField(default=0)
+
+    class Meta:  # pylint: disable=missing-docstring
+        unique_together = (('instructor_task', 'subtask_id'),)
+
+    def __repr__(self):
+        return 'InstructorSubtask<%r>' % ({
+            'instructor_task_id': self.instructor_task_id,  # pylint: disable=no-member
+            'subtask_id': self.subtask_id,
+            'state': self.state,
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
@@ -12,10 +12,11 @@ import logging
 from celery.states import SUCCESS, READY_STATES, RETRY
 import dogstats_wrapper as dog_stats_api
 
-from django.db import transaction, DatabaseError
+from django.db import transaction, DatabaseError, IntegrityError
+from django.db.models import Count, Max, Sum
 from django.core.cache import cache
 
-from instructor_task.models import InstructorTask, PROGRESS, QUEUING
+from instructor_task.models import InstructorTask, InstructorSubtask, PROGRESS, QUEUING
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
@@ -24,6 +25,12 @@ SUBTASK_LOCK_EXPIRE = 60 * 10  # Lock expires in 10 minutes
 # Number of times to retry if a subtask update encounters a lock on the InstructorTask.
 # (These are recursive retries, so don't make this number too large.)
 MAX_DATABASE_LOCK_RETRIES = 5
+# Number of items to fetch with each query for items to pass to subtasks.
+ITEMS_PER_QUERY = 10000
+# Number of InstructorSubtask rows to insert with each query.
+SUBTASK_ROWS_PER_INSERT = 1000
+# The counts of a subtask which are added up into the progress of its InstructorTask.
+SUBTASK_COUNTS = ['attempted', 'succeeded', 'failed', 'skipped']
 
 
 class DuplicateTaskException(Exception):
@@ -70,6 +77,23 @@ def track_memory_usage(metric, course_id):
         )
 
 
+def _iterate_by_pk(queryset):
+    """
+    Yields the rows of a values_list() `queryset` whose last field is 'pk', a page of
+    ITEMS_PER_QUERY rows at a time, in order of 'pk'.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page[:ITEMS_PER_QUERY])
+        for row in rows:
+            yield row
+        if len(rows) < ITEMS_PER_QUERY:
+            return
+        last_pk = rows[-1][-1]
+
+
 def _generate_items_for_subtask(
     item_querysets,  # pylint: disable=bad-continuation
     item_fields,
@@ -83,14 +107,18 @@ def _generate_items_for_subtask(
 
     Arguments:
         `item_querysets` : a list of query sets, each of which defines the "items" that should be passed to subtasks.
-        `item_fields` : the fields that should be included in the dict that is returned.
-            These are in addition to the 'pk' field.
+        `item_fields` : the fields that should be included in the tuple that is returned.
+            These are followed by the 'pk' field.
         `total_num_items` : the result of summing the count of each queryset in `item_querysets`.
-        `items_per_query` : size of chunks to break the query operation into.
         `items_per_task` : maximum size of chunks to break each query chunk into for use by a subtask.
         `course_id` : course_id of the course. Only needed for the track_memory_usage context manager.
 
-    Returns:  yields a list of dicts, where each dict contains the fields in `item_fields`, plus the 'pk' field.
+    Returns:  yields a list of tuples, where each tuple contains the values of the fields in `item_fields`,
+        followed by the 'pk' field.
+
+    Each queryset is read in pages of ITEMS_PER_QUERY items, ordered by 'pk' and each starting after the
+    last 'pk' of the page before, so that no query has to skip over the items already read, and only
+    one page is held in memory at a time.
 
     Warning:  if the algorithm here changes, the _get_number_of_subtasks() method should similarly be changed.
     """
@@ -103,7 +131,7 @@ def _generate_items_for_subtask(
 
     with track_memory_usage('course_email.subtask_generation.memory', course_id):
         for queryset in item_querysets:
-            for item in queryset.values(*all_item_fields).iterator():
+            for item in _iterate_by_pk(queryset.values_list(*all_item_fields)):
                 if len(items_for_task) == items_per_task and num_subtasks < total_num_subtasks - 1:
                     yield items_for_task
                     num_items_queued += items_per_task
@@ -236,6 +264,10 @@ def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
     information for each subtask.  The value for each subtask (keyed by its task_id)
     is its subtask status, as defined by SubtaskStatus.to_dict().
 
+    An InstructorSubtask row is also created for each subtask.  While the subtasks run, they
+    update only their own rows, and the "subtasks" and "task_output" fields are brought up
+    to date from the rows when the last subtask completes.
+
     This information needs to be set up in the InstructorTask before any of the subtasks start
     running.  If not, there is a chance that the subtasks could complete before the parent task
     is done creating subtasks.  Doing so also simplifies the save() here, as it avoids the need
@@ -273,9 +305,64 @@ def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
 
     # and save the entry immediately, before any subtasks actually start work:
     entry.save_now()
+    _create_subtasks(entry, [SubtaskStatus.create(subtask_id) for subtask_id in subtask_id_list])
     return task_progress
 
 
+@transaction.autocommit
+def _create_subtasks(entry, subtask_statuses):
+    """
+    Create an InstructorSubtask row for each of the `subtask_statuses` of the InstructorTask `entry`.
+
+    Autocommit makes sure the rows are committed before any of the subtasks start.
+    """
+    subtasks = [
+        InstructorSubtask(
+            instructor_task=entry,
+            subtask_id=subtask_status.task_id,
+            state=subtask_status.state,
+            status=json.dumps(subtask_status.to_dict()),
+            **{statname: getattr(subtask_status, statname) for statname in SUBTASK_COUNTS}
+        )
+        for subtask_status in subtask_statuses
+    ]
+    for start in xrange(0, len(subtasks), SUBTASK_ROWS_PER_INSERT):
+        InstructorSubtask.objects.bulk_create(subtasks[start:start + SUBTASK_ROWS_PER_INSERT])
+
+
+def _create_subtasks_from_entry(entry):
+    """
+    Create the InstructorSubtask rows of an InstructorTask whose subtasks were queued before
+    subtasks had rows of their own, from the status stored in its "subtasks" field.
+
+    Returns True if the InstructorTask has rows for its subtasks now, and didn't before.
+    """
+    if len(entry.subtasks) == 0 or InstructorSubtask.objects.filter(instructor_task=entry).exists():
+        return False
+    subtask_status_info = json.loads(entry.subtasks).get('status', {})
+    if not subtask_status_info:
+        return False
+    try:
+        _create_subtasks(entry, [SubtaskStatus.from_dict(status) for status in subtask_status_info.values()])
+    except IntegrityError:
+        # Another subtask created them first.
+        pass
+    return True
+
+
+def _get_subtask(entry, subtask_id):
+    """
+    Returns the InstructorSubtask row of the subtask `subtask_id` of InstructorTask `entry`,
+    or None if the InstructorTask doesn't know about that subtask.
+    """
+    try:
+        return InstructorSubtask.objects.get(instructor_task=entry, subtask_id=subtask_id)
+    except InstructorSubtask.DoesNotExist:
+        if _create_subtasks_from_entry(entry):
+            return _get_subtask(entry, subtask_id)
+        return None
+
+
 def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_querysets, item_fields, items_per_task):
     """
     Generates and queues subtasks to each execute a chunk of "items" generated by a queryset.
@@ -285,9 +372,10 @@ def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_querys
         `action_name` : a past-tense verb that can be used for constructing readable status messages.
         `create_subtask_fcn` : a function of two arguments that constructs the desired kind of subtask object.
             Arguments are the list of items to be processed by this subtask, and a SubtaskStatus
-            object reflecting initial status (and containing the subtask's id).
+            object reflecting initial status (and containing the subtask's id).  Each item is a tuple
+            of the values of the fields in `item_fields`, followed by the 'pk' field.
         `item_querysets` : a list of query sets that define the "items" that should be passed to subtasks.
-        `item_fields` : the fields that should be included in the dict that is returned.
+        `item_fields` : the fields that should be included in the tuple for each item.
             These are in addition to the 'pk' field.
         `items_per_task` : maximum size of chunks to break each query chunk into for use by a subtask.
 
@@ -407,9 +495,8 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
         raise DuplicateTaskException(msg)
 
     # Confirm that the InstructorTask knows about this particular subtask.
-    subtask_dict = json.loads(entry.subtasks)
-    subtask_status_info = subtask_dict['status']
-    if current_task_id not in subtask_status_info:
+    subtask = _get_subtask(entry, current_task_id)
+    if subtask is None:
         format_str = "Unexpected task_id '{}': unable to find status for subtask of instructor task '{}': rejecting task {}"
         msg = format_str.format(current_task_id, entry, new_subtask_status)
         TASK_LOG.warning(msg)
@@ -418,7 +505,7 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
 
     # Confirm that the InstructorTask doesn't think that this subtask has already been
     # performed successfully.
-    subtask_status = SubtaskStatus.from_dict(subtask_status_info[current_task_id])
+    subtask_status = SubtaskStatus.from_dict(json.loads(subtask.status))
     subtask_state = subtask_status.state
     if subtask_state in READY_STATES:
         format_str = "Unexpected task_id '{}': already completed - status {} for subtask of instructor task '{}': rejecting task {}"
@@ -454,12 +541,10 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
 
 def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0):
     """
-    Update the status of the subtask in the parent InstructorTask object tracking its progress.
+    Update the status of the subtask, and the parent InstructorTask object if it is the last to complete.
 
-    Because select_for_update is used to lock the InstructorTask object while it is being updated,
-    multiple subtasks updating at the same time may time out while waiting for the lock.
-    The actual update operation is surrounded by a try/except/else that permits the update to be
-    retried if the transaction times out.
+    If the update fails with a DatabaseError, such as a timeout waiting for a lock on the
+    InstructorTask object while it is completed, the update is retried.
 
     The subtask lock acquired in the call to check_subtask_is_valid() is released here, only when
     the attempting of retries has concluded.
@@ -486,92 +571,139 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
         _release_subtask_lock(current_task_id)
 
 
-@transaction.commit_manually
 def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     """
-    Update the status of the subtask in the parent InstructorTask object tracking its progress.
+    Update the status of the subtask in its InstructorSubtask row.
 
-    Uses select_for_update to lock the InstructorTask object while it is being updated.
-    The operation is surrounded by a try/except/else that permit the manual transaction to be
-    committed on completion, or rolled back on error.
-
-    The InstructorTask's "task_output" field is updated.  This is a JSON-serialized dict.
-    Accumulates values for 'attempted', 'succeeded', 'failed', 'skipped' from `new_subtask_status`
-    into the corresponding values in the InstructorTask's task_output.  Also updates the 'duration_ms'
-    value with the current interval since the original InstructorTask started.  Note that this
-    value is only approximate, since the subtask may be running on a different server than the
-    original task, so is subject to clock skew.
+    Only the subtask's own row is written, so subtasks updating at the same time don't
+    contend for a lock.  The parent InstructorTask isn't written until the last of its
+    subtasks completes, when its progress is added up from the rows of all its subtasks.
 
-    The InstructorTask's "subtasks" field is also updated.  This is also a JSON-serialized dict.
-    Keys include 'total', 'succeeded', 'retried', 'failed', which are counters for the number of
-    subtasks.  'Total' is expected to have been set at the time the subtasks were created.
-    The other three counters are incremented depending on the value of `status`.  Once the counters
-    for 'succeeded' and 'failed' match the 'total', the subtasks are done and the InstructorTask's
-    "status" is changed to SUCCESS.
-
-    The "subtasks" field also contains a 'status' key, that contains a dict that stores status
-    information for each subtask.  At the moment, the value for each subtask (keyed by its task_id)
-    is the value of the SubtaskStatus.to_dict(), but could be expanded in future to store information
-    about failure messages, progress made, etc.
+    The row's status update is committed before checking whether any subtasks remain,
+    so that of two subtasks completing at the same time, at least the one committing
+    last sees that none remain.  (Both may, and both then complete the InstructorTask
+    with the same result.)
     """
     TASK_LOG.info("Preparing to update status for subtask %s for instructor task %d with status %s",
                   current_task_id, entry_id, new_subtask_status)
 
-    try:
-        entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
-        subtask_dict = json.loads(entry.subtasks)
-        subtask_status_info = subtask_dict['status']
-        if current_task_id not in subtask_status_info:
+    entry = InstructorTask.objects.get(pk=entry_id)
+    _save_subtask_status(entry, current_task_id, new_subtask_status)
+
+    if new_subtask_status.state in READY_STATES:
+        unfinished = InstructorSubtask.objects.filter(instructor_task=entry).exclude(state__in=READY_STATES)
+        if not unfinished.exists():
+            _complete_instructor_task(entry_id)
+
+
+@transaction.autocommit
+def _save_subtask_status(entry, current_task_id, new_subtask_status):
+    """
+    Write `new_subtask_status` to the InstructorSubtask row of the subtask.
+
+    Also records the current interval since the original InstructorTask started.  Note that
+    this value is only approximate, since the subtask may be running on a different server
+    than the original task, so is subject to clock skew.
+    """
+    start_time = json.loads(entry.task_output)['start_time']
+    fields = {statname: getattr(new_subtask_status, statname) for statname in SUBTASK_COUNTS}
+    fields.update(
+        state=new_subtask_status.state,
+        status=json.dumps(new_subtask_status.to_dict()),
+        duration_ms=int((time() - start_time) * 1000),
+    )
+    subtasks = InstructorSubtask.objects.filter(instructor_task=entry, subtask_id=current_task_id)
+    if subtasks.update(**fields) == 0:
+        if not (_create_subtasks_from_entry(entry) and subtasks.update(**fields)):
             # unexpected error -- raise an exception
             format_str = "Unexpected task_id '{}': unable to update status for subtask of instructor task '{}'"
-            msg = format_str.format(current_task_id, entry_id)
+            msg = format_str.format(current_task_id, entry.id)  # pylint: disable=no-member
             TASK_LOG.warning(msg)
             raise ValueError(msg)
 
-        # Update status:
-        subtask_status_info[current_task_id] = new_subtask_status.to_dict()
-
-        # Update the parent task progress.
-        # Set the estimate of duration, but only if it
-        # increases.  Clock skew between time() returned by different machines
-        # may result in non-monotonic values for duration.
-        task_progress = json.loads(entry.task_output)
-        start_time = task_progress['start_time']
-        prev_duration = task_progress['duration_ms']
-        new_duration = int((time() - start_time) * 1000)
-        task_progress['duration_ms'] = max(prev_duration, new_duration)
-
-        # Update counts only when subtask is done.
-        # In future, we can make this more responsive by updating status
-        # between retries, by comparing counts that change from previous
-        # retry.
-        new_state = new_subtask_status.state
-        if new_subtask_status is not None and new_state in READY_STATES:
-            for statname in ['attempted', 'succeeded', 'failed', 'skipped']:
-                task_progress[statname] += getattr(new_subtask_status, statname)
-
-        # Figure out if we're actually done (i.e. this is the last task to complete).
-        # This is easier if we just maintain a counter, rather than scanning the
-        # entire new_subtask_status dict.
-        if new_state == SUCCESS:
-            subtask_dict['succeeded'] += 1
-        elif new_state in READY_STATES:
-            subtask_dict['failed'] += 1
-        num_remaining = subtask_dict['total'] - subtask_dict['succeeded'] - subtask_dict['failed']
-
-        # If we're done with the last task, update the parent status to indicate that.
-        # At present, we mark the task as having succeeded.  In future, we should see
-        # if there was a catastrophic failure that occurred, and figure out how to
-        # report that here.
-        if num_remaining <= 0:
-            entry.task_state = SUCCESS
+
+def _get_subtask_progress(entry):
+    """
+    Returns the task progress and the "subtasks" counters of InstructorTask `entry`, added up
+    from the InstructorSubtask rows of its subtasks, or (None, None) if it has no rows.
+
+    Counts are only added to the task progress when a subtask is done.  The 'duration_ms'
+    value is the longest any subtask has seen, as clock skew between time() returned by
+    different machines may result in non-monotonic values for duration.
+    """
+    rows_by_state = list(
+        InstructorSubtask.objects.filter(instructor_task=entry).values('state').annotate(
+            num_subtasks=Count('id'),
+            duration_ms=Max('duration_ms'),
+            **{statname: Sum(statname) for statname in SUBTASK_COUNTS}
+        )
+    )
+    if not rows_by_state:
+        return None, None
+
+    task_progress = json.loads(entry.task_output)
+    subtask_dict = json.loads(entry.subtasks)
+    subtask_dict['succeeded'] = subtask_dict['failed'] = 0
+    for statname in SUBTASK_COUNTS:
+        task_progress[statname] = 0
+    for row in rows_by_state:
+        task_progress['duration_ms'] = max(task_progress['duration_ms'], row['duration_ms'])
+        if row['state'] in READY_STATES:
+            for statname in SUBTASK_COUNTS:
+                task_progress[statname] += row[statname]
+            subtask_dict['succeeded' if row['state'] == SUCCESS else 'failed'] += row['num_subtasks']
+    return task_progress, subtask_dict
+
+
+def get_subtask_task_output(entry):
+    """
+    Returns the "task_output" of InstructorTask `entry`, with the progress its subtasks have
+    made so far, or None if it has no InstructorSubtask rows.
+
+    While subtasks are running, their progress is kept in their own rows rather than
+    the InstructorTask, so this is what the progress of a running InstructorTask with
+    subtasks should be read from.
+    """
+    task_progress, __ = _get_subtask_progress(entry)
+    if task_progress is None:
+        return None
+    return InstructorTask.create_output_for_success(task_progress)
+
+
+@transaction.commit_manually
+def _complete_instructor_task(entry_id):
+    """
+    Mark the InstructorTask as done, now that all its subtasks are.
+
+    Uses select_for_update to lock the InstructorTask object while it is being updated.
+    The operation is surrounded by a try/except/else that permit the manual transaction to be
+    committed on completion, or rolled back on error.
+
+    The InstructorTask's "task_output" field is updated, with the 'attempted', 'succeeded',
+    'failed' and 'skipped' values added up over its subtasks, and the 'duration_ms' value.
+
+    The InstructorTask's "subtasks" field is also updated, with the 'succeeded' and 'failed'
+    counters of subtasks, and the final status of each subtask under its 'status' key.
+
+    At present, the task is marked as having succeeded.  In future, we should see if there
+    was a catastrophic failure that occurred, and figure out how to report that here.
+    """
+    try:
+        entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+        task_progress, subtask_dict = _get_subtask_progress(entry)
+        subtask_dict['status'] = {
+            subtask_id: json.loads(status)
+            for subtask_id, status in InstructorSubtask.objects.filter(
+                instructor_task=entry
+            ).values_list('subtask_id', 'status')
+        }
+        entry.task_state = SUCCESS
         entry.subtasks = json.dumps(subtask_dict)
         entry.task_output = InstructorTask.create_output_for_success(task_progress)
 
         TASK_LOG.debug("about to save....")
         entry.save()
-        TASK_LOG.info("Task output updated to %s for subtask %s of instructor task %d",
-                      entry.task_output, current_task_id, entry_id)
+        TASK_LOG.info("Task output updated to %s for instructor task %d", entry.task_output, entry_id)
     except Exception:
         TASK_LOG.exception("Unexpected error while updating InstructorTask.")
         transaction.rollback()
@@ -31,7 +31,7 @@ from instructor_analytics.basic import enrolled_students_features
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
-from openedx.core.djangoapps.course_groups.cohorts import get_cohort
+from openedx.core.djangoapps.course_groups.cohorts import get_cohort_ids_for_users
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from opaque_keys.edx.keys import UsageKey
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort
@@ -569,6 +569,14 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
     course = get_course_by_id(course_id)
     cohorts_header = ['Cohort Name'] if course.is_cohorted else []
+    if course.is_cohorted:
+        # Look up everyone's cohort at once, rather than once per student
+        cohort_names = dict(
+            CourseUserGroup.objects.filter(
+                course_id=course_id, group_type=CourseUserGroup.COHORT
+            ).values_list('id', 'name')
+        )
+        cohort_ids = get_cohort_ids_for_users(course_id)
 
     experiment_partitions = get_split_user_partitions(course.user_partitions)
     group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
@@ -601,8 +609,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
             cohorts_group_name = []
             if course.is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
+                cohorts_group_name.append(cohort_names.get(cohort_ids.get(student.id), ''))
 
             group_configs_group_names = []
             for partition in experiment_partitions:
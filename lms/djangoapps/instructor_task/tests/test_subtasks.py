@@ -1,13 +1,23 @@
 """
 Unit tests for instructor_task subtasks.
 """
+import json
 from uuid import uuid4
 
+from celery.states import FAILURE, RETRY, SUCCESS
+from django.test import TestCase
 from mock import Mock, patch
 
 from student.models import CourseEnrollment
 
-from instructor_task.subtasks import queue_subtasks_for_query
+from instructor_task.models import InstructorSubtask, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    get_subtask_task_output,
+    initialize_subtask_info,
+    queue_subtasks_for_query,
+    update_subtask_status,
+    SubtaskStatus,
+)
 from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase
 
@@ -79,3 +89,80 @@ class TestSubtasks(InstructorTaskCourseTestCase):
         self.assertEqual(len(mock_create_subtask_fcn_args[0][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[1][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[2][0][0]), 5)
+
+    def test_queue_subtasks_for_query_in_pages(self):
+        """Test queue_subtasks_for_query() reads each item once when the items are read in several pages."""
+
+        mock_create_subtask_fcn = Mock()
+        with patch('instructor_task.subtasks.ITEMS_PER_QUERY', 2):
+            self._queue_subtasks(mock_create_subtask_fcn, 3, 7, 0)
+
+        items = [item for args in mock_create_subtask_fcn.call_args_list for item in args[0][0]]
+        enrollment_pks = CourseEnrollment.objects.filter(course_id=self.course.id).values_list('pk', flat=True)
+        self.assertEqual(sorted(item[-1] for item in items), sorted(enrollment_pks))
+
+
+class TestSubtaskStatus(TestCase):
+    """Tests for storing the status of subtasks in their own rows."""
+
+    def setUp(self):
+        super(TestSubtaskStatus, self).setUp()
+        self.entry = InstructorTaskFactory.create(task_id=str(uuid4()), task_key='dummy_task_key')
+        self.subtask_ids = ['subtask-1', 'subtask-2']
+        initialize_subtask_info(self.entry, 'emailed', 10, self.subtask_ids)
+
+    def _reload_entry(self):
+        """Returns the InstructorTask as it's stored."""
+        return InstructorTask.objects.get(pk=self.entry.id)
+
+    def test_initialize_creates_rows(self):
+        subtasks = InstructorSubtask.objects.filter(instructor_task=self.entry)
+        self.assertEquals(sorted(subtask.subtask_id for subtask in subtasks), self.subtask_ids)
+
+    def test_update_writes_only_subtask_row(self):
+        subtask_status = SubtaskStatus.create('subtask-1', succeeded=3, state=SUCCESS)
+        with patch('instructor_task.subtasks.InstructorTask.save') as mock_task_save:
+            update_subtask_status(self.entry.id, 'subtask-1', subtask_status)
+        self.assertFalse(mock_task_save.called)
+        subtask = InstructorSubtask.objects.get(instructor_task=self.entry, subtask_id='subtask-1')
+        self.assertEquals(subtask.state, SUCCESS)
+        self.assertEquals(subtask.succeeded, 3)
+        self.assertEquals(json.loads(subtask.status), subtask_status.to_dict())
+        self.assertEquals(self._reload_entry().task_state, PROGRESS)
+
+    def test_progress_added_up_from_rows(self):
+        update_subtask_status(self.entry.id, 'subtask-1', SubtaskStatus.create('subtask-1', succeeded=3, state=SUCCESS))
+        update_subtask_status(self.entry.id, 'subtask-2', SubtaskStatus.create('subtask-2', succeeded=1, state=RETRY))
+        task_progress = json.loads(get_subtask_task_output(self._reload_entry()))
+        # counts are only added up when a subtask is done
+        self.assertEquals(task_progress['attempted'], 3)
+        self.assertEquals(task_progress['succeeded'], 3)
+        self.assertEquals(task_progress['total'], 10)
+
+    def test_last_subtask_completes_task(self):
+        update_subtask_status(self.entry.id, 'subtask-1', SubtaskStatus.create('subtask-1', succeeded=3, state=SUCCESS))
+        update_subtask_status(
+            self.entry.id, 'subtask-2', SubtaskStatus.create('subtask-2', succeeded=4, failed=2, skipped=1, state=FAILURE)
+        )
+        entry = self._reload_entry()
+        self.assertEquals(entry.task_state, SUCCESS)
+        task_progress = json.loads(entry.task_output)
+        self.assertEquals(task_progress['attempted'], 9)
+        self.assertEquals(task_progress['succeeded'], 7)
+        self.assertEquals(task_progress['failed'], 2)
+        self.assertEquals(task_progress['skipped'], 1)
+        subtask_dict = json.loads(entry.subtasks)
+        self.assertEquals(subtask_dict['total'], 2)
+        self.assertEquals(subtask_dict['succeeded'], 1)
+        self.assertEquals(subtask_dict['failed'], 1)
+        self.assertEquals(subtask_dict['status']['subtask-2']['state'], FAILURE)
+
+    def test_subtasks_queued_before_rows(self):
+        # An InstructorTask whose subtasks were queued before subtasks had rows of their own.
+        InstructorSubtask.objects.filter(instructor_task=self.entry).delete()
+        update_subtask_status(self.entry.id, 'subtask-1', SubtaskStatus.create('subtask-1', succeeded=3, state=SUCCESS))
+        self.assertEquals(InstructorSubtask.objects.filter(instructor_task=self.entry).count(), 2)
+        update_subtask_status(self.entry.id, 'subtask-2', SubtaskStatus.create('subtask-2', succeeded=4, state=SUCCESS))
+        entry = self._reload_entry()
+        self.assertEquals(entry.task_state, SUCCESS)
+        self.assertEquals(json.loads(entry.task_output)['succeeded'], 7)
@@ -177,6 +177,11 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+# Local disk cache of course static content, in front of the shared cache
+CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('CACHE_TOOLBOX_CONTENT_DISK_CACHE_DIR', None)
+if 'CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE' in ENV_TOKENS:
+    CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE = ENV_TOKENS['CACHE_TOOLBOX_CONTENT_DISK_CACHE_MAX_SIZE']
+
 # Email overrides
 DEFAULT_FROM_EMAIL = ENV_TOKENS.get('DEFAULT_FROM_EMAIL', DEFAULT_FROM_EMAIL)
 DEFAULT_FEEDBACK_EMAIL = ENV_TOKENS.get('DEFAULT_FEEDBACK_EMAIL', DEFAULT_FEEDBACK_EMAIL)
@@ -205,6 +210,7 @@ BULK_EMAIL_MAX_RETRIES = ENV_TOKENS.get('BULK_EMAIL_MAX_RETRIES', BULK_EMAIL_MAX
 BULK_EMAIL_INFINITE_RETRY_CAP = ENV_TOKENS.get('BULK_EMAIL_INFINITE_RETRY_CAP', BULK_EMAIL_INFINITE_RETRY_CAP)
 BULK_EMAIL_LOG_SENT_EMAILS = ENV_TOKENS.get('BULK_EMAIL_LOG_SENT_EMAILS', BULK_EMAIL_LOG_SENT_EMAILS)
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = ENV_TOKENS.get('BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS', BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS = ENV_TOKENS.get('BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS', BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS)
 # We want Bulk Email running on the high-priority queue, so we define the
 # routing key that points to it.  At the moment, the name is the same.
 # We have to reset the value here, since we have changed the value of the queue name.
@@ -251,6 +257,10 @@ VIRTUAL_UNIVERSITIES = ENV_TOKENS.get('VIRTUAL_UNIVERSITIES', [])
 META_UNIVERSITIES = ENV_TOKENS.get('META_UNIVERSITIES', {})
 COMMENTS_SERVICE_URL = ENV_TOKENS.get("COMMENTS_SERVICE_URL", '')
 COMMENTS_SERVICE_KEY = ENV_TOKENS.get("COMMENTS_SERVICE_KEY", '')
+COMMENTS_SERVICE_POOL_SIZE = ENV_TOKENS.get("COMMENTS_SERVICE_POOL_SIZE", COMMENTS_SERVICE_POOL_SIZE)
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = ENV_TOKENS.get(
+    "COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS", COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS
+)
 CERT_QUEUE = ENV_TOKENS.get("CERT_QUEUE", 'test-pull')
 ZENDESK_URL = ENV_TOKENS.get("ZENDESK_URL")
 FEEDBACK_SUBMISSION_EMAIL = ENV_TOKENS.get("FEEDBACK_SUBMISSION_EMAIL")
@@ -437,6 +447,12 @@ GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
 
+# Student module history
+STUDENT_MODULE_HISTORY_WRITES = ENV_TOKENS.get('STUDENT_MODULE_HISTORY_WRITES', STUDENT_MODULE_HISTORY_WRITES)
+STUDENT_MODULE_HISTORY_BATCH_SIZE = ENV_TOKENS.get(
+    'STUDENT_MODULE_HISTORY_BATCH_SIZE', STUDENT_MODULE_HISTORY_BATCH_SIZE
+)
+
 ##### ORA2 ######
 # Prefix for uploads of example-based assessment AI classifiers
 # This can be used to separate uploads for different environments
@@ -64,6 +64,11 @@ DISCUSSION_SETTINGS = {
     'MAX_COMMENT_DEPTH': 2,
 }
 
+# The most keep-alive connections to the comments service each process keeps open.
+COMMENTS_SERVICE_POOL_SIZE = 10
+# The most comments service requests a forum view makes at once.
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = 4
+
 
 # Features
 FEATURES = {
@@ -348,6 +353,11 @@ FEATURES = {
 
     # log all information from cybersource callbacks
     'LOG_POSTPAY_CALLBACKS': True,
+
+    # Store computed course and subsection grades per student, and serve
+    # grades and the progress page from them until a score changes or the
+    # course is republished.
+    'ENABLE_PERSISTENT_GRADES': False,
 }
 
 # Ignore static asset files on import which match this pattern
@@ -685,6 +695,16 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Warm sandbox workers, see capa/safe_exec/worker_pool.py.
+    'worker_pool': {
+        # How many workers to keep?  0 runs each piece of code in a new sandbox.
+        'size': 0,
+        # How many pieces of code can a worker run before it's replaced?
+        'max_executions': 100,
+        # How much memory (in bytes) can a worker grow to?  0 means no limit.
+        'max_memory': 0,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1018,6 +1038,8 @@ MIDDLEWARE_CLASSES = (
     # Detects user-requested locale from 'accept-language' header in http request
     'django.middleware.locale.LocaleMiddleware',
 
+    # Writes buffered StudentModuleHistory rows, once the request's transaction is committed
+    'courseware.history_writer.HistoryWriterMiddleware',
     'django.middleware.transaction.TransactionMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
@@ -1475,6 +1497,10 @@ BULK_EMAIL_LOG_SENT_EMAILS = False
 # parallel, and what the SES rate is.
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
 
+# Longest delay in seconds to sleep between mail messages.  The delay doubles
+# each time a bulk email task is retried for rate-related reasons, up to this.
+BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS = 1.0
+
 ############################# Email Opt In ####################################
 
 # Minimum age for organization-wide email opt in
@@ -1639,6 +1665,7 @@ INSTALLED_APPS = (
     'lms.djangoapps.lms_xblock',
 
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.course_overviews',
     'course_structure_api',
 )
 
@@ -1735,6 +1762,13 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+###################### Student Module History ######################
+# How StudentModuleHistory rows are written: 'immediate', 'request_end' or
+# 'celery'. See courseware/history_writer.py for how durable each is.
+STUDENT_MODULE_HISTORY_WRITES = 'immediate'
+# Buffered rows are written whenever there are this many of them.
+STUDENT_MODULE_HISTORY_BATCH_SIZE = 100
+
 
 #### PASSWORD POLICY SETTINGS #####
 PASSWORD_MIN_LENGTH = 8
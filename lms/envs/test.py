@@ -52,6 +52,9 @@ FEATURES['DISABLE_START_DATES'] = True
 # the one in cms/envs/test.py
 FEATURES['ENABLE_DISCUSSION_SERVICE'] = False
 
+# Make comments service requests one at a time, in order, so tests can check the requests made.
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = 1
+
 FEATURES['ENABLE_SERVICE_STATUS'] = True
 
 FEATURES['ENABLE_HINTER_INSTRUCTOR_VIEW'] = True
@@ -210,6 +213,9 @@ CACHES = {
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
+# Don't let throttled bulk email tasks wait longer between emails as they're retried
+BULK_EMAIL_MAX_DELAY_BETWEEN_SENDS = BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS
+
 # hide ratelimit warnings while running tests
 filterwarnings('ignore', message='No request passed to the backend, unable to rate-limit')
 
@@ -0,0 +1,88 @@
+"""
+Tests for the comments service request helpers.
+"""
+import threading
+from unittest import TestCase
+
+from django.test.utils import override_settings
+from django.utils import translation
+from mock import patch
+
+from lms.lib.comment_client import utils
+
+
+class GetSessionTestCase(TestCase):
+    """
+    Tests for the comments service session.
+    """
+    def test_session_shared(self):
+        sessions = [utils.get_session()]
+        thread = threading.Thread(target=lambda: sessions.append(utils.get_session()))
+        thread.start()
+        thread.join()
+        self.assertIs(sessions[0], sessions[1])
+
+    def test_new_session_after_fork(self):
+        session = utils.get_session()
+        with patch('lms.lib.comment_client.utils.os.getpid', return_value=-1):
+            forked_session = utils.get_session()
+        self.assertIsNot(session, forked_session)
+
+    @override_settings(COMMENTS_SERVICE_POOL_SIZE=3)
+    def test_pool_size(self):
+        with patch('lms.lib.comment_client.utils.os.getpid', return_value=-2):
+            session = utils.get_session()
+        self.assertEqual(session.get_adapter('http://localhost:4567')._pool_maxsize, 3)  # pylint: disable=protected-access
+
+
+class PerformConcurrentlyTestCase(TestCase):
+    """
+    Tests for making comments service requests concurrently.
+    """
+    @override_settings(COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS=2)
+    def test_concurrent(self):
+        # each call waits for the other to start, so they must be made at once
+        barrier = [threading.Event(), threading.Event()]
+
+        def _call(index):
+            """Signals that call `index` started, and waits for the other."""
+            barrier[index].set()
+            self.assertTrue(barrier[1 - index].wait(5))
+            return index
+
+        self.assertEqual(utils.perform_concurrently(lambda: _call(0), lambda: _call(1)), [0, 1])
+
+    @override_settings(COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS=2)
+    def test_results_in_order(self):
+        calls = [lambda index=index: index for index in range(5)]
+        self.assertEqual(utils.perform_concurrently(*calls), range(5))
+
+    @override_settings(COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS=1)
+    def test_one_at_a_time(self):
+        called = []
+        calls = [lambda index=index: called.append((index, threading.current_thread())) for index in range(3)]
+        utils.perform_concurrently(*calls)
+        self.assertEqual(called, [(index, threading.current_thread()) for index in range(3)])
+
+    @override_settings(COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS=2)
+    def test_first_error_raised(self):
+        called = []
+
+        def _fail(message):
+            """Raises a CommentClientError."""
+            called.append(message)
+            raise utils.CommentClientError(message)
+
+        with self.assertRaises(utils.CommentClientError) as context:
+            utils.perform_concurrently(lambda: _fail('first'), lambda: _fail('second'))
+        self.assertEqual(context.exception.message, 'first')
+        self.assertEqual(sorted(called), ['first', 'second'])
+
+    @override_settings(COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS=2)
+    def test_language(self):
+        translation.activate('eo')
+        try:
+            languages = utils.perform_concurrently(translation.get_language, translation.get_language)
+        finally:
+            translation.deactivate()
+        self.assertEqual(languages, ['eo', 'eo'])
@@ -1,14 +1,24 @@
 from contextlib import contextmanager
 import dogstats_wrapper as dog_stats_api
 import logging
+import os
+import sys
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from time import time
 from uuid import uuid4
+from django.utils import translation
 from django.utils.translation import get_language
 
 log = logging.getLogger(__name__)
 
+# Each process keeps its own pool of keep-alive connections to the comments service.
+_SESSION = None
+_SESSION_PID = None
+_SESSION_LOCK = threading.Lock()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -50,6 +60,79 @@ def request_timer(request_id, method, url, tags=None):
     )
 
 
+def get_session():
+    """
+    Returns this process's requests Session for the comments service.
+
+    Its pool of keep-alive connections is shared by all the process's threads,
+    and holds up to COMMENTS_SERVICE_POOL_SIZE connections to each host.
+    Connections don't survive a fork, so a forked process makes its own.
+    """
+    global _SESSION, _SESSION_PID  # pylint: disable=global-statement
+    if _SESSION_PID != os.getpid():
+        with _SESSION_LOCK:
+            if _SESSION_PID != os.getpid():
+                pool_size = getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+                session = requests.Session()
+                for prefix in ('http://', 'https://'):
+                    session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                _SESSION = session
+                _SESSION_PID = os.getpid()
+    return _SESSION
+
+
+def perform_concurrently(*calls):
+    """
+    Calls each of `calls`, functions of no arguments which make independent
+    comments service requests, at once, and returns a list of their results.
+
+    The first function is called in this thread, and the others each in their
+    own thread, so only the first may use the database.  Up to
+    COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS functions are called at once; if
+    that is 1, they're called one at a time, in order.  If any of them raise an
+    exception, the first one's exception is raised once they have all returned.
+    """
+    max_concurrent = getattr(settings, "COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS", 1)
+    if max_concurrent <= 1 or len(calls) <= 1:
+        return [call() for call in calls]
+
+    results = [None] * len(calls)
+    exc_infos = [None] * len(calls)
+    # the language is set for each request's thread, and the calls send it in their headers
+    language = get_language()
+
+    def _call(index):
+        """Calls calls[index], saving its result or exception."""
+        try:
+            results[index] = calls[index]()
+        except Exception:  # pylint: disable=broad-except
+            exc_infos[index] = sys.exc_info()
+
+    def _call_in_thread(index):
+        """Calls calls[index] in a thread other than the request's."""
+        translation.activate(language)
+        try:
+            _call(index)
+        finally:
+            translation.deactivate()
+
+    for start in xrange(0, len(calls), max_concurrent):
+        threads = [
+            threading.Thread(target=_call_in_thread, args=(index,), name='comment-client-request')
+            for index in xrange(start + 1, min(start + max_concurrent, len(calls)))
+        ]
+        for thread in threads:
+            thread.start()
+        _call(start)
+        for thread in threads:
+            thread.join()
+
+    for exc_info in exc_infos:
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+    return results
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
                     metric_action=None, metric_tags=None, paged_results=False):
 
@@ -76,7 +159,7 @@ def perform_request(method, url, data_or_params=None, raw=False,
         data = None
         params = merge_dict(data_or_params, request_id_dict)
     with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
+        response = get_session().request(
             method,
             url,
             data=data,
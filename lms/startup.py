@@ -30,6 +30,8 @@ def run():
 
     add_mimetypes()
 
+    configure_sandbox_worker_pool()
+
     if settings.FEATURES.get('USE_CUSTOM_THEME', False):
         enable_theme()
 
@@ -65,6 +67,14 @@ def add_mimetypes():
     mimetypes.add_type('application/font-woff', '.woff')
 
 
+def configure_sandbox_worker_pool():
+    """
+    Configure the pool of warm workers which run sandboxed problem code.
+    """
+    from capa.safe_exec.worker_pool import configure_worker_pool
+    configure_worker_pool(**settings.CODE_JAIL.get('worker_pool', {}))
+
+
 def enable_theme():
     """
     Enable the settings for a custom theme, whose files should be stored
@@ -0,0 +1,405 @@
+"""
+A denormalized summary of each course, for pages which list courses (the
+dashboard, the homepage and the course catalog) to render without loading
+course descriptors from the modulestore.
+"""
+import json
+import logging
+from datetime import datetime
+from math import exp
+
+import dateutil.parser
+from celery.task import task
+from django.db import IntegrityError, models
+from django.dispatch import receiver
+from django.utils.timezone import UTC
+from django.utils.translation import ugettext as _
+from model_utils.models import TimeStampedModel
+from opaque_keys.edx.keys import CourseKey
+from static_replace import replace_static_urls
+from util.date_utils import strftime_localized
+from xmodule.course_module import CourseDescriptor, CourseFields
+from xmodule.fields import Date
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore, SignalHandler
+from xmodule.modulestore.exceptions import ItemNotFoundError
+
+from xmodule_django.models import CourseKeyField, UsageKeyField
+
+log = logging.getLogger(__name__)
+
+# The XML courses whose overviews this process has regenerated.  XML courses are
+# loaded from disk when the process starts, and never published, so their
+# overviews are regenerated once per process.
+_REFRESHED_XML_COURSES = set()
+
+
+class CourseOverview(TimeStampedModel):
+    """
+    The parts of a course which are shown when it's listed, with the same
+    names and helper methods as on CourseDescriptor, so listings can render
+    either.
+
+    Overviews are created when a course is first asked for, regenerated each
+    time it's published (or, for XML courses, once per process), and deleted
+    when it's deleted or can't be loaded.
+    """
+    id = CourseKeyField(max_length=255, primary_key=True, verbose_name='Course ID')
+    location = UsageKeyField(max_length=255)
+
+    display_name = models.TextField(null=True)
+    display_number_with_default = models.TextField()
+    display_org_with_default = models.TextField()
+    short_description = models.TextField(null=True)
+    course_image_url = models.TextField()
+
+    start = models.DateTimeField(null=True)
+    end = models.DateTimeField(null=True)
+    advertised_start = models.TextField(null=True)
+    announcement = models.DateTimeField(null=True)
+    is_new = models.NullBooleanField()
+    days_early_for_beta = models.FloatField(null=True)
+
+    enrollment_start = models.DateTimeField(null=True)
+    enrollment_end = models.DateTimeField(null=True)
+    enrollment_domain = models.TextField(null=True)
+    invitation_only = models.BooleanField(default=False)
+
+    catalog_visibility = models.TextField(null=True)
+    ispublic = models.NullBooleanField()
+    visible_to_staff_only = models.BooleanField(default=False)
+    mobile_available = models.BooleanField(default=False)
+    pre_requisite_courses_json = models.TextField(default='[]')
+
+    certificates_display_behavior = models.TextField(null=True)
+    certificates_show_before_end = models.BooleanField(default=False)
+    cert_name_short = models.TextField()
+    cert_name_long = models.TextField()
+    end_of_course_survey_url = models.TextField(null=True)
+    lowest_passing_grade = models.FloatField(null=True)
+
+    @classmethod
+    def create_from_course(cls, course):
+        """
+        Returns an unsaved overview of the CourseDescriptor `course`.
+        """
+        # imported here, as courseware imports the access checks which import this module
+        from courseware.courses import course_image_url
+
+        is_new = course.is_new
+        if isinstance(is_new, basestring):
+            is_new = is_new.lower() in ['true', 'yes', 'y']
+
+        return cls(
+            id=course.id,
+            location=course.location,
+            display_name=course.display_name,
+            display_number_with_default=course.display_number_with_default,
+            display_org_with_default=course.display_org_with_default,
+            short_description=_get_short_description(course),
+            course_image_url=course_image_url(course),
+            start=course.start,
+            end=course.end,
+            advertised_start=course.advertised_start,
+            announcement=course.announcement,
+            is_new=is_new,
+            days_early_for_beta=course.days_early_for_beta,
+            enrollment_start=course.enrollment_start,
+            enrollment_end=course.enrollment_end,
+            enrollment_domain=course.enrollment_domain,
+            invitation_only=course.invitation_only,
+            catalog_visibility=course.catalog_visibility,
+            ispublic=course.ispublic,
+            visible_to_staff_only=course.visible_to_staff_only,
+            mobile_available=course.mobile_available,
+            pre_requisite_courses_json=json.dumps(course.pre_requisite_courses),
+            certificates_display_behavior=course.certificates_display_behavior,
+            certificates_show_before_end=course.certificates_show_before_end,
+            cert_name_short=course.cert_name_short or '',
+            cert_name_long=course.cert_name_long or '',
+            end_of_course_survey_url=course.end_of_course_survey_url,
+            lowest_passing_grade=course.lowest_passing_grade,
+        )
+
+    @classmethod
+    def get_from_id(cls, course_key):
+        """
+        Returns the overview of the course, creating it if need be.
+
+        Raises:
+            CourseOverview.DoesNotExist if the course doesn't exist, or can't
+            be loaded.
+        """
+        overviews = cls.get_from_ids([course_key])
+        if course_key not in overviews:
+            raise cls.DoesNotExist(u"Course {} doesn't exist".format(course_key))
+        return overviews[course_key]
+
+    @classmethod
+    def get_from_ids(cls, course_keys):
+        """
+        Returns a dict mapping each of `course_keys` to the overview of the
+        course. Courses which don't exist, or can't be loaded, are left out.
+
+        Each course is loaded from the modulestore, without its children, to
+        check that it still loads; see get_from_courses.
+        """
+        store = modulestore()
+        courses = []
+        for course_key in course_keys:
+            with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+                course = store.get_course(course_key)
+            courses.append(course if course is not None else course_key)
+        return cls.get_from_courses(courses)
+
+    @classmethod
+    def get_from_courses(cls, courses):
+        """
+        Returns a dict mapping the id of each of the loaded `courses` to its
+        overview, with one query for the overviews which already exist.
+
+        `courses` may include ErrorDescriptors, for courses which can't be
+        loaded, and the keys of courses which don't exist.  Those are left
+        out, and their overviews deleted.  Overviews which don't exist are
+        created, and the overviews of XML courses, which are never published,
+        are regenerated the first time this process asks for them.
+        """
+        store = modulestore()
+        course_keys = [course if isinstance(course, CourseKey) else course.id for course in courses]
+        overviews = {overview.id: overview for overview in cls.objects.filter(id__in=course_keys)}
+
+        result = {}
+        unloadable = []
+        for course_key, course in zip(course_keys, courses):
+            if not isinstance(course, CourseDescriptor):
+                if course_key in overviews:
+                    unloadable.append(course_key)
+                continue
+
+            overview = overviews.get(course_key)
+            is_xml = store.get_modulestore_type(course_key) == ModuleStoreEnum.Type.xml
+            if overview is None or (is_xml and course_key not in _REFRESHED_XML_COURSES):
+                overview = _save_course_overview(course)
+                if is_xml:
+                    _REFRESHED_XML_COURSES.add(course_key)
+            result[course_key] = overview
+
+        if unloadable:
+            log.warning(u"Deleting the overviews of broken or deleted courses %s", unloadable)
+            cls.objects.filter(id__in=unloadable).delete()
+        return result
+
+    @property
+    def pre_requisite_courses(self):
+        """
+        The ids of the courses which have to be passed before this one.
+        """
+        return json.loads(self.pre_requisite_courses_json)
+
+    @property
+    def number(self):
+        return self.location.course
+
+    @property
+    def org(self):
+        return self.location.org
+
+    @property
+    def url_name(self):
+        return self.location.name
+
+    @property
+    def display_name_with_default(self):
+        """
+        Return the display name of the course if it has one, otherwise convert
+        its url name.
+        """
+        name = self.display_name
+        if name is None:
+            name = self.url_name.replace('_', ' ')
+        return name.replace('<', '&lt;').replace('>', '&gt;')
+
+    def has_ended(self):
+        """
+        Returns True if the current time is after the course end date.
+        Returns False if there is no end date specified.
+        """
+        if self.end is None:
+            return False
+
+        return datetime.now(UTC()) > self.end
+
+    def has_started(self):
+        return datetime.now(UTC()) > self.start
+
+    def may_certify(self):
+        """
+        Return True if it is acceptable to show the student a certificate download link
+        """
+        show_early = self.certificates_display_behavior in ('early_with_info', 'early_no_info') or self.certificates_show_before_end
+        return show_early or self.has_ended()
+
+    @property
+    def start_date_is_still_default(self):
+        """
+        Checks if the start date set for the course is still default, i.e. .start has not been modified,
+        and .advertised_start has not been set.
+        """
+        return self.advertised_start is None and self.start == CourseFields.start.default
+
+    def start_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the desired text corresponding the course's start date and time in UTC.  Prefers .advertised_start,
+        then falls back to .start
+        """
+        if self.advertised_start is not None:
+            try:
+                when = Date().from_json(self.advertised_start)
+            except ValueError:
+                when = None
+            if when is None:
+                return self.advertised_start.title()
+        elif self.start_date_is_still_default:
+            # Translators: TBD stands for 'To Be Determined' and is used when a course
+            # does not yet have an announced start date.
+            return _('TBD')
+        else:
+            when = self.start
+
+        if format_string == "DATE_TIME":
+            return strftime_localized(when, format_string) + u" UTC"
+        return strftime_localized(when, format_string)
+
+    def end_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the end date or date_time for the course formatted as a string.
+
+        If the course does not have an end date set (course.end is None), an empty string will be returned.
+        """
+        if self.end is None:
+            return ''
+
+        date_time = strftime_localized(self.end, format_string)
+        return date_time if format_string == "SHORT_DATE" else date_time + u" UTC"
+
+    @property
+    def is_newish(self):
+        """
+        Returns if the course has been flagged as new. If there is no flag,
+        return a heuristic value considering the announcement and the start
+        dates.
+        """
+        if self.is_new is not None:
+            return self.is_new
+
+        announcement, start, now = self._sorting_dates()
+        if announcement and (now - announcement).days < 30:
+            # The course has been announced for less that month
+            return True
+        # The course has not started yet
+        return (now - start).days < 1
+
+    @property
+    def sorting_score(self):
+        """
+        Returns a number to sort courses by how "new" they are, using their
+        announcement and (advertised) start dates. The lower the number the
+        "newer" the course.
+        """
+        announcement, start, now = self._sorting_dates()
+        scale = 300.0  # about a year
+        if announcement:
+            days = (now - announcement).days
+            return -exp(-days / scale)
+        days = (now - start).days
+        return exp(days / scale)
+
+    def _sorting_dates(self):
+        """
+        Returns the announcement, (advertised) start, and current dates.
+        """
+        try:
+            start = dateutil.parser.parse(self.advertised_start)
+            if start.tzinfo is None:
+                start = start.replace(tzinfo=UTC())
+        except (ValueError, AttributeError):
+            start = self.start
+
+        return self.announcement, start, datetime.now(UTC())
+
+
+def _get_short_description(course):
+    """
+    Returns the HTML of the course's short description, or None if it has none.
+    """
+    try:
+        about = modulestore().get_item(course.location.replace(category='about', name='short_description'))
+    except ItemNotFoundError:
+        return None
+
+    return replace_static_urls(
+        about.data,
+        getattr(course, 'data_dir', None),
+        course_id=course.id,
+        static_asset_path=course.static_asset_path
+    )
+
+
+def _save_course_overview(course):
+    """
+    Saves and returns the overview of the CourseDescriptor `course`.
+    """
+    overview = CourseOverview.create_from_course(course)
+    try:
+        overview.save()
+    except IntegrityError:
+        # Another process created the overview at the same time, so use theirs.
+        log.info(u"Course overview for %s was created concurrently", course.id)
+        overview = CourseOverview.objects.get(id=course.id)
+    return overview
+
+
+def _generate_course_overview(course_key):
+    """
+    Loads the published course from the modulestore, and saves its overview.
+
+    Returns the overview, or None if the course doesn't exist or can't be
+    loaded.
+    """
+    store = modulestore()
+    with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+        course = store.get_course(course_key)
+        if not isinstance(course, CourseDescriptor):
+            return None
+        return _save_course_overview(course)
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Regenerates the overview of a course when it's published.
+    """
+    update_course_overview.delay(unicode(course_key))
+
+
+@receiver(SignalHandler.course_deleted)
+def listen_for_course_delete(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Deletes the overview of a course when it's deleted.
+    """
+    CourseOverview.objects.filter(id=course_key).delete()
+
+
+@task(name=u'openedx.core.djangoapps.content.course_overviews.models.update_course_overview')
+def update_course_overview(course_key):
+    """
+    Regenerates and stores the overview of the specified course, or deletes it
+    if the course no longer exists.
+    """
+    # Celery can't serialize CourseKeys, so callers pass a string.
+    if not isinstance(course_key, basestring):
+        raise ValueError('course_key must be a string. {} is not acceptable.'.format(type(course_key)))
+
+    course_key = CourseKey.from_string(course_key)
+    if _generate_course_overview(course_key) is None:
+        CourseOverview.objects.filter(id=course_key).delete()
@@ -0,0 +1,124 @@
+"""
+Tests for course overviews.
+"""
+from datetime import datetime
+
+from django.db import IntegrityError
+from django.utils.timezone import UTC
+from mock import patch
+
+from courseware.courses import course_image_url
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+
+
+class CourseOverviewTests(ModuleStoreTestCase):
+    """
+    Tests for CourseOverview.
+    """
+    def setUp(self):
+        super(CourseOverviewTests, self).setUp()
+        self.course = CourseFactory.create(
+            org='TestX',
+            number='T101',
+            display_name='Test Course',
+            start=datetime(2015, 1, 1, tzinfo=UTC()),
+            end=datetime(2015, 6, 1, tzinfo=UTC()),
+            enrollment_domain='example.com',
+            mobile_available=True,
+        )
+        ItemFactory.create(
+            parent_location=self.course.location,
+            category='about',
+            display_name='short_description',
+            data='A short description.',
+        )
+        self.course = self.store.get_course(self.course.id)
+
+    def test_created_on_publish(self):
+        self.assertTrue(CourseOverview.objects.filter(id=self.course.id).exists())
+
+    def test_fields(self):
+        CourseOverview.objects.all().delete()
+        overview = CourseOverview.get_from_id(self.course.id)
+
+        for attribute in [
+                'id', 'location', 'display_name', 'display_name_with_default', 'display_number_with_default',
+                'display_org_with_default', 'number', 'org', 'url_name', 'start', 'end', 'advertised_start',
+                'enrollment_start', 'enrollment_end', 'enrollment_domain', 'invitation_only',
+                'catalog_visibility', 'ispublic', 'visible_to_staff_only', 'mobile_available',
+                'pre_requisite_courses', 'certificates_display_behavior', 'certificates_show_before_end',
+                'cert_name_short', 'cert_name_long', 'end_of_course_survey_url', 'lowest_passing_grade',
+                'days_early_for_beta', 'start_date_is_still_default', 'is_newish', 'sorting_score',
+        ]:
+            self.assertEqual(getattr(overview, attribute), getattr(self.course, attribute), attribute)
+
+        for method in ['has_ended', 'has_started', 'may_certify', 'start_datetime_text', 'end_datetime_text']:
+            self.assertEqual(getattr(overview, method)(), getattr(self.course, method)(), method)
+
+        self.assertEqual(overview.course_image_url, course_image_url(self.course))
+        self.assertEqual(overview.short_description, 'A short description.')
+
+    def test_saved(self):
+        CourseOverview.objects.all().delete()
+        CourseOverview.get_from_id(self.course.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, 'Test Course')
+
+    def test_get_from_ids(self):
+        other_course = CourseFactory.create()
+        missing_key = self.store.make_course_key('TestX', 'Missing', 'Run')
+        overviews = CourseOverview.get_from_ids([self.course.id, other_course.id, missing_key])
+        self.assertEqual(set(overviews), set([self.course.id, other_course.id]))
+
+        with self.assertNumQueries(1):
+            CourseOverview.get_from_ids([self.course.id, other_course.id])
+
+    def test_missing_course(self):
+        missing_key = self.store.make_course_key('TestX', 'Missing', 'Run')
+        with self.assertRaises(CourseOverview.DoesNotExist):
+            CourseOverview.get_from_id(missing_key)
+
+    def test_updated_on_publish(self):
+        self.course.display_name = 'Updated Course'
+        self.store.update_item(self.course, ModuleStoreEnum.UserID.test)
+        self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, 'Updated Course')
+
+    def test_deleted_course(self):
+        modulestore().delete_course(self.course.id, ModuleStoreEnum.UserID.test)
+        self.assertFalse(CourseOverview.objects.filter(id=self.course.id).exists())
+
+    def test_unloadable_course(self):
+        with patch.object(self.store, 'get_course', return_value=None):
+            self.assertEqual(CourseOverview.get_from_ids([self.course.id]), {})
+        self.assertFalse(CourseOverview.objects.filter(id=self.course.id).exists())
+
+        # The overview is made again once the course loads
+        self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, 'Test Course')
+
+    def test_xml_course_regenerated_once(self):
+        CourseOverview.objects.filter(id=self.course.id).update(display_name='Stale')
+        with patch.object(self.store, 'get_modulestore_type', return_value=ModuleStoreEnum.Type.xml):
+            with patch('openedx.core.djangoapps.content.course_overviews.models._REFRESHED_XML_COURSES', set()):
+                self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, 'Test Course')
+
+                CourseOverview.objects.filter(id=self.course.id).update(display_name='Stale')
+                self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, 'Stale')
+
+    def test_created_concurrently(self):
+        CourseOverview.objects.all().delete()
+
+        def save(overview, *args, **kwargs):  # pylint: disable=unused-argument
+            "Another process inserts the overview first."
+            concurrent = CourseOverview.create_from_course(self.course)
+            concurrent.display_name = 'Concurrent Course'
+            CourseOverview.objects.bulk_create([concurrent])
+            raise IntegrityError()
+
+        with patch.object(CourseOverview, 'save', autospec=True, side_effect=save):
+            overview = CourseOverview.get_from_id(self.course.id)
+        self.assertEqual(overview.display_name, 'Concurrent Course')
@@ -6,21 +6,75 @@ forums, and to the cohort admin views.
 import logging
 import random
 
+from crum import get_current_request
 from django.db import transaction
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, m2m_changed, pre_delete
 from django.dispatch import receiver
 from django.http import Http404
 from django.utils.translation import ugettext as _
 
 from courseware import courses
 from eventtracking import tracker
+from request_cache.middleware import RequestCache
 from student.models import get_user_by_username_or_email
+from util.cache import cache
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore, SignalHandler
 from .models import CourseUserGroup, CourseUserGroupPartitionGroup
 
 
 log = logging.getLogger(__name__)
 
 
+# How many seconds a user's cohort is cached for.  Membership changes forget the
+# cached cohorts at once, but a request which read a user's membership before a
+# change was committed can cache the old cohort, for at most this long.
+MEMBERSHIP_CACHE_TIMEOUT = 60
+
+
+def _request_cache(name):
+    """
+    Returns the dict in which this request caches the values called `name`.
+
+    Outside a request (e.g. in a celery task or a management command) nothing
+    would ever clear the request cache, so a new, empty dict is returned, and
+    only the shared cache is used.
+    """
+    if get_current_request() is None:
+        return {}
+    return RequestCache.get_request_cache().data.setdefault(u"course_groups.cohorts.{}".format(name), {})
+
+
+def _membership_cache_key(user_id, course_key):
+    """
+    Returns the key under which the id of the user's cohort in the course is cached.
+    """
+    return u"course_groups.cohorts.membership.{}.{}".format(user_id, course_key)
+
+
+def _is_cohorted_cache_key(course_key):
+    """
+    Returns the key under which whether the course is cohorted is cached.
+    """
+    return u"course_groups.cohorts.is_cohorted.{}".format(course_key)
+
+
+def _cache_membership(user_id, cohort):
+    """
+    Caches the user's membership of the cohort, for this request and for later ones.
+    """
+    _request_cache("membership")[(user_id, cohort.course_id)] = cohort
+    cache.set(_membership_cache_key(user_id, cohort.course_id), cohort.id, MEMBERSHIP_CACHE_TIMEOUT)
+
+
+def _invalidate_membership(user_id, course_key):
+    """
+    Forgets the cached cohort of the user in the course.
+    """
+    _request_cache("membership").pop((user_id, course_key), None)
+    cache.delete(_membership_cache_key(user_id, course_key))
+
+
 @receiver(post_save, sender=CourseUserGroup)
 def _cohort_added(sender, **kwargs):
     """Emits a tracking log event each time a cohort is created"""
@@ -34,20 +88,22 @@ def _cohort_added(sender, **kwargs):
 
 @receiver(m2m_changed, sender=CourseUserGroup.users.through)
 def _cohort_membership_changed(sender, **kwargs):
-    """Emits a tracking log event each time cohort membership is modified"""
-    def get_event_iter(user_id_iter, cohort_iter):
-        return (
-            {"cohort_id": cohort.id, "cohort_name": cohort.name, "user_id": user_id}
-            for user_id in user_id_iter
-            for cohort in cohort_iter
-        )
-
+    """
+    Emits a tracking log event each time cohort membership is modified, and
+    forgets the cached cohorts of the users concerned once it has been
+    """
     action = kwargs["action"]
     instance = kwargs["instance"]
     pk_set = kwargs["pk_set"]
     reverse = kwargs["reverse"]
 
-    if action == "post_add":
+    if action == "post_clear":
+        # The memberships were found before they were cleared.
+        for user_id, cohort in getattr(instance, "_cleared_cohort_memberships", []):
+            _invalidate_membership(user_id, cohort.course_id)
+        instance._cleared_cohort_memberships = []  # pylint: disable=protected-access
+        return
+    elif action == "post_add":
         event_name = "edx.cohort.user_added"
     elif action in ["post_remove", "pre_clear"]:
         event_name = "edx.cohort.user_removed"
@@ -55,20 +111,46 @@ def _cohort_membership_changed(sender, **kwargs):
         return
 
     if reverse:
-        user_id_iter = [instance.id]
+        user_ids = [instance.id]
         if action == "pre_clear":
-            cohort_iter = instance.course_groups.filter(group_type=CourseUserGroup.COHORT)
+            cohorts = list(instance.course_groups.filter(group_type=CourseUserGroup.COHORT))
         else:
-            cohort_iter = CourseUserGroup.objects.filter(pk__in=pk_set, group_type=CourseUserGroup.COHORT)
+            cohorts = list(CourseUserGroup.objects.filter(pk__in=pk_set, group_type=CourseUserGroup.COHORT))
     else:
-        cohort_iter = [instance] if instance.group_type == CourseUserGroup.COHORT else []
-        if action == "pre_clear":
-            user_id_iter = (user.id for user in instance.users.all())
+        cohorts = [instance] if instance.group_type == CourseUserGroup.COHORT else []
+        if not cohorts:
+            user_ids = []
+        elif action == "pre_clear":
+            user_ids = [user.id for user in instance.users.all()]
         else:
-            user_id_iter = pk_set
+            user_ids = pk_set
+
+    memberships = [(user_id, cohort) for user_id in user_ids for cohort in cohorts]
+    for user_id, cohort in memberships:
+        tracker.emit(
+            event_name,
+            {"cohort_id": cohort.id, "cohort_name": cohort.name, "user_id": user_id}
+        )
+    if action == "pre_clear":
+        instance._cleared_cohort_memberships = memberships  # pylint: disable=protected-access
+    else:
+        for user_id, cohort in memberships:
+            _invalidate_membership(user_id, cohort.course_id)
 
-    for event in get_event_iter(user_id_iter, cohort_iter):
-        tracker.emit(event_name, event)
+
+@receiver(pre_delete, sender=CourseUserGroup)
+def _cohort_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Forgets the cached cohort of each member of a cohort which is deleted"""
+    if instance.group_type == CourseUserGroup.COHORT:
+        for user_id in instance.users.values_list("id", flat=True):
+            _invalidate_membership(user_id, instance.course_id)
+
+
+@receiver(SignalHandler.course_published)
+def _course_published(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """Forgets whether a course which is published is cohorted"""
+    _request_cache("is_cohorted").pop(course_key, None)
+    cache.delete(_is_cohorted_cache_key(course_key))
 
 
 # A 'default cohort' is an auto-cohort that is automatically created for a course if no auto_cohort_groups have been
@@ -132,21 +214,68 @@ def is_course_cohorted(course_key):
     Given a course key, return a boolean for whether or not the course is
     cohorted.
 
+    The answer is cached until the course is next published, so the course
+    doesn't need to be loaded to give it.  XML courses are kept in memory, so
+    they're asked directly.
+
     Raises:
        Http404 if the course doesn't exist.
     """
-    return courses.get_course_by_id(course_key).is_cohorted
+    if modulestore().get_modulestore_type(course_key) == ModuleStoreEnum.Type.xml:
+        return courses.get_course_by_id(course_key).is_cohorted
+
+    request_cache = _request_cache("is_cohorted")
+    if course_key not in request_cache:
+        key = _is_cohorted_cache_key(course_key)
+        is_cohorted = cache.get(key)
+        if is_cohorted is None:
+            is_cohorted = courses.get_course_by_id(course_key).is_cohorted
+            cache.set(key, is_cohorted)
+        request_cache[course_key] = is_cohorted
+    return request_cache[course_key]
 
 
 def get_cohort_id(user, course_key):
     """
     Given a course key and a user, return the id of the cohort that user is
     assigned to in that course.  If they don't have a cohort, return None.
+
+    Raises:
+       ValueError if the CourseKey doesn't exist.
     """
+    if not _is_course_cohorted_or_value_error(course_key):
+        return None
+
+    cohort = _request_cache("membership").get((user.id, course_key))
+    if cohort is not None:
+        return cohort.id
+
+    cohort_id = cache.get(_membership_cache_key(user.id, course_key))
+    if cohort_id is not None:
+        return cohort_id
+
     cohort = get_cohort(user, course_key)
     return None if cohort is None else cohort.id
 
 
+def get_cohort_ids_for_users(course_key, user_ids=None):
+    """
+    Given a course key and some user ids, return a dict mapping the id of each
+    of those users who's in one of the course's cohorts to the id of their
+    cohort, using a single query.  If `user_ids` is None, map all the users in
+    the course's cohorts.
+
+    Doesn't check whether the course is cohorted, or assign users to cohorts.
+    """
+    memberships = CourseUserGroup.users.through.objects.filter(
+        courseusergroup__course_id=course_key,
+        courseusergroup__group_type=CourseUserGroup.COHORT,
+    )
+    if user_ids is not None:
+        memberships = memberships.filter(user_id__in=user_ids)
+    return dict(memberships.values_list("user_id", "courseusergroup_id"))
+
+
 def is_commentable_cohorted(course_key, commentable_id):
     """
     Args:
@@ -159,12 +288,13 @@ def is_commentable_cohorted(course_key, commentable_id):
     Raises:
         Http404 if the course doesn't exist.
     """
-    course = courses.get_course_by_id(course_key)
-
-    if not course.is_cohorted:
+    if not is_course_cohorted(course_key):
         # this is the easy case :)
-        ans = False
-    elif (
+        log.debug(u"is_commentable_cohorted({0}, {1}) = False".format(course_key, commentable_id))
+        return False
+
+    course = courses.get_course_by_id(course_key)
+    if (
             commentable_id in course.top_level_discussion_topic_ids or
             course.always_cohort_inline_discussions is False
     ):
@@ -186,16 +316,22 @@ def get_cohorted_commentables(course_key):
     """
     Given a course_key return a set of strings representing cohorted commentables.
     """
+    if not is_course_cohorted(course_key):
+        # this is the easy case :)
+        return set()
 
-    course = courses.get_course_by_id(course_key)
+    return courses.get_course_by_id(course_key).cohorted_discussions
 
-    if not course.is_cohorted:
-        # this is the easy case :)
-        ans = set()
-    else:
-        ans = course.cohorted_discussions
 
-    return ans
+def _is_course_cohorted_or_value_error(course_key):
+    """
+    Returns whether the course is cohorted, raising ValueError if the course
+    doesn't exist.
+    """
+    try:
+        return is_course_cohorted(course_key)
+    except Http404:
+        raise ValueError("Invalid course_key")
 
 
 @transaction.commit_on_success
@@ -204,6 +340,9 @@ def get_cohort(user, course_key, assign=True):
     Given a Django user and a CourseKey, return the user's cohort in that
     cohort.
 
+    The user's cohort is cached for up to MEMBERSHIP_CACHE_TIMEOUT seconds, and
+    forgotten as soon as their membership of a cohort in the course changes.
+
     Arguments:
         user: a Django User object.
         course_key: CourseKey
@@ -218,26 +357,35 @@ def get_cohort(user, course_key, assign=True):
     """
     # First check whether the course is cohorted (users shouldn't be in a cohort
     # in non-cohorted courses, but settings can change after course starts)
-    try:
-        course = courses.get_course_by_id(course_key)
-    except Http404:
-        raise ValueError("Invalid course_key")
-
-    if not course.is_cohorted:
+    if not _is_course_cohorted_or_value_error(course_key):
         return None
 
-    try:
-        return CourseUserGroup.objects.get(
-            course_id=course_key,
-            group_type=CourseUserGroup.COHORT,
-            users__id=user.id,
-        )
-    except CourseUserGroup.DoesNotExist:
-        # Didn't find the group.  We'll go on to create one if needed.
-        if not assign:
-            return None
-
-    choices = course.auto_cohort_groups
+    cohort = _request_cache("membership").get((user.id, course_key))
+    if cohort is not None:
+        return cohort
+
+    cohorts = CourseUserGroup.objects.filter(course_id=course_key, group_type=CourseUserGroup.COHORT)
+    cohort_id = cache.get(_membership_cache_key(user.id, course_key))
+    if cohort_id is not None:
+        try:
+            cohort = cohorts.get(id=cohort_id)
+        except CourseUserGroup.DoesNotExist:
+            # The cached cohort is gone, so look the user's cohort up again.
+            pass
+
+    if cohort is None:
+        try:
+            cohort = cohorts.get(users__id=user.id)
+        except CourseUserGroup.DoesNotExist:
+            # Didn't find the group.  We'll go on to create one if needed.
+            if not assign:
+                return None
+
+    if cohort is not None:
+        _cache_membership(user.id, cohort)
+        return cohort
+
+    choices = courses.get_course_by_id(course_key).auto_cohort_groups
     if len(choices) > 0:
         # Randomly choose one of the auto_cohort_groups, creating it if needed.
         group_name = local_random().choice(choices)
@@ -251,6 +399,7 @@ def get_cohort(user, course_key, assign=True):
         name=group_name
     )
     user.course_groups.add(group)
+    _cache_membership(user.id, group)
     return group
 
 
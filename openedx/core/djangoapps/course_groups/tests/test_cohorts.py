@@ -4,13 +4,15 @@ from django.db import IntegrityError
 from django.http import Http404
 from django.test import TestCase
 from django.test.utils import override_settings
-from mock import call, patch
+from mock import call, Mock, patch
 
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from request_cache.middleware import RequestCache
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory
 from xmodule.modulestore.django import modulestore, clear_existing_modulestores
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MIXED_TOY_MODULESTORE, mixed_store_config, ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
 
 from ..models import CourseUserGroup, CourseUserGroupPartitionGroup
 from .. import cohorts
@@ -587,6 +589,102 @@ class TestCohorts(ModuleStoreTestCase):
         )
 
 
+    @patch("openedx.core.djangoapps.course_groups.cohorts.get_current_request", Mock())
+    def test_get_cohort_cached(self):
+        """
+        Make sure cohorts.get_cohort() and cohorts.get_cohort_id() don't look
+        up a user's cohort again in a request until their membership changes.
+        """
+        self.addCleanup(RequestCache().clear_request_cache)
+        course = modulestore().get_course(self.toy_course_key)
+        config_course_cohorts(course, discussions=[], cohorted=True)
+        user = UserFactory(username="test", email="a@b.com")
+        first_cohort = CohortFactory(course_id=course.id, name="FirstCohort", users=[user])
+        second_cohort = CohortFactory(course_id=course.id, name="SecondCohort")
+
+        self.assertEqual(cohorts.get_cohort(user, course.id), first_cohort)
+        with self.assertNumQueries(0):
+            self.assertEqual(cohorts.get_cohort(user, course.id), first_cohort)
+            self.assertEqual(cohorts.get_cohort_id(user, course.id), first_cohort.id)
+
+        cohorts.add_user_to_cohort(second_cohort, user.username)
+        self.assertEqual(cohorts.get_cohort(user, course.id), second_cohort)
+
+        user.course_groups.clear()
+        self.assertIsNone(cohorts.get_cohort(user, course.id, assign=False))
+
+    def test_membership_cache_timeout(self):
+        """
+        Make sure a user's cohort is only cached across requests for
+        MEMBERSHIP_CACHE_TIMEOUT seconds.
+        """
+        course = modulestore().get_course(self.toy_course_key)
+        config_course_cohorts(course, discussions=[], cohorted=True)
+        user = UserFactory(username="test", email="a@b.com")
+        cohort = CohortFactory(course_id=course.id, name="FirstCohort", users=[user])
+
+        with patch("openedx.core.djangoapps.course_groups.cohorts.cache.set") as mock_set:
+            cohorts.get_cohort(user, course.id)
+        mock_set.assert_called_once_with(
+            cohorts._membership_cache_key(user.id, course.id),  # pylint: disable=protected-access
+            cohort.id,
+            cohorts.MEMBERSHIP_CACHE_TIMEOUT
+        )
+
+    def test_no_request_cache_outside_requests(self):
+        """
+        Make sure values aren't kept in the request cache when there's no
+        request to clear it, e.g. in a celery task.
+        """
+        course = CourseFactory.create(cohort_config={"cohorted": True})
+        self.assertTrue(cohorts.is_course_cohorted(course.id))
+
+        # Another process publishes the course, which forgets the shared cache.
+        course.cohort_config = {"cohorted": False}
+        with patch.object(cohorts.SignalHandler.course_published, "send_robust", return_value=[]):
+            self.update_course(course, self.user.id)
+        cohorts.cache.delete(cohorts._is_cohorted_cache_key(course.id))  # pylint: disable=protected-access
+
+        self.assertFalse(cohorts.is_course_cohorted(course.id))
+
+    def test_is_course_cohorted_cached(self):
+        """
+        Make sure cohorts.is_course_cohorted() doesn't load the course again
+        until it's published.
+        """
+        course = CourseFactory.create(cohort_config={"cohorted": True})
+        with patch(
+            "openedx.core.djangoapps.course_groups.cohorts.courses.get_course_by_id",
+            wraps=cohorts.courses.get_course_by_id
+        ) as mock_get_course:
+            self.assertTrue(cohorts.is_course_cohorted(course.id))
+            self.assertTrue(cohorts.is_course_cohorted(course.id))
+            self.assertEqual(mock_get_course.call_count, 1)
+
+            course.cohort_config = {"cohorted": False}
+            self.update_course(course, self.user.id)
+            self.assertFalse(cohorts.is_course_cohorted(course.id))
+
+    def test_get_cohort_ids_for_users(self):
+        """
+        Make sure cohorts.get_cohort_ids_for_users() maps users to their cohorts
+        in one query.
+        """
+        course = modulestore().get_course(self.toy_course_key)
+        users = [UserFactory() for __ in range(4)]
+        first_cohort = CohortFactory(course_id=course.id, users=users[:2])
+        second_cohort = CohortFactory(course_id=course.id, users=users[2:3])
+        CohortFactory(course_id=SlashSeparatedCourseKey("edX", "other", "course"), users=users)
+
+        with self.assertNumQueries(1):
+            cohort_ids = cohorts.get_cohort_ids_for_users(course.id, [user.id for user in users])
+        self.assertEqual(
+            cohort_ids,
+            {users[0].id: first_cohort.id, users[1].id: first_cohort.id, users[2].id: second_cohort.id}
+        )
+        self.assertEqual(cohorts.get_cohort_ids_for_users(course.id, [users[3].id]), {})
+        self.assertEqual(cohorts.get_cohort_ids_for_users(course.id), cohort_ids)
+
 class TestCohortsAndPartitionGroups(ModuleStoreTestCase):
     MODULESTORE = TEST_DATA_MIXED_TOY_MODULESTORE
 